@@ -1,16 +1,121 @@
 import argparse
+import logging
 
+from os.path import basename, normpath, join
 from sys import argv
-from tqdm import tqdm
 
-from .data.modelio import ModelInput, ModelOutput
-from .data.modelio import TileGenerator, TileDispatcher
-from .data.dataclasses import Dir
-from .transform.preprocessing import DataPreprocessor
-from .transform.resizing import ValidAverageDownsampling
-from .metadata.naming import ProductName
-from .metadata.quality import FusionQualityMetadata
-from .model import Runtime
+from .model.quantization import PRECISIONS
+from .config import DEVICES
+from .data.tiling import ORDERS
+
+logger = logging.getLogger(__name__)
+
+# Modules depending on GDAL, arosics or onnxruntime are imported by the
+# commands that use them, to keep `--help` and argument errors fast.
+
+
+def Dir(path: str):
+    """
+    Directory argument type. Defers the import of the data models to the
+    first parsed path.
+    """
+    from .data.dataclasses import Dir
+
+    try:
+        return Dir(path)
+    except AssertionError as e:
+        raise argparse.ArgumentTypeError(e)
+
+
+def Stage(value: str):
+    """
+    Materialization argument type, as a `stage=storage` pair.
+    """
+    from .data.materialization import parse_stage
+
+    try:
+        return parse_stage(value)
+    except AssertionError as e:
+        raise argparse.ArgumentTypeError(e)
+
+
+def Size(value: str):
+    """
+    Memory size argument type, in bytes or with a K, M, G or T suffix.
+    """
+    from .data.memory import parse_size
+
+    try:
+        return parse_size(value)
+    except (AssertionError, ValueError) as e:
+        raise argparse.ArgumentTypeError(e)
+
+
+def Positive(value: str):
+    """
+    Positive integer argument type.
+    """
+    try:
+        number = int(value)
+        assert number > 0, f"{value} is not a positive integer."
+        return number
+    except (AssertionError, ValueError) as e:
+        raise argparse.ArgumentTypeError(e)
+
+
+def add_scene_arguments(parser: argparse.ArgumentParser,
+                        many: bool = False) -> None:
+    """
+    Register the arguments defining an input scene triplet. With `many`,
+    several Sentinel-3 RBT and LST pairs may follow a single L1C archive, or
+    several L1C archives a single pair.
+    """
+    set_arg = parser.add_argument
+    nargs = "+" if many else None
+    set_arg("-l1c", "--sentinel2l1c",
+            help="Path to a Sentinel-2 L1C SAFE archive or its zip."
+            + (" Several share a single RBT and LST pair." if many else ""),
+            type=Dir, required=True, metavar="\"SEN2/L1C/PATH\"", dest="l1c",
+            nargs=nargs)
+    set_arg("-rbt", "--sentinel3rbt",
+            help="Path to a Sentinel-3 RBT SEN3 archive or its zip."
+            + (" Several are paired in order with the LST archives."
+               if many else ""),
+            type=Dir, required=True, metavar="\"SEN3/RBT/PATH\"", dest="rbt",
+            nargs=nargs)
+    set_arg("-lst", "--sentinel3lst",
+            help="Path to a Sentinel-3 LST SEN3 archive or its zip.",
+            type=Dir, required=True, metavar="\"SEN3/LST/PATH\"", dest="lst",
+            nargs=nargs)
+
+
+def add_queue_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Register the arguments of the job queue and warm runtime of the
+    long-running commands.
+    """
+    set_arg = parser.add_argument
+    set_arg("--jobs", type=int, default=1,
+            help="Number of jobs run concurrently.")
+    set_arg("--capacity", type=int, default=16,
+            help="Number of jobs that may be queued. Further "
+            "submissions are refused until jobs finish.")
+    set_arg("--precision", choices=PRECISIONS, default="fp32",
+            help="Model variant of the runtime.")
+    set_arg("--threads", type=int, default=None,
+            help="Intra-op threads of the inference session.")
+    set_arg("--device", choices=DEVICES, default="auto",
+            help="Inference device of the runtime.")
+    set_arg("--max-memory", type=Size, default=None,
+            help="Memory budget of the process, e.g. 12G, split across "
+            "the concurrent jobs.")
+    set_arg("--scratch", type=Dir, default=None,
+            help="Scratch directory of the jobs.")
+    set_arg("--stage", choices=("copy", "fadvise"), default=None,
+            help="Stage the files read from the input archives of the "
+            "jobs before preparation.")
+    set_arg("--stage-streams", type=int, default=4,
+            help="Number of files staged in parallel.")
 
 
 parser = argparse.ArgumentParser("msi2slstr",
@@ -28,56 +133,717 @@ parser.epilog =\
     The model in use has been trained on daytime images of Central Europe
     at a maximum of 5 minutes different of acquisition time and that is
     the context in which it is expected to perform best.
+
+    Auxiliary commands: `msi2slstr quantize -h`, `msi2slstr evaluate -h`,
+    `msi2slstr catalog -h`, `msi2slstr serve -h`, `msi2slstr watch -h`.
     """
 
-set_arg = parser.add_argument
-set_arg("-l1c", "--sentinel2l1c",
-        help="Path to a Sentinel-2 L1C SAFE archive.",
-        type=Dir, required=True, metavar="\"SEN2/L1C/PATH\"", dest="l1c")
-set_arg("-rbt", "--sentinel3rbt",
-        help="Path to a Sentinel-3 RBT SEN3 archive.",
-        type=Dir, required=True, metavar="\"SEN3/RBT/PATH\"", dest="rbt")
-set_arg("-lst", "--sentinel3lst",
-        help="Path to a Sentinel-3 LST SEN3 archive.",
-        type=Dir, required=True, metavar="\"SEN3/LST/PATH\"", dest="lst",)
+add_scene_arguments(parser, many=True)
+parser.add_argument("--precision", choices=PRECISIONS, default="fp32",
+                    help="Model variant to run inference with. Variants "
+                    "other than fp32 are produced with `msi2slstr quantize`.")
+parser.add_argument("--workers", type=int, default=0,
+                    help="Number of inference worker processes. By default "
+                    "inference runs in the main process.")
+parser.add_argument("--threads", type=int, default=None,
+                    help="Intra-op threads per inference session.")
+parser.add_argument("--device", choices=DEVICES, default="auto",
+                    help="Inference device. `auto` uses CUDA when available "
+                    "and the CPU otherwise.")
+parser.add_argument("--quality-window", type=int, default=3,
+                    help="Window size, in Sentinel-3 pixels, of the local "
+                    "metrics written to the auxiliary quality raster.")
+parser.add_argument("--eval-every", type=Positive, default=1,
+                    help="Evaluate fusion quality on every n-th batch of "
+                    "tiles only.")
+parser.add_argument("--eval-queue", type=int, default=4,
+                    help="Number of tiles that may wait for evaluation in "
+                    "the background. 0 evaluates synchronously.")
+parser.add_argument("--tile-order", choices=ORDERS, default="row",
+                    help="Order in which tiles are visited: row by row, "
+                    "row by row alternating direction, or along a Hilbert "
+                    "curve. Tiles stay on the same grid in every order.")
+parser.add_argument("--pad-edges", action="store_true",
+                    help="Fuse the partial tiles at the right and bottom "
+                    "edges of the scene, padded to full size.")
+parser.add_argument("--materialize", type=Stage, action="append",
+                    default=[], metavar="STAGE=STORAGE",
+                    help="Materialize a stage of input preparation, one of "
+                    "sen2_unified, sen3_unified, sen2_input, sen3_input or "
+                    "sen3_swath, as lazy, auto, mem, vsimem or disk. "
+                    "Repeatable.")
+parser.add_argument("--scratch", type=Dir, default=None,
+                    help="Directory of the stages materialized on disk and "
+                    "of intermediates spilled over the memory budget.")
+parser.add_argument("--max-memory", type=Size, default=None,
+                    help="Memory budget of the run, e.g. 12G. Sizes the GDAL "
+                    "cache and the batch size, and spills intermediates "
+                    "that exceed it to the scratch directory.")
+parser.add_argument("--batch-size", type=int, default=None,
+                    help="Number of tiles per inference batch. Defaults to "
+                    "the largest batch that fits in the memory budget, or "
+                    "1 without one.")
+parser.add_argument("--stage", choices=("copy", "fadvise"), default=None,
+                    help="Stage the files read from the input archives "
+                    "before preparation: copy them to the scratch "
+                    "directory, or prefetch them in place.")
+parser.add_argument("--stage-streams", type=int, default=4,
+                    help="Number of files staged in parallel.")
+parser.add_argument("--no-quality-maps", action="store_false",
+                    dest="quality_maps",
+                    help="Do not write the auxiliary quality raster.")
+parser.add_argument("-o", "--output-dir", type=Dir, default=None,
+                    help="Directory of the fused products. Defaults to the "
+                    "working directory.")
+parser.add_argument("--report", default=None, metavar="PATH",
+                    help="Write a JSON report of the latencies of the "
+                    "preparation and tile stages, the bytes read and the "
+                    "tiles fused per second.")
+
+
+quantize_parser = argparse.ArgumentParser(
+    "msi2slstr quantize",
+    description="Produce reduced precision variants of the packaged model, "
+    "calibrated and scored on tiles of the provided scene. Variants that "
+    "fail the accuracy gate are discarded.")
+add_scene_arguments(quantize_parser)
+quantize_parser.add_argument("--precision", nargs="+",
+                             choices=PRECISIONS[1:], default=PRECISIONS[1:],
+                             help="Variants to produce.")
+quantize_parser.add_argument("--tiles", type=int, default=16,
+                             help="Number of scene tiles used for "
+                             "calibration and scoring.")
+quantize_parser.add_argument("--min-r", type=float, default=.99)
+quantize_parser.add_argument("--max-srmse", type=float, default=.1)
+quantize_parser.add_argument("--min-ssim", type=float, default=.98)
 
 
-args = parser.parse_args(args=argv[1:])
+evaluate_parser = argparse.ArgumentParser(
+    "msi2slstr evaluate",
+    description="Score existing fused products against the Sentinel-3 "
+    "scene they were fused with and write the fusion quality metadata back "
+    "to their bands.")
+evaluate_parser.add_argument("-p", "--product", nargs="+", required=True,
+                             metavar="\"M2S/PRODUCT/PATH\"",
+                             help="Fused products overlapping the given "
+                             "Sentinel-3 scene.")
+evaluate_parser.add_argument("-rbt", "--sentinel3rbt",
+                             help="Path to a Sentinel-3 RBT SEN3 archive "
+                             "or its zip.",
+                             type=Dir, required=True,
+                             metavar="\"SEN3/RBT/PATH\"", dest="rbt")
+evaluate_parser.add_argument("-lst", "--sentinel3lst",
+                             help="Path to a Sentinel-3 LST SEN3 archive "
+                             "or its zip.",
+                             type=Dir, required=True,
+                             metavar="\"SEN3/LST/PATH\"", dest="lst")
+evaluate_parser.add_argument("--eval-every", type=Positive, default=1,
+                             help="Evaluate every n-th row of tiles only.")
 
 
-def main(args=args):
+catalog_parser = argparse.ArgumentParser(
+    "msi2slstr catalog",
+    description="Index SAFE and SEN3 archives in a SQLite catalog and list "
+    "the valid fusion triplets, one `L1C RBT LST` line each.")
+catalog_parser.add_argument("database", help="Path of the SQLite catalog.")
+catalog_parser.add_argument("--scan", nargs="+", default=[],
+                            metavar="DIR",
+                            help="Directory trees to index incrementally.")
+catalog_parser.add_argument("--workers", type=int, default=None,
+                            help="Number of indexing processes.")
+catalog_parser.add_argument("--within", type=float, default=None,
+                            metavar="MINUTES",
+                            help="List the triplets acquired within the "
+                            "given minutes of each other.")
 
+
+serve_parser = argparse.ArgumentParser(
+    "msi2slstr serve",
+    description="Run a fusion service that keeps the model warm. Jobs are "
+    "submitted over HTTP as JSON objects with the `l1c`, `rbt` and `lst` "
+    "archives, an optional `output` directory, `priority` and `options`, "
+    "the latter naming fusion arguments without their leading dashes, e.g. "
+    "{\"eval_every\": 4}, or raw fusion `arguments` as a list.")
+serve_parser.add_argument("address",
+                          help="Path of a UNIX socket, or HOST:PORT of a "
+                          "TCP socket, to listen on.")
+add_queue_arguments(serve_parser)
+
+watch_parser = argparse.ArgumentParser(
+    "msi2slstr watch",
+    description="Watch landing directories for new SAFE and SEN3 archives, "
+    "index them in a SQLite catalog and fuse the triplets they form as soon "
+    "as their archives are complete. Arguments not listed below are passed "
+    "on to the fusion jobs.")
+watch_parser.add_argument("database",
+                          help="Path of the SQLite catalog, which also "
+                          "records the processed products.")
+watch_parser.add_argument("directories", nargs="+", metavar="DIR",
+                          help="Landing directories to watch.")
+watch_parser.add_argument("--within", type=float, default=5.,
+                          metavar="MINUTES",
+                          help="Maximum difference of acquisition times of "
+                          "paired archives.")
+watch_parser.add_argument("--interval", type=float, default=5.,
+                          help="Seconds between polls of the directories.")
+watch_parser.add_argument("--settle", type=float, default=10.,
+                          help="Seconds an archive has to stay unchanged "
+                          "before it is ingested.")
+watch_parser.add_argument("-o", "--output-dir", default=None,
+                          help="Directory of the fused products.")
+add_queue_arguments(watch_parser)
+
+
+def quantize(argv: list[str]) -> int:
+    """
+    Entry point of `msi2slstr quantize`.
+    """
+    from .api import build_tiles
+    from .data.modelio import ModelInput
+    from .transform.preprocessing import DataPreprocessor
+    from .model.quantization import AccuracyGate
+    from .model.quantization import build_variants, sample_tiles
+
+    args = quantize_parser.parse_args(argv)
     inputs = ModelInput(sen2=args.l1c, sen3rbt=args.rbt, sen3lst=args.lst)
-    generators = (TileGenerator(500, inputs.sen2.dataset, batch_size=1),
-                  TileGenerator(10, inputs.sen3.dataset, batch_size=1))
-    data = TileDispatcher(generators)
+    data = build_tiles(inputs)
+    preprocess = DataPreprocessor()
+
+    samples = [preprocess(sen2tile, sen3tile) for sen2tile, sen3tile in
+               sample_tiles(iter(data), args.tiles,
+                            step=max(1, len(data) // args.tiles))]
+
+    report = build_variants(args.precision, samples,
+                            AccuracyGate(args.min_r, args.max_srmse,
+                                         args.min_ssim))
+
+    for precision, scores in report.items():
+        print(precision, "accepted" if scores.pop("accepted") else
+              "rejected", *(f"{k}={v.mean():.4f}" for k, v in scores.items()))
+
+    return 0
+
+
+def evaluate(argv: list[str]) -> int:
+    """
+    Entry point of `msi2slstr evaluate`.
+    """
+    from .data.sentinel3 import Sentinel3SLSTR
+    from .data.product import Product, evaluate_product
+
+    from .data.vsimem import registry
+
+    args = evaluate_parser.parse_args(argv)
+
+    with registry.scope(basename(normpath(args.rbt.path))):
+        sen3 = Sentinel3SLSTR(args.rbt, args.lst)
+
+        for path in args.product:
+            # The Sentinel-3 grid of each product is released after use.
+            with registry.scope(basename(path)):
+                qualitymeta = evaluate_product(Product(path), sen3,
+                                               every=args.eval_every)
+            print(path, *(f"{k}={v.mean():.4f}" for k, v
+                          in qualitymeta.content.items()))
+        del sen3
+
+    return 0
+
+
+def catalog(argv: list[str]) -> int:
+    """
+    Entry point of `msi2slstr catalog`.
+    """
+    from .data.catalog import Catalog
+
+    args = catalog_parser.parse_args(argv)
+    index = Catalog(args.database)
+
+    if args.scan:
+        index.update(*args.scan, workers=args.workers)
+
+    if args.within is not None:
+        for l1c, rbt, lst, _ in index.triplets(args.within):
+            print(l1c, rbt, lst)
+
+    index.close()
+    return 0
+
+
+class JobArgumentParser(argparse.ArgumentParser):
+    """
+    Parser of the fusion arguments of jobs, raising ValueError on invalid
+    arguments instead of printing to the standard error of the server and
+    exiting.
+    """
+
+    def error(self, message: str):
+        raise ValueError(f"Invalid job arguments: {message}")
+
+    def exit(self, status: int = 0, message: str = None):
+        raise ValueError(message or "Invalid job arguments.")
+
+    def print_help(self, file=None):
+        raise ValueError("Invalid job arguments: help was requested.")
+
+
+job_parser = JobArgumentParser("msi2slstr job", parents=[parser],
+                               add_help=False)
+
+#: Options set once per long-running command, for its warm runtime, shared
+#: memory budget and local file system, that jobs cannot set.
+SERVER_OPTIONS = ("precision", "threads", "device", "workers", "max_memory",
+                  "scratch", "stage", "stage_streams", "report")
+
+
+def option_arguments(options: dict) -> list[str]:
+    """
+    Command line arguments of the `options` of a job request, by option
+    destination, e.g. `{"batch_size": 2, "quality_maps": False}`.
+
+    :raises ValueError: When an option is unknown, or a flag is not given a
+        boolean.
+    """
+    actions = {action.dest: action for action in job_parser._actions
+               if action.option_strings}
+    argv = []
+    for key, value in options.items():
+        if key not in actions:
+            raise ValueError(f"Unknown job option {key}.")
+        action = actions[key]
+        flag = action.option_strings[-1]
+        if action.nargs == 0:
+            # Flags, stored as true or false, are given the value to set.
+            if not isinstance(value, bool):
+                raise ValueError(f"Job option {key} has to be a boolean.")
+            argv += [flag] if value != action.default else []
+            continue
+        for v in value if isinstance(value, list) else [value]:
+            argv += [flag, str(v)]
+    return argv
+
+
+def job_arguments(request: dict) -> argparse.Namespace:
+    """
+    Parse the fusion arguments of a job submitted to `msi2slstr serve`.
+
+    :raises ValueError: When the request is invalid, or sets any of
+        :data:`SERVER_OPTIONS`, also through its raw `arguments`.
+    """
+    def values(value):
+        return value if isinstance(value, list) else [value]
+
+    try:
+        argv = ["-l1c", *values(request["l1c"]),
+                "-rbt", *values(request["rbt"]),
+                "-lst", *values(request["lst"])]
+        if request.get("output"):
+            argv += ["--output-dir", request["output"]]
+        argv += request.get("arguments", [])
+        argv += option_arguments(request.get("options", {}))
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"Invalid job request: {e!r}")
+
+    args = job_parser.parse_args([str(arg) for arg in argv])
+    fixed = [dest for dest in SERVER_OPTIONS
+             if getattr(args, dest) != job_parser.get_default(dest)]
+    if fixed:
+        raise ValueError("Options of the server cannot be set per job: "
+                         + ", ".join(fixed))
+    check_inputs(args)
+    return args
+
+
+def build_queue(args: argparse.Namespace):
+    """
+    Build the job queue of a long-running command, whose workers share a
+    warm runtime and preprocessor, and split a memory budget.
+    """
+    from .data.memory import MemoryBudget
+    from .model import Runtime
+    from .service import JobQueue
+    from .transform.preprocessing import DataPreprocessor
+
+    model = Runtime(args.precision, threads=args.threads, device=args.device)
+    preprocess = DataPreprocessor()
+    budget = MemoryBudget(args.max_memory)
+    budget.configure()
+
+    def fuse(job):
+        job_args = job_arguments(job.request)
+        # Local storage and staging of the server apply to all jobs.
+        job_args.scratch = args.scratch
+        job_args.stage = args.stage
+        job_args.stage_streams = args.stage_streams
+        return run(job_args, model=model, preprocess=preprocess,
+                   budget=budget.share(args.jobs))
+
+    return JobQueue(fuse, workers=args.jobs, capacity=args.capacity,
+                    validate=job_arguments)
+
+
+def serve(argv: list[str]) -> int:
+    """
+    Entry point of `msi2slstr serve`.
+    """
+    from os import remove
+    from os.path import exists
+    from signal import signal, SIGTERM, default_int_handler
+    from socket import AF_UNIX
+    from .service import make_server
+
+    args = serve_parser.parse_args(argv)
+    queue = build_queue(args)
+    server = make_server(args.address, queue)
+    # Termination finishes the running jobs, like an interrupt.
+    signal(SIGTERM, default_int_handler)
+    logger.info("Serving on %s.", server.address)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Shutting down after %d queued jobs.", len(queue))
+    finally:
+        server.server_close()
+        queue.close()
+        if server.address_family == AF_UNIX and exists(args.address):
+            remove(args.address)
+    return 0
+
+
+def watch(argv: list[str]) -> int:
+    """
+    Entry point of `msi2slstr watch`.
+    """
+    args, arguments = watch_parser.parse_known_args(argv)
+
+    from threading import Event
+    from signal import signal, SIGTERM, default_int_handler
+    from .data.catalog import Catalog
+    from .service.watch import Watcher
+
+    queue = build_queue(args)
+    index = Catalog(args.database)
+    watcher = Watcher(args.directories, index, queue, within=args.within,
+                      settle=args.settle,
+                      request={"output": args.output_dir,
+                               "arguments": arguments})
+    signal(SIGTERM, default_int_handler)
+    logger.info("Watching %s.", ", ".join(args.directories))
+    try:
+        watcher.run(args.interval, Event())
+    except KeyboardInterrupt:
+        logger.info("Finishing %d pending jobs.", len(watcher.pending))
+    finally:
+        queue.close()
+        watcher.collect()
+        index.close()
+    return 0
+
+
+#: Auxiliary commands dispatched on the first command line argument.
+commands = {"quantize": quantize, "evaluate": evaluate, "catalog": catalog,
+            "serve": serve, "watch": watch}
+
+
+def main(args: argparse.Namespace = None):
+    """
+    Entry point of `msi2slstr`.
+    """
+    logging.basicConfig(level=logging.INFO, format="%(name)s: %(message)s")
+
+    if args is None:
+        if argv[1:2] and argv[1] in commands:
+            return commands[argv[1]](argv[2:])
+        args = parser.parse_args(args=argv[1:])
+
+    try:
+        check_inputs(args)
+    except ValueError as e:
+        parser.error(str(e))
+    run(args)
+    return 0
+
+
+def check_inputs(args: argparse.Namespace) -> None:
+    """
+    Check the combination of input archives.
+
+    :raises ValueError: When the archives do not form one or more triplets.
+    """
+    if len(args.rbt) != len(args.lst):
+        raise ValueError("RBT and LST archives have to be given in pairs.")
+    if len(args.l1c) > 1 and len(args.rbt) > 1:
+        raise ValueError("Either a single L1C archive or a single RBT and "
+                         "LST pair can be given.")
+
+
+def run(args: argparse.Namespace, **kwargs) -> list[str]:
+    """
+    Stage the inputs of the parsed arguments and fuse their triplets.
+    Keyword arguments are passed on to :func:`fuse_scene`, except `budget`,
+    a memory budget to use instead of one built from the arguments. The
+    spans and counters of the run are collected in a tracer of its own,
+    whose report is written to `args.report`, if set.
+
+    :return: Paths of the fused products.
+    :rtype: list[str]
+    """
+    from .tracing import collect
+
+    with collect() as tracer:
+        products = _run(args, **kwargs)
+
+    if args.report:
+        tracer.write(args.report)
+        logger.info("Wrote performance report to %s.", args.report)
+    return products
+
+
+def _run(args: argparse.Namespace, **kwargs) -> list[str]:
+    from contextlib import nullcontext
+
+    inputs = (*args.l1c, *args.rbt, *args.lst)
+    if args.stage:
+        from .data.staging import stage
+
+        staging = stage(*inputs, mode=args.stage, streams=args.stage_streams,
+                        scratch=args.scratch and str(args.scratch))
+    else:
+        staging = nullcontext(inputs)
+
+    # Intermediates of the scene are released once its datasets are, and
+    # staged files after that.
+    with staging as staged:
+        n, m = len(args.l1c), len(args.rbt)
+        l1cs, rbts, lsts = staged[:n], staged[n:n + m], staged[n + m:]
+        budget, policy = build_policy(args, kwargs.pop("budget", None))
+
+        if n > 1:
+            products = fuse_granules(args, l1cs, rbts[0], lsts[0], budget,
+                                     policy, **kwargs)
+        else:
+            products = fuse_pairs(args, l1cs[0], rbts, lsts, budget, policy,
+                                  **kwargs)
+    return products
+
+
+def fuse_pairs(args: argparse.Namespace, l1c, rbts, lsts, budget, policy,
+               **kwargs) -> list[str]:
+    """
+    Fuse a granule with each of several RBT and LST pairs, preparing the
+    Sentinel-2 side once when there is more than one pair.
+    """
+    from argparse import Namespace
+    from .data.vsimem import registry
+    from .metadata.naming import ProductName
+
+    if len(rbts) == 1:
+        with registry.scope(ProductName(l1c, rbts[0])):
+            return [fuse_scene(Namespace(**{**vars(args), "l1c": l1c,
+                                            "rbt": rbts[0],
+                                            "lst": lsts[0]}),
+                               budget, policy, **kwargs)]
+
+    from .data.modelio import Sentinel2Reference
+
+    products = []
+    # The Sentinel-2 side outlives the scopes of the pairs.
+    with registry.scope(basename(normpath(l1c.path))):
+        with budget.stage("prepare_sen2"):
+            reference = Sentinel2Reference(l1c, policy)
+        for rbt, lst in zip(rbts, lsts):
+            with registry.scope(ProductName(l1c, rbt)):
+                products.append(
+                    fuse_scene(Namespace(**{**vars(args), "l1c": l1c,
+                                            "rbt": rbt, "lst": lst}),
+                               budget, policy, reference=reference,
+                               **kwargs))
+        del reference
+    return products
+
+
+def fuse_granules(args: argparse.Namespace, l1cs, rbt, lst, budget, policy,
+                  **kwargs) -> list[str]:
+    """
+    Fuse several granules with an RBT and LST pair, geolocating the region
+    of the swath that covers the granules once. Each granule is written as
+    soon as it is fused.
+    """
+    from argparse import Namespace
+    from .data.catalog import region
+    from .data.modelio import Sentinel3Reference
+    from .data.vsimem import registry
+    from .metadata.naming import ProductName
+
+    products = []
+    # The Sentinel-3 side outlives the scopes of the granules.
+    with registry.scope(basename(normpath(rbt.path))):
+        with budget.stage("prepare_sen3"):
+            swath = Sentinel3Reference(rbt, lst, policy,
+                                       region=region(*(l1c.path for l1c
+                                                       in l1cs)))
+        for l1c in l1cs:
+            with registry.scope(ProductName(l1c, rbt)):
+                products.append(
+                    fuse_scene(Namespace(**{**vars(args), "l1c": l1c,
+                                            "rbt": rbt, "lst": lst}),
+                               budget, policy, swath=swath, **kwargs))
+            logger.info("Fused %s.", products[-1])
+        del swath
+    return products
+
+
+def build_policy(args: argparse.Namespace, budget=None):
+    """
+    Build the memory budget of the run and the materialization policy of
+    its input preparation. A given budget, e.g. a share of the budget of a
+    server, is used as is and does not reconfigure the GDAL cache.
+    """
+    from .data.materialization import MaterializationPolicy
+    from .data.memory import MemoryBudget
+
+    if budget is None:
+        budget = MemoryBudget(args.max_memory)
+        budget.configure()
+    policy = MaterializationPolicy(budget=budget)
+    policy.stages.update(args.materialize)
+    if args.scratch:
+        policy.scratch = budget.scratch = str(args.scratch)
+    return budget, policy
+
+
+def traced_results(results):
+    """
+    Time the wait for each result of the inference pool as `tile.infer`.
+    Workers infer concurrently, so this is the latency seen by the writer.
+    """
+    from .tracing import tracer
+
+    results = iter(results)
+    while True:
+        with tracer.span("tile.infer"):
+            result = next(results, None)
+        if result is None:
+            return
+        yield result
+
+
+def fuse_scene(args: argparse.Namespace, budget=None, policy=None,
+               reference=None, swath=None, model=None,
+               preprocess=None) -> str:
+    """
+    Fuse the scene triplet of the parsed arguments, reusing the prepared
+    Sentinel-2 side of a `reference` or Sentinel-3 side of a `swath` when
+    given. A warm `model` and `preprocess` are used instead of new ones
+    when given, and inference then runs in the calling process.
+
+    :return: Path of the fused product.
+    :rtype: str
+    """
+    from contextlib import nullcontext
+    from tqdm import tqdm
+    from .api import build_tiles
+    from .data.modelio import ModelInput, ModelOutput, write_quality_maps
+    from .evaluation.scene import QualityMaps
+    from .transform.preprocessing import DataPreprocessor
+    from .transform.postprocessing import DataPostprocessor
+    from .metadata.naming import ProductName, QualityMapName
+    from .metadata.quality import FusionQualityMetadata
+    from .model import Runtime
+    from .model.pool import InferencePool
+    from .tracing import tracer, traced
+
+    if budget is None:
+        budget, policy = build_policy(args)
+
+    with budget.stage("prepare"), tracer.span("scene.prepare"):
+        inputs = ModelInput(sen2=args.l1c, sen3rbt=args.rbt,
+                            sen3lst=args.lst, policy=policy,
+                            reference=reference, swath=swath)
+
+    sen2, sen3 = inputs.sen2.dataset, inputs.sen3.dataset
+    batch_size = args.batch_size or budget.batch_size(
+        (sen2.RasterCount + sen3.RasterCount) * 500 ** 2 * 4)
+    data = build_tiles(inputs, batch_size, order=args.tile_order,
+                       pad=args.pad_edges)
+    sen2index, sen3index = (generator.index for generator
+                            in data.tile_generators)
+    name = join(args.output_dir or "", ProductName(args.l1c, args.rbt))
     output = ModelOutput(inputs.sen2.dataset.GetGeoTransform(),
                          inputs.sen2.dataset.GetProjection(),
-                         name=ProductName(args.l1c, args.rbt),
+                         name=name,
                          xsize=inputs.sen2.dataset.RasterXSize,
                          ysize=inputs.sen2.dataset.RasterYSize,
                          nbands=inputs.sen3.dataset.RasterCount,
-                         t_size=500)
-    model = Runtime()
-    preprocess = DataPreprocessor()
-    qualitymeta = FusionQualityMetadata()
-    downscale = ValidAverageDownsampling(50)
+                         t_size=500,
+                         index=sen2index)
+    preprocess = preprocess or DataPreprocessor()
+    maps = QualityMaps(nbands=inputs.sen3.dataset.RasterCount,
+                       xsize=inputs.sen3.dataset.RasterXSize,
+                       ysize=inputs.sen3.dataset.RasterYSize,
+                       t_size=10,
+                       window=args.quality_window,
+                       index=sen3index)\
+        if args.quality_maps else None
+    qualitymeta = FusionQualityMetadata(maps, every=args.eval_every,
+                                        queue_size=args.eval_queue)
+    postprocess = DataPostprocessor(50)
+    batches = (traced("tile.preprocess")(preprocess)(sen2tile, sen3tile)
+               for sen2tile, sen3tile in data)
 
-    for sen2tile, sen3tile in tqdm(data, desc="Fusing data..."):
-        sen2tile, sen3tile = preprocess(sen2tile, sen3tile)
-        Y_hat = model(sen2tile, sen3tile)[0]
-        Y_hat = preprocess.reset_value_range(Y_hat)
+    if args.workers and model is None:
+        pool = InferencePool(args.workers, args.threads,
+                             precision=args.precision, device=args.device)
+        results = traced_results(pool(batches))
+    else:
+        pool = None
+        model = model or Runtime(args.precision, threads=args.threads,
+                                 device=args.device)
+        infer = traced("tile.infer")(model)
+        results = ((sen2tile, sen3tile, infer(sen2tile, sen3tile)[0])
+                   for sen2tile, sen3tile in batches)
 
-        # Y_hat needs to be downscaled
-        # to evaluate energy balance.
-        qualitymeta.evaluate(sen3tile, downscale(Y_hat))
+    # Workers and their shared memory, and the background evaluation, are
+    # released also on failure.
+    try:
+        with pool or nullcontext(), budget.stage("fuse"), \
+                tracer.span("scene.fuse"):
+            for _, sen3tile, Y_hat in tqdm(results, desc="Fusing data...",
+                                           total=len(data)):
+                # Y_hat needs to be downscaled
+                # to evaluate energy balance.
+                with tracer.span("tile.postprocess"):
+                    Y_hat, Y_down = postprocess(Y_hat)
+                with tracer.span("tile.evaluate"):
+                    qualitymeta.evaluate(
+                        postprocess.reset_value_range(sen3tile), Y_down)
 
-        output.write_tiles(Y_hat)
+                with tracer.span("tile.write"):
+                    output.write_tiles(Y_hat)
+                tracer.count("tiles", len(Y_hat))
+    except BaseException:
+        qualitymeta.close()
+        raise
 
-    # Write collected metadata of fusion quality.
-    output.write_band_metadata([qualitymeta])
+    for generator in data.tile_generators:
+        logger.info("Read %d tiles at a block read amplification of %.2f.",
+                    generator.counter.requests,
+                    generator.counter.amplification)
 
-    return 0
+    with budget.stage("write"), tracer.span("scene.write"):
+        # Write collected metadata of fusion quality.
+        qualitymeta.finalize()
+        output.write_band_metadata([qualitymeta])
+
+        if maps is not None:
+            write_quality_maps(join(args.output_dir or "",
+                                    QualityMapName(args.l1c, args.rbt)),
+                               maps,
+                               inputs.sen3.dataset.GetGeoTransform(),
+                               inputs.sen3.dataset.GetProjection())
+
+    budget.report()
+    return name
 
 
 if __name__ == "__main__":
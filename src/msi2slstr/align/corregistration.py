@@ -1,21 +1,35 @@
-from arosics import COREG_LOCAL
-
-from ..data.gdalutils import create_mem_dataset, TermProgress
+from ..data.gdalutils import create_mem_dataset, TermProgress, Dataset
 from ..data.typing import Sentinel2L1C, Sentinel3SLSTR
+from ..tracing import traced
+
+
+#: Band of the Sentinel-2 dataset co-registration matches on.
+REFERENCE_BAND = 9
 
 
-def corregister_datasets(sen2: Sentinel2L1C, sen3: Sentinel3SLSTR) -> None:
+@traced("prepare.corregistration")
+def corregister_datasets(sen2: Sentinel2L1C, sen3: Sentinel3SLSTR,
+                         match: Dataset = None) -> None:
     """
     Run arosics local corregistration.
+
+    :param match: Single band dataset holding the :data:`REFERENCE_BAND` of
+        `sen2`, to match on instead of the full Sentinel-2 dataset.
+    :type match: gdal.Dataset, optional
     """
-    CRL = COREG_LOCAL(sen2.dataset.GetDescription(),
+    # arosics is slow to import and only needed here.
+    from arosics import COREG_LOCAL
+
+    reference, band = (sen2.dataset, REFERENCE_BAND) if match is None\
+        else (match, 1)
+    CRL = COREG_LOCAL(reference.GetDescription(),
                       sen3.dataset.GetDescription(),
                       2.,
                       window_size=(64, 64),
                       path_out=None,
                       fmt_out="VRT",
                       nodata=(0, -32768),
-                      r_b4match=9,
+                      r_b4match=band,
                       s_b4match=3,
                       min_reliability=10,
                       resamp_alg_calc=0,
@@ -0,0 +1,216 @@
+"""
+Python interface of the fusion, for embedding msi2slstr in other services.
+
+:func:`iter_fusion` yields the fused tiles of a scene one by one, with their
+window and quality metrics, for callers to consume as a stream, e.g. by
+writing them with their own writer. :func:`fuse` assembles them into an
+array. Both accept archive paths or GDAL datasets, including datasets held
+in memory, and use a caller's :class:`Runtime` when given one, so that the
+model is loaded once per service rather than once per scene.
+
+Example::
+
+    from msi2slstr.api import iter_fusion
+    from msi2slstr.model import Runtime
+
+    model = Runtime()
+    for window, Y_hat, metrics in iter_fusion(l1c, rbt, lst, model=model):
+        writer.write(window, Y_hat)
+"""
+from collections.abc import Iterator
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import NamedTuple
+
+from numpy import ndarray, full, nan, float32, stack, nanmean
+
+from .data.modelio import ModelInput, TileGenerator, TileDispatcher
+from .data.materialization import MaterializationPolicy
+from .data.tiling import TileIndex
+from .data.vsimem import registry
+from .evaluation.metrics import r, srmse, ssim, Moments
+from .model import Runtime
+from .transform.preprocessing import DataPreprocessor
+from .transform.postprocessing import DataPostprocessor
+
+
+#: Metrics computed for every fused tile.
+METRICS = (r, srmse, ssim)
+
+
+class FusedTile(NamedTuple):
+    """
+    A fused tile of a scene.
+    """
+    #: Window of the tile on the Sentinel-2 grid, as (xoffset, yoffset,
+    #: width, height).
+    window: tuple[int, int, int, int]
+    #: Fused tile of shape (bands, height, width).
+    Y_hat: ndarray
+    #: Metric values per band against the Sentinel-3 tile, by metric name.
+    metrics: dict[str, ndarray]
+
+
+@dataclass
+class FusedScene:
+    """
+    A fused scene.
+    """
+    #: Fused array of shape (bands, height, width). Elements outside of the
+    #: fused tiles are NaN.
+    Y_hat: ndarray = field(repr=False)
+    #: Mean of each metric over the tiles, per band, by metric name.
+    metrics: dict[str, ndarray] = field()
+    geotransform: tuple[float, float, float, float, float, float] = field()
+    projection: str = field(repr=False)
+
+
+def build_tiles(inputs: ModelInput, batch_size: int = 1, order: str = "row",
+                pad: bool = False) -> TileDispatcher:
+    """
+    Build the paired tile iterator of the prepared scene. Sentinel-3 tiles
+    follow the index of the Sentinel-2 tiles.
+    """
+    sen2, sen3 = inputs.sen2.dataset, inputs.sen3.dataset
+    index = TileIndex(500, sen2.RasterXSize, sen2.RasterYSize, pad=pad,
+                      order=order,
+                      block=tuple(sen2.GetRasterBand(1).GetBlockSize()))
+    return TileDispatcher((TileGenerator(500, sen2, batch_size=batch_size,
+                                         index=index),
+                           TileGenerator(10, sen3, batch_size=batch_size,
+                                         index=index.scaled(
+                                             50, sen3.RasterXSize,
+                                             sen3.RasterYSize))))
+
+
+def prepare(sen2, sen3rbt, sen3lst=None,
+            policy: MaterializationPolicy = None) -> ModelInput:
+    """
+    Prepare the inputs of a scene, to be fused once or several times.
+
+    :param sen2: Path of the L1C archive, or a dataset of its 13 bands.
+    :type sen2: str or `gdal.Dataset`
+    :param sen3rbt: Path of the RBT archive, or a geolocated dataset of the
+        11 RBT bands followed by LST.
+    :type sen3rbt: str or `gdal.Dataset`
+    :param sen3lst: Path of the LST archive. Ignored for datasets.
+    :type sen3lst: str, optional
+    :param policy: Materialization policy of the preparation stages.
+    :type policy: :class:`MaterializationPolicy`, optional
+
+    :rtype: :class:`ModelInput`
+    """
+    return ModelInput(sen2=sen2, sen3rbt=sen3rbt, sen3lst=sen3lst,
+                      policy=policy or MaterializationPolicy())
+
+
+def _fuse_tiles(inputs: ModelInput, model: Runtime,
+                preprocess: DataPreprocessor, batch_size: int, order: str,
+                pad: bool, evaluate: bool) -> Iterator[FusedTile]:
+    data = build_tiles(inputs, batch_size, order=order, pad=pad)
+    index = data.tile_generators[0].index
+    postprocess = DataPostprocessor(50)
+    tiles = iter(range(len(index)))
+
+    for sen2tile, sen3tile in data:
+        sen2tile, sen3tile = preprocess(sen2tile, sen3tile)
+        Y_hat, Y_down = postprocess(model(sen2tile, sen3tile)[0])
+        if evaluate:
+            # A single pass over the data for all metrics.
+            moments = Moments(postprocess.reset_value_range(sen3tile),
+                              Y_down)
+            scores = {m.__name__: m.from_moments(moments) for m in METRICS}
+
+        for k, tile in enumerate(Y_hat):
+            i = next(tiles)
+            yield FusedTile(index[i], tile[(..., *index.core(i))],
+                            {name: values[k].view(ndarray) for name, values
+                             in scores.items()} if evaluate else {})
+
+
+def iter_fusion(sen2, sen3rbt=None, sen3lst=None, *, model: Runtime = None,
+                preprocess: DataPreprocessor = None, batch_size: int = 1,
+                order: str = "row", pad: bool = False, evaluate: bool = True,
+                policy: MaterializationPolicy = None
+                ) -> Iterator[FusedTile]:
+    """
+    Fuse a scene tile by tile. Nothing is written to disk unless `policy`
+    materializes preparation stages there.
+
+    :param sen2: Path of the L1C archive or a dataset of its 13 bands, or
+        inputs prepared with :func:`prepare`, in which case the Sentinel-3
+        arguments are ignored.
+    :type sen2: str, `gdal.Dataset` or :class:`ModelInput`
+    :param sen3rbt: Path of the RBT archive, or a geolocated dataset of the
+        11 RBT bands followed by LST.
+    :type sen3rbt: str or `gdal.Dataset`, optional
+    :param sen3lst: Path of the LST archive. Ignored for datasets.
+    :type sen3lst: str, optional
+    :param model: Runtime to infer with, defaults to a new `fp32` runtime.
+    :type model: :class:`Runtime`, optional
+    :param preprocess: Preprocessor of the tiles, defaults to a new one.
+    :type preprocess: :class:`DataPreprocessor`, optional
+    :param batch_size: Number of tiles per inference batch, defaults to 1.
+    :type batch_size: int, optional
+    :param order: Tile order, one of :data:`~msi2slstr.data.tiling.ORDERS`.
+    :type order: str, optional
+    :param pad: Fuse the partial tiles at the right and bottom edges.
+    :type pad: bool, optional
+    :param evaluate: Compute the metrics of each tile, defaults to True.
+    :type evaluate: bool, optional
+    :param policy: Materialization policy of the preparation stages.
+    :type policy: :class:`MaterializationPolicy`, optional
+
+    :return: Iterator of fused tiles, in tile order.
+    :rtype: Iterator[:class:`FusedTile`]
+    """
+    model = model or Runtime()
+    preprocess = preprocess or DataPreprocessor()
+    options = (batch_size, order, pad, evaluate)
+
+    if isinstance(sen2, ModelInput):
+        yield from _fuse_tiles(sen2, model, preprocess, *options)
+        return
+
+    # Intermediates of inputs prepared here are released with the iterator.
+    # Their scope is only active while the iterator works, so that it does
+    # not leak to the caller, nor to other iterators, between tiles.
+    scope = registry.open("api")
+    try:
+        with registry.use(scope):
+            inputs = prepare(sen2, sen3rbt, sen3lst, policy)
+        try:
+            yield from registry.iterate(scope, _fuse_tiles(
+                inputs, model, preprocess, *options))
+        finally:
+            del inputs
+    finally:
+        registry.release(scope)
+
+
+def fuse(sen2, sen3rbt=None, sen3lst=None, **kwargs) -> FusedScene:
+    """
+    Fuse a scene into an array. Arguments are those of :func:`iter_fusion`.
+
+    :rtype: :class:`FusedScene`
+    """
+    prepared = isinstance(sen2, ModelInput)
+    # Intermediates of inputs prepared here are released with the scene.
+    with nullcontext() if prepared else registry.scope("api"):
+        inputs = sen2 if prepared else\
+            prepare(sen2, sen3rbt, sen3lst, kwargs.pop("policy", None))
+        dataset = inputs.sen2.dataset
+        Y_hat = full((inputs.sen3.dataset.RasterCount, dataset.RasterYSize,
+                      dataset.RasterXSize), nan, float32)
+        metrics = []
+        for (xoff, yoff, xsize, ysize), tile, scores in\
+                iter_fusion(inputs, **kwargs):
+            Y_hat[:, yoff:yoff + ysize, xoff:xoff + xsize] = tile
+            metrics.append(scores)
+
+        scene = FusedScene(Y_hat, {
+            name: nanmean(stack([m[name] for m in metrics]), 0)
+            for name in (metrics[0] if metrics else ())},
+            dataset.GetGeoTransform(), dataset.GetProjection())
+        del inputs, dataset
+    return scene
@@ -1,3 +1,4 @@
+from logging import getLogger
 from sys import path
 from os import chdir, getcwd, PathLike
 from os.path import dirname, realpath
@@ -9,9 +10,13 @@ __all__ = ["SEN2_MINMAX",
 
 
 site_packages_paths = [p for p in path if p.endswith("site-packages")]
-onnx_providers = ["CPUExecutionProvider"]
 onnx_provider_options = None
 
+#: Accepted values for the inference device selection.
+DEVICES = ("cpu", "cuda", "auto")
+
+logger = getLogger(__name__)
+
 
 class _OpenRelativePath:
     """
@@ -41,24 +46,58 @@ def get_yaml_dict(path: str) -> dict:
     return load
 
 
-from .libloader import cuda_failed
-
-
-# TODO refactor code so this does not need to be here.
 def is_cuda_available():
     """
-    It checks if the dependencies are present and loaded. It does not
-    check if there is a compatible device. TODO
+    It checks if the dependencies are present and loaded and if onnxruntime
+    was built with CUDA support. It does not check if there is a compatible
+    device. TODO
+
+    The CUDA libraries are only probed on first call.
 
     :return: Whether nvidia libs are loaded.
     :rtype: bool
     """
-    return not bool(cuda_failed)
+    from onnxruntime import get_available_providers
+    from .libloader import probe_cuda
 
+    return "CUDAExecutionProvider" in get_available_providers() and\
+        not probe_cuda()
 
-if is_cuda_available():
-    # Set CUDA as priority.
-    onnx_providers.insert(0, "CUDAExecutionProvider")
+
+def get_onnx_providers(device: str = "auto") -> list[str]:
+    """
+    Resolve the onnxruntime execution providers for a device selection.
+
+    :param device: One of :data:`DEVICES`. `auto` selects CUDA when it is
+        available and falls back to the CPU otherwise. Defaults to `auto`.
+    :type device: str, optional
+
+    :return: Execution providers in order of priority.
+    :rtype: list[str]
+    """
+    if device not in DEVICES:
+        raise ValueError(f"Unknown device '{device}'. "
+                         f"Expected one of {DEVICES}.")
+
+    if device == "cpu":
+        providers = ["CPUExecutionProvider"]
+    elif is_cuda_available():
+        providers = ["CUDAExecutionProvider", "CPUExecutionProvider"]
+    elif device == "cuda":
+        from .libloader import probe_cuda
+        failed = probe_cuda()
+        if not failed:
+            raise RuntimeError("CUDA was requested but the installed "
+                               "onnxruntime build does not provide the "
+                               "CUDAExecutionProvider.")
+        raise RuntimeError("CUDA was requested but is not available. "
+                           f"Failed to load: {', '.join(failed)}.")
+    else:
+        providers = ["CPUExecutionProvider"]
+
+    logger.info("Device '%s' resolved to providers: %s", device,
+                ", ".join(providers))
+    return providers
 
 
 _NORMAL_MAXMIN = get_yaml_dict("./normalization.yaml")
@@ -1,3 +1,4 @@
+from functools import cache
 from os import PathLike
 from os.path import join
 from ctypes import cdll
@@ -30,8 +31,17 @@ def load_libraries(*paths: list[PathLike]):
     return failed
 
 
-# Cuda
-libs: dict = get_yaml_dict("./libs.yaml")[platform]["nvidia"]
-cuda_failed = load_libraries(*libs.values())
+@cache
+def probe_cuda() -> tuple[str]:
+    """
+    Load the CUDA libraries shipped as python packages. The probe runs once
+    per process and its result is cached.
 
-# ...
+    :return: The libraries that failed to load.
+    :rtype: tuple[str]
+    """
+    libs: dict = get_yaml_dict("./libs.yaml").get(platform, {})\
+        .get("nvidia", {})
+    if not libs:
+        return ("nvidia",)
+    return tuple(load_libraries(*libs.values()))
@@ -0,0 +1,307 @@
+"""
+SQLite catalog of Sentinel-2 L1C and Sentinel-3 RBT and LST archives.
+
+Products are described by their names and manifests: platform, tile,
+acquisition times and footprint. Footprint bounding boxes are indexed in an
+R*Tree and acquisition times in a B-tree, so that valid fusion triplets can
+be queried directly from the catalog.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from logging import getLogger
+from os import walk, stat
+from os.path import join, split, abspath
+from sqlite3 import connect
+from collections.abc import Iterable, Iterator
+
+from .dataclasses import XML, Dir
+from .sentinel2 import Sen2Name
+from .sentinel3 import Sen3Name
+
+
+#: Manifest file name of each archive suffix.
+MANIFESTS = {".SAFE": "manifest.safe", ".SEN3": "xfdumanifest.xml"}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS products (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime REAL NOT NULL,
+    kind TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    tile TEXT,
+    start REAL NOT NULL,
+    stop REAL NOT NULL,
+    footprint TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS products_time ON products (kind, start);
+CREATE VIRTUAL TABLE IF NOT EXISTS footprints USING rtree (
+    id, min_lon, max_lon, min_lat, max_lat
+);
+"""
+
+TRIPLETS = """
+SELECT l1c.path, rbt.path, lst.path, abs(rbt.start - l1c.start) AS dt,
+       l1c.footprint, rbt.footprint
+FROM products AS l1c
+JOIN footprints AS box ON box.id = l1c.id
+JOIN footprints AS swath
+    ON swath.min_lon <= box.min_lon AND swath.max_lon >= box.max_lon
+    AND swath.min_lat <= box.min_lat AND swath.max_lat >= box.max_lat
+JOIN products AS rbt ON rbt.id = swath.id AND rbt.kind = 'RBT'
+JOIN products AS lst ON lst.kind = 'LST' AND lst.platform = rbt.platform
+    AND lst.start BETWEEN rbt.start - 1 AND rbt.start + 1
+WHERE l1c.kind = 'L1C' AND rbt.start BETWEEN l1c.start - :dt
+    AND l1c.start + :dt
+ORDER BY l1c.path, dt
+"""
+
+logger = getLogger(__name__)
+
+
+@dataclass
+class Product:
+    """
+    Catalog record of an archive.
+    """
+    path: str = field()
+    mtime: float = field()
+    kind: str = field()
+    platform: str = field()
+    tile: str | None = field()
+    start: float = field()
+    stop: float = field()
+    #: Footprint polygon as (longitude, latitude) pairs.
+    footprint: list[tuple[float, float]] = field(repr=False)
+
+
+def _timestamp(value: str) -> float:
+    return datetime.fromisoformat(value.strip().replace("Z", "+00:00"))\
+        .timestamp()
+
+
+def _text(manifest: XML, tag: str) -> str | None:
+    # Manifests use several namespaces, so tags are matched by local name.
+    for element in manifest.root.iter():
+        if element.tag.rsplit("}", 1)[-1] == tag and element.text:
+            return element.text
+    return None
+
+
+def describe(path: str) -> Product | None:
+    """
+    Describe a SAFE or SEN3 archive from its name and manifest.
+
+    :param path: Path of the archive, optionally zipped.
+    :type path: str
+
+    :return: The catalog record, or None for archives of other products or
+        archives that cannot be read.
+    :rtype: :class:`Product` or None
+    """
+    try:
+        archive = Dir(path)
+        name = split(archive.path)[-1]
+        suffix = name[-5:]
+        manifest = XML(join(archive, MANIFESTS[suffix]))
+
+        if suffix == ".SAFE":
+            parsed = Sen2Name(name)
+            kind, tile = parsed.product[-3:], parsed.tile
+        else:
+            parsed = Sen3Name(name)
+            kind, tile = parsed.product, None
+
+        if kind not in ("L1C", "RBT", "LST"):
+            return None
+
+        start = _timestamp(_text(manifest, "startTime"))
+        stop = _timestamp(_text(manifest, "stopTime") or
+                          _text(manifest, "startTime"))
+        # Footprints are listed as latitude, longitude pairs.
+        coords = list(map(float, (_text(manifest, "coordinates") or
+                                  _text(manifest, "posList")).split()))
+        footprint = list(zip(coords[1::2], coords[::2]))
+    except Exception as e:
+        logger.warning("Skipping %s: %s", path, e)
+        return None
+
+    return Product(abspath(path), stat(path).st_mtime, kind,
+                   parsed.platform, tile, start, stop, footprint)
+
+
+def region(*paths: str, margin: float = .1
+           ) -> tuple[float, float, float, float] | None:
+    """
+    Geographic bounds of the footprints of several archives, extended by
+    `margin` degrees on every side.
+
+    :return: (lon_min, lat_min, lon_max, lat_max), or None when an archive
+        cannot be described.
+    :rtype: tuple[float, float, float, float] or None
+    """
+    products = list(map(describe, paths))
+    if not all(products):
+        return None
+    lons, lats = zip(*(point for product in products
+                       for point in product.footprint))
+    return (min(lons) - margin, min(lats) - margin,
+            max(lons) + margin, max(lats) + margin)
+
+
+def find_archives(root: str) -> Iterator[str]:
+    """
+    Find SAFE and SEN3 archives, and their zips, under a directory tree.
+    """
+    for directory, dirs, files in walk(root):
+        for name in list(dirs):
+            if name[-5:] in MANIFESTS:
+                # Archives are not descended into.
+                dirs.remove(name)
+                yield join(directory, name)
+        for name in files:
+            if name.startswith(("S2", "S3")) and name.endswith(".zip"):
+                yield join(directory, name)
+
+
+def contains(polygon: list[tuple[float, float]],
+             points: Iterable[tuple[float, float]]) -> bool:
+    """
+    Whether all points are within a polygon, by ray casting.
+    """
+    edges = list(zip(polygon, polygon[1:] + polygon[:1]))
+
+    def inside(x, y):
+        crossings = 0
+        for (x0, y0), (x1, y1) in edges:
+            if (y0 > y) != (y1 > y) and\
+                    x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+                crossings += 1
+        return crossings % 2 == 1
+
+    return all(inside(x, y) for x, y in points)
+
+
+class Catalog:
+    """
+    SQLite catalog of archives.
+
+    :param path: Path of the SQLite database, created if missing.
+    :type path: str
+
+    .. automethod:: __len__
+    """
+
+    def __init__(self, path: str) -> None:
+        self.connection = connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def __len__(self) -> int:
+        return self.connection.execute(
+            "SELECT count(*) FROM products").fetchone()[0]
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def update(self, *roots: str, workers: int = None) -> int:
+        """
+        Scan directory trees and index new or modified archives, in parallel
+        processes. Records of archives no longer found under the scanned
+        trees are removed.
+
+        :param roots: Directories to scan.
+        :type roots: str
+        :param workers: Number of processes describing archives.
+        :type workers: int, optional
+
+        :return: Number of archives indexed.
+        :rtype: int
+        """
+        known = dict(self.connection.execute(
+            "SELECT path, mtime FROM products"))
+        found = {abspath(p) for root in roots for p in find_archives(root)}
+        changed = [p for p in found if known.get(p) != stat(p).st_mtime]
+
+        # Paths under the roots, not sharing a mere name prefix with them.
+        prefixes = tuple(join(abspath(root), "") for root in roots)
+        removed = [p for p in known if p.startswith(prefixes) and
+                   p not in found]
+
+        with self.connection:
+            for path in removed:
+                self._remove(path)
+        indexed = self.add(*changed, workers=workers)
+
+        logger.info("Indexed %d archives, removed %d.", indexed,
+                    len(removed))
+        return indexed
+
+    def add(self, *paths: str, workers: int = None) -> int:
+        """
+        Index archives, replacing their previous records.
+
+        :param paths: Paths of the archives.
+        :type paths: str
+        :param workers: Number of processes describing archives. With 0,
+            archives are described in the calling process.
+        :type workers: int, optional
+
+        :return: Number of archives indexed.
+        :rtype: int
+        """
+        if workers == 0:
+            products = [p for p in map(describe, paths) if p]
+        else:
+            with ProcessPoolExecutor(workers) as executor:
+                products = [p for p in executor.map(describe, paths,
+                                                    chunksize=64) if p]
+
+        with self.connection:
+            for product in products:
+                self._remove(product.path)
+                self._insert(product)
+        return len(products)
+
+    def _remove(self, path: str) -> None:
+        row = self.connection.execute(
+            "SELECT id FROM products WHERE path = ?", (path,)).fetchone()
+        if row:
+            self.connection.execute("DELETE FROM footprints WHERE id = ?",
+                                    row)
+            self.connection.execute("DELETE FROM products WHERE id = ?", row)
+
+    def _insert(self, product: Product) -> None:
+        cursor = self.connection.execute(
+            "INSERT INTO products (path, mtime, kind, platform, tile, start, "
+            "stop, footprint) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (product.path, product.mtime, product.kind, product.platform,
+             product.tile, product.start, product.stop,
+             " ".join(f"{x} {y}" for x, y in product.footprint)))
+        lons, lats = zip(*product.footprint)
+        self.connection.execute(
+            "INSERT INTO footprints VALUES (?, ?, ?, ?, ?)",
+            (cursor.lastrowid, min(lons), max(lons), min(lats), max(lats)))
+
+    def triplets(self, minutes: float
+                 ) -> Iterator[tuple[str, str, str, float]]:
+        """
+        Valid fusion triplets: L1C granules with the RBT and LST products of
+        an overpass within `minutes` of their acquisition, whose footprint
+        contains the granule footprint.
+
+        :param minutes: Maximum difference of acquisition times.
+        :type minutes: float
+
+        :return: Iterator of (L1C, RBT, LST, difference in minutes) tuples,
+            closest overpasses first for each granule.
+        :rtype: Iterator[tuple[str, str, str, float]]
+        """
+        def polygon(text):
+            coords = list(map(float, text.split()))
+            return list(zip(coords[::2], coords[1::2]))
+
+        for l1c, rbt, lst, dt, box, swath in self.connection.execute(
+                TRIPLETS, {"dt": minutes * 60}):
+            if contains(polygon(swath), polygon(box)):
+                yield l1c, rbt, lst, dt / 60
@@ -4,15 +4,91 @@ Definition of generic dataclasses and data models.
 
 from typing import Any
 # from datetime import datetime
+from io import BytesIO
+from stat import S_ISDIR, S_ISREG
 from xml.etree.ElementTree import ElementTree, Element
 from dataclasses import dataclass, field
 from osgeo.gdal import Open, Dataset
-from os.path import isdir, join, exists, isfile, dirname
+from osgeo.gdal import VSIStatL, ReadDir, VSIFOpenL, VSIFReadL, VSIFCloseL
+from osgeo.gdal import GetConfigOption, SetConfigOption
+from os.path import join, dirname, abspath
+from os.path import isdir as _isdir, isfile as _isfile, exists as _exists
 from os import PathLike as _PathLike
 
 from .gdalutils import load_unscaled_S3_data
 
 
+#: Size in bytes of the VSI cache of reads from zip archives, unless
+#: `VSI_CACHE_SIZE` is configured.
+VSI_CACHE_SIZE = 2 ** 27
+
+
+def is_vsi(path: str) -> bool:
+    """
+    Whether a path points to a GDAL virtual file system.
+    """
+    return str(path).startswith("/vsi")
+
+
+def exists(path: str) -> bool:
+    return VSIStatL(path) is not None if is_vsi(path) else _exists(path)
+
+
+def isdir(path: str) -> bool:
+    if is_vsi(path):
+        stat = VSIStatL(path)
+        return stat is not None and S_ISDIR(stat.mode)
+    return _isdir(path)
+
+
+def isfile(path: str) -> bool:
+    if is_vsi(path):
+        stat = VSIStatL(path)
+        return stat is not None and S_ISREG(stat.mode)
+    return _isfile(path)
+
+
+def read_bytes(path: str) -> bytes:
+    """
+    Read a whole file, also from GDAL virtual file systems.
+    """
+    if not is_vsi(path):
+        with open(path, "rb") as f:
+            return f.read()
+
+    handle = VSIFOpenL(path, "rb")
+    assert handle, f"{path} cannot be opened."
+    try:
+        return VSIFReadL(1, VSIStatL(path).size, handle)
+    finally:
+        VSIFCloseL(handle)
+
+
+def resolve_zip(path: str) -> str:
+    """
+    Resolve a zip archive to its `/vsizip/` path. Archives holding a single
+    top-level directory, as Sentinel downloads do, resolve to that
+    directory. Enables the VSI cache for the reads that follow.
+
+    :param path: Path of the zip archive.
+    :type path: str
+
+    :return: The `/vsizip/` path.
+    :rtype: str
+    """
+    if GetConfigOption("VSI_CACHE") is None:
+        SetConfigOption("VSI_CACHE", "TRUE")
+        SetConfigOption("VSI_CACHE_SIZE",
+                        GetConfigOption("VSI_CACHE_SIZE",
+                                        str(VSI_CACHE_SIZE)))
+
+    root = f"/vsizip/{abspath(path)}"
+    entries = [e.rstrip("/") for e in ReadDir(root) or []]
+    if len(entries) == 1 and isdir(f"{root}/{entries[0]}"):
+        return f"{root}/{entries[0]}"
+    return root
+
+
 class InconsistentFileType(Exception):
     def __init__(self, *args: object) -> None:
         super().__init__(*args)
@@ -25,6 +101,9 @@ class Pathlike(_PathLike):
 
     def __post_init__(self):
         self.path = str(self.path).rstrip("/")
+        if self.path.lower().endswith(".zip") and _isfile(self.path):
+            # Archives are read in place through `/vsizip/`.
+            self.path = resolve_zip(self.path)
         assert isinstance(self.path, str)
         assert exists(self.path), f"{self} does not exist."
 
@@ -32,6 +111,22 @@ class Pathlike(_PathLike):
         return self.path
 
 
+@dataclass
+class Reference(_PathLike):
+    """
+    Path of a file referenced by a manifest. Unlike :class:`File`, its
+    existence is only checked once it is opened, so that archives can be
+    partially staged.
+    """
+    path: str
+
+    def __str__(self) -> str:
+        return self.path
+
+    def __fspath__(self) -> Any:
+        return self.path
+
+
 @dataclass
 class File(Pathlike):
     path: str
@@ -56,7 +151,7 @@ class XML(File, ElementTree):
 
     def __post_init__(self):
         super().__post_init__()
-        self.parse(self.path)
+        self.parse(BytesIO(read_bytes(self.path)))
         self.root = self.getroot()
 
     def __getitem__(self, index: int):
@@ -1,5 +1,3 @@
-from osgeo_utils.gdal_calc import Calc
-
 from osgeo.gdal import BuildVRT, BuildVRTOptions
 from osgeo.gdal import Translate, TranslateOptions
 from osgeo.gdal import Warp, WarpOptions
@@ -12,8 +10,12 @@ from osgeo.gdal import ExtendedDataType
 from numpy import ndarray
 
 from .typing import NETCDFSubDataset, Sentinel2L1C, Sentinel3RBT
+from .typing import Sentinel3SLSTR
+from .vsimem import vsimem_path
+from ..tracing import traced
 
 
+@traced("prepare.vrt_build")
 def build_unified_dataset(*datasets: Dataset) -> Dataset:
     """
     Combine an array of datasets into a Virtual dataset.
@@ -37,12 +39,14 @@ def build_unified_dataset(*datasets: Dataset) -> Dataset:
                                                 "BLOCKYSIZE=500"])
 
     # This output has to have a path to be seeked and opened by arosics.
-    vrt = Translate(f"/vsimem/built_{len(datasets)}.vrt", vrt, options=options)
+    vrt = Translate(vsimem_path(f"built_{len(datasets)}.vrt"), vrt,
+                    options=options)
     vrt.FlushCache()
 
     return vrt
 
 
+@traced("prepare.unscale")
 def load_unscaled_S3_data(*netcdfs: NETCDFSubDataset | str) -> None:
     """
     Record unscaling as a preprocessing workflow
@@ -56,13 +60,14 @@ def load_unscaled_S3_data(*netcdfs: NETCDFSubDataset | str) -> None:
     for netcdf in netcdfs:
         # This output has to be a VRT file in order to be
         # infused with geolocation arrays.
-        ds: Dataset = Translate(f"/vsimem/unscaled_{netcdf.name}.vrt",
+        ds: Dataset = Translate(vsimem_path(f"unscaled_{netcdf.name}.vrt"),
                                 netcdf.dataset,
                                 options=options)
 
         netcdf.dataset = ds
 
 
+@traced("prepare.geolocation")
 def execute_geolocation(*netcdfs: NETCDFSubDataset):
     """
     Simply runs Warp with the geoloc switch activated.
@@ -75,7 +80,7 @@ def execute_geolocation(*netcdfs: NETCDFSubDataset):
                           srcNodata=-32768,
                           dstNodata=-32768)
     for netcdf in netcdfs:
-        netcdf.dataset = Warp(f"/vsimem/geolocated_{netcdf.name}.vrt",
+        netcdf.dataset = Warp(vsimem_path(f"geolocated_{netcdf.name}.vrt"),
                               netcdf.dataset,
                               options=options)
 
@@ -153,6 +158,7 @@ def get_bounds(dataset: Dataset) -> tuple[int]:
             transform[3])
 
 
+@traced("prepare.crop")
 def crop_sen3_geometry(sen2: Sentinel2L1C, sen3: Sentinel3RBT) -> None:
     # Bounding box of Sentinel-2 scene as (Xmin, Ymin, Xmax, Ymax) tuple.
     outputbounds = get_bounds(sen2.dataset)
@@ -166,11 +172,32 @@ def crop_sen3_geometry(sen2: Sentinel2L1C, sen3: Sentinel3RBT) -> None:
                           format="GTIFF",
                           srcNodata=-32768,
                           dstNodata=-32768)
-    sen3.dataset = Warp("/vsimem/cropped_S3.tif",
+    sen3.dataset = Warp(vsimem_path("cropped_S3.tif"),
                         sen3.dataset, options=options)
     sen3.dataset.FlushCache()
 
 
+@traced("prepare.crop")
+def crop_geographic_region(sen3: Sentinel3SLSTR,
+                           region: tuple[float, float, float, float]
+                           ) -> None:
+    """
+    Crop the geolocated Sentinel-3 scene to a geographic region, given as
+    (lon_min, lat_min, lon_max, lat_max) and clipped to the scene.
+    """
+    xmin, ymin, xmax, ymax = get_bounds(sen3.dataset)
+    options = TranslateOptions(format="VRT",
+                               projWin=(max(region[0], xmin),
+                                        min(region[3], ymax),
+                                        min(region[2], xmax),
+                                        max(region[1], ymin)),
+                               callback=TermProgress)
+    sen3.dataset = Translate(vsimem_path("swath_region.vrt"), sen3.dataset,
+                             options=options)
+    sen3.dataset.FlushCache()
+
+
+@traced("prepare.trim")
 def trim_sen3_geometry(sen3: Sentinel3RBT) -> None:
     """
     Trim Sentinel-3 geometry to ensure it is contained within the
@@ -196,6 +223,7 @@ def trim_sen3_geometry(sen3: Sentinel3RBT) -> None:
     sen3.dataset.FlushCache()
 
 
+@traced("prepare.trim")
 def trim_sen2_geometry(sen2: Sentinel2L1C, sen3: Sentinel3RBT) -> None:
     """
     Trim Sentinel-2 image geometry to match the bounding box of Sentinel-3
@@ -226,6 +254,55 @@ def create_dataset(xsize: int, ysize: int, nbands: int, *, driver: str,
     return dataset
 
 
+@traced("prepare.materialize")
+def materialize(dataset: Dataset, path: str = "", rows: int = None
+                ) -> Dataset:
+    """
+    Copy a dataset, evaluating any chain of virtual datasets it is built
+    on, into a flat raster.
+
+    :param dataset: The dataset to materialize.
+    :type dataset: gdal.Dataset
+    :param path: Path of the GeoTIFF to write, in `/vsimem/` or on disk.
+        An empty path materializes the dataset in a MEM dataset.
+    :type path: str, optional
+    :param rows: Height of the GeoTIFF strips, to match the height of the
+        tiles they are read in. Defaults to a tiled layout.
+    :type rows: int, optional
+
+    :return: The materialized dataset.
+    :rtype: gdal.Dataset
+    """
+    if not path:
+        options = TranslateOptions(format="MEM", callback=TermProgress)
+    else:
+        layout = [f"BLOCKYSIZE={rows}"] if rows else ["TILED=YES"]
+        options = TranslateOptions(format="GTiff", callback=TermProgress,
+                                   creationOptions=[*layout,
+                                                    "BIGTIFF=IF_SAFER"])
+    return Translate(path, dataset, options=options)
+
+
+def extract_band(dataset: Dataset, band: int, path: str) -> Dataset:
+    """
+    Copy a single band of a dataset into a tiled GeoTIFF.
+
+    :param dataset: The source dataset.
+    :type dataset: gdal.Dataset
+    :param band: Index of the band to copy, starting from 1.
+    :type band: int
+    :param path: Path of the GeoTIFF to write.
+    :type path: str
+
+    :return: The single band dataset.
+    :rtype: gdal.Dataset
+    """
+    options = TranslateOptions(format="GTiff", bandList=[band],
+                               callback=TermProgress,
+                               creationOptions=["TILED=YES"])
+    return Translate(path, dataset, options=options)
+
+
 def create_mem_dataset(xsize: int, ysize: int, nbands: int, *,
                        etype: int = GDT_Float32, proj: str = "",
                        geotransform: tuple[int] = (),
@@ -236,7 +313,7 @@ def create_mem_dataset(xsize: int, ysize: int, nbands: int, *,
 def get_vsi_size(dirname: str) -> dict:
     from osgeo.gdal import VSIStatL, ReadDir
 
-    files = ReadDir(dirname)
+    files = ReadDir(dirname) or []
 
     def get_size(x):
         __file = VSIStatL(x)
@@ -282,5 +359,7 @@ def set_vrt_subdataset_geolocation_domain(*netcdfs: NETCDFSubDataset):
 
 
 def apply_calculation(dataset: Dataset, calculation: str) -> Dataset:
+    from osgeo_utils.gdal_calc import Calc
+
     dataset = Calc(calc=calculation, outfile="")
     return dataset
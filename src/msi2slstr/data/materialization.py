@@ -0,0 +1,140 @@
+"""
+Materialization of the stages of input preparation.
+
+Prepared inputs are chains of virtual datasets, each read of which may
+re-evaluate the stages below it. A :class:`MaterializationPolicy` decides
+per stage whether to keep it lazy or to copy it into a flat raster, in
+memory, in `/vsimem/` or on local disk.
+"""
+from dataclasses import dataclass, field
+from logging import getLogger
+from tempfile import gettempdir
+
+from osgeo.gdal import GetDataTypeSize
+
+from .gdalutils import materialize, Dataset
+from .tiling import TileIndex
+from .vsimem import vsimem_path, registry
+from .memory import MemoryBudget
+
+
+#: Storage options of a stage. `auto` materializes stages read with a
+#: high amplification, in memory when they are small and on disk otherwise.
+STORAGES = ("lazy", "auto", "mem", "vsimem", "disk")
+
+#: Stages of input preparation a policy applies to, with the size of the
+#: tiles they are read in. Unified datasets are read by co-registration
+#: through their path and are never materialized in MEM datasets. The
+#: `sen3_swath` stage is the geolocated region of a swath shared by several
+#: granules.
+STAGES = {"sen2_unified": 500, "sen3_unified": None,
+          "sen2_input": 500, "sen3_input": 10, "sen3_swath": None}
+
+logger = getLogger(__name__)
+
+
+def parse_stage(value: str) -> tuple[str, str]:
+    """
+    Parse a `stage=storage` pair.
+    """
+    stage, _, storage = value.partition("=")
+    assert stage in STAGES, f"Unknown stage {stage}."
+    assert storage in STORAGES, f"Unknown storage {storage}."
+    return stage, storage
+
+
+def dataset_size(dataset: Dataset) -> int:
+    """
+    Size of the raster data of a dataset in bytes.
+    """
+    band = dataset.GetRasterBand(1)
+    return dataset.RasterXSize * dataset.RasterYSize * dataset.RasterCount *\
+        GetDataTypeSize(band.DataType) // 8
+
+
+@dataclass
+class MaterializationPolicy:
+    """
+    Per-stage materialization policy of the prepared inputs.
+
+    :param stages: Storage of each stage in :data:`STAGES`. Stages not
+        listed use `default`.
+    :type stages: dict[str, str], optional
+    :param default: Storage of the stages not listed, defaults to `lazy`.
+    :type default: str, optional
+    :param scratch: Directory of the stages materialized on disk. They are
+        written to a temporary directory of the scene scope, removed with it.
+    :type scratch: str, optional
+    :param threshold: Read amplification above which `auto` stages are
+        materialized, defaults to 1.25.
+    :type threshold: float, optional
+    :param mem_limit: Size in bytes up to which `auto` stages are
+        materialized in memory, defaults to 256 MiB.
+    :type mem_limit: int, optional
+    :param budget: Memory budget. Stages that would exceed it are spilled
+        to its scratch directory as tiled GeoTIFFs instead.
+    :type budget: :class:`MemoryBudget`, optional
+
+    .. automethod:: __call__
+    """
+    stages: dict[str, str] = field(
+        default_factory=lambda: {"sen3_input": "auto", "sen3_swath": "auto"})
+    default: str = field(default="lazy")
+    scratch: str = field(default_factory=gettempdir)
+    threshold: float = field(default=1.25)
+    mem_limit: int = field(default=2 ** 28)
+    budget: MemoryBudget = field(default_factory=MemoryBudget)
+
+    def __post_init__(self):
+        for stage, storage in self.stages.items():
+            parse_stage(f"{stage}={storage}")
+
+    def storage(self, stage: str, dataset: Dataset) -> str:
+        """
+        Resolve the storage of a stage of the given dataset.
+        """
+        storage = self.stages.get(stage, self.default)
+        if storage == "auto":
+            storage = self._auto(stage, dataset)
+        assert not (storage == "mem" and stage.endswith("_unified")), \
+            f"Stage {stage} cannot be materialized in a MEM dataset."
+        return storage
+
+    def _auto(self, stage: str, dataset: Dataset) -> str:
+        t_size = STAGES[stage]
+        lazy = dataset.GetDriver().ShortName == "VRT"
+        if t_size and not lazy:
+            return "lazy"
+        if t_size:
+            index = TileIndex(t_size, dataset.RasterXSize,
+                              dataset.RasterYSize,
+                              block=tuple(dataset.GetRasterBand(1)
+                                          .GetBlockSize()))
+            if index.amplification() <= self.threshold:
+                return "lazy"
+        if dataset_size(dataset) > self.mem_limit:
+            return "disk"
+        return "vsimem" if stage.endswith("_unified") else "mem"
+
+    def __call__(self, stage: str, obj) -> None:
+        """
+        Apply the policy to the dataset of `obj` at the given stage,
+        replacing it with its materialized copy.
+        """
+        storage = self.storage(stage, obj.dataset)
+        if storage == "lazy":
+            return
+
+        name = f"materialized_{stage}.tif"
+        rows = STAGES[stage]
+        spill = storage != "disk" and\
+            self.budget.spill_path(name, dataset_size(obj.dataset))
+        if spill:
+            path, rows = spill, None
+        else:
+            path = {"mem": "",
+                    "vsimem": vsimem_path(name),
+                    "disk": registry.scratch_path(self.scratch, name)
+                    }[storage]
+        logger.info("Materializing %s to %s.", stage, path or storage)
+        obj.dataset = materialize(obj.dataset, path, rows=rows)
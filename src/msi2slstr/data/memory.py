@@ -0,0 +1,224 @@
+"""
+Memory budget of a fusion run.
+
+A single budget sizes the GDAL block cache and the batch size, decides
+whether intermediates fit in memory or spill to a scratch directory, and
+records the peak resident memory of each stage of the run.
+"""
+from contextlib import contextmanager
+from dataclasses import dataclass, field, replace
+from logging import getLogger
+from os import sysconf
+from resource import getrusage, RUSAGE_SELF
+from tempfile import gettempdir
+from threading import Thread, Event
+from collections.abc import Iterator
+
+
+#: Size suffixes accepted by :func:`parse_size`.
+UNITS = {"": 1, "K": 2 ** 10, "M": 2 ** 20, "G": 2 ** 30, "T": 2 ** 40}
+
+#: Working memory of inference per byte of model input and output.
+INFERENCE_FACTOR = 4
+
+logger = getLogger(__name__)
+
+
+def parse_size(value: str) -> int:
+    """
+    Parse a size in bytes with an optional binary suffix, e.g. `12G`.
+    """
+    value = value.strip().upper().removesuffix("B").removesuffix("I")
+    unit = value[-1:] if value[-1:] in UNITS else ""
+    size = float(value.removesuffix(unit))
+    assert size > 0, "Size has to be positive."
+    return int(size * UNITS[unit])
+
+
+def current_rss() -> int:
+    """
+    Resident memory of the process in bytes.
+    """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    """
+    Peak resident memory of the process in bytes.
+    """
+    return getrusage(RUSAGE_SELF).ru_maxrss * 1024
+
+
+@dataclass
+class StagePeak:
+    """
+    Resident memory around a stage of the run, in bytes.
+    """
+    name: str = field()
+    start: int = field()
+    peak: int = field(default=0)
+    end: int = field(default=0)
+
+
+@dataclass
+class MemoryBudget:
+    """
+    Memory budget of a run.
+
+    :param limit: Budget in bytes. Without a limit nothing is constrained
+        and stage peaks are still recorded.
+    :type limit: int, optional
+    :param cache_fraction: Fraction of the budget given to the GDAL block
+        cache, defaults to 0.25.
+    :type cache_fraction: float, optional
+    :param scratch: Directory intermediates spill to.
+    :type scratch: str, optional
+    :param interval: Sampling interval of the stage peaks in seconds,
+        defaults to 0.05.
+    :type interval: float, optional
+    :param shares: Number of concurrent runs the budget is split across,
+        defaults to 1. See :meth:`share`.
+    :type shares: int, optional
+    :param baseline: Resident memory of the process when it is idle, in
+        bytes, which shares are split from. Recorded by :meth:`configure`.
+    :type baseline: int, optional
+    """
+    limit: int = field(default=None)
+    cache_fraction: float = field(default=.25)
+    scratch: str = field(default_factory=gettempdir)
+    interval: float = field(default=.05)
+    shares: int = field(default=1)
+    baseline: int = field(default=None)
+    #: Bytes of the intermediates held in memory by a share.
+    used: int = field(default=0, init=False)
+    stages: list[StagePeak] = field(default_factory=list, init=False)
+
+    @property
+    def cache_max(self) -> int | None:
+        """
+        Size of the GDAL block cache in bytes.
+        """
+        if self.limit is None:
+            return None
+        return int(self.limit * self.cache_fraction)
+
+    def configure(self) -> None:
+        """
+        Set the GDAL block cache size from the budget, and record the
+        resident memory of the idle process for its shares.
+        """
+        self.baseline = current_rss()
+        if self.limit is None:
+            return
+        from osgeo.gdal import SetCacheMax
+
+        SetCacheMax(self.cache_max)
+        logger.info("GDAL cache set to %d MiB.", self.cache_max // 2 ** 20)
+
+    def share(self, n: int) -> "MemoryBudget":
+        """
+        Share of the budget for one of `n` runs in the process. The GDAL
+        block cache is process-wide and is configured once, from the whole
+        budget; each share gets an n-th of the memory left besides it and
+        the idle process, less the intermediates it holds itself.
+
+        The resident memory of the process includes that of the other
+        runs, so shares account for their own intermediates instead.
+        """
+        assert n > 0, "Number of shares has to be positive."
+        return replace(self, shares=n,
+                       baseline=self.baseline or current_rss())
+
+    def available(self) -> int | None:
+        """
+        Bytes left in the budget, or in the share of the budget, besides
+        the GDAL block cache.
+        """
+        if self.limit is None:
+            return None
+        if self.shares == 1:
+            return max(self.limit - self.cache_max - current_rss(), 0)
+        share = (self.limit - self.cache_max - self.baseline) // self.shares
+        return max(share - self.used, 0)
+
+    def fits(self, nbytes: int) -> bool:
+        """
+        Whether an allocation of `nbytes` fits in the budget.
+        """
+        return self.limit is None or nbytes <= self.available()
+
+    def spill_path(self, name: str, nbytes: int) -> str | None:
+        """
+        Path in the scratch directory for an intermediate of `nbytes` that
+        does not fit in the budget, or None when it does. Spills are unique
+        to the active scene scope and are removed when it closes.
+        """
+        if self.fits(nbytes):
+            self.used += nbytes
+            return None
+        from .vsimem import registry
+
+        logger.info("Spilling %s (%d MiB) to %s.", name, nbytes // 2 ** 20,
+                    self.scratch)
+        return registry.scratch_path(self.scratch, name)
+
+    def batch_size(self, tile_bytes: int, default: int = 1,
+                   maximum: int = 16) -> int:
+        """
+        Largest batch size whose inference working memory fits in the
+        budget.
+
+        :param tile_bytes: Bytes of the inputs and output of one tile.
+        :type tile_bytes: int
+        :param default: Batch size without a limit, defaults to 1.
+        :type default: int, optional
+        :param maximum: Upper bound of the batch size, defaults to 16.
+        :type maximum: int, optional
+
+        :rtype: int
+        """
+        if self.limit is None:
+            return default
+        batch = self.available() // (tile_bytes * INFERENCE_FACTOR)
+        return int(min(max(batch, 1), maximum))
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[StagePeak]:
+        """
+        Record the peak resident memory during a stage, sampled in a
+        background thread.
+        """
+        record = StagePeak(name, current_rss())
+        record.peak = record.start
+        done = Event()
+
+        def sample():
+            while not done.wait(self.interval):
+                record.peak = max(record.peak, current_rss())
+
+        sampler = Thread(target=sample, daemon=True)
+        sampler.start()
+        try:
+            yield record
+        finally:
+            done.set()
+            sampler.join()
+            record.end = current_rss()
+            record.peak = max(record.peak, record.end)
+            self.stages.append(record)
+
+    def report(self) -> None:
+        """
+        Log the peak resident memory of each recorded stage.
+        """
+        for record in self.stages:
+            logger.info("Stage %s: peak %d MiB (%d MiB at start, %d MiB at "
+                        "end).", record.name, record.peak // 2 ** 20,
+                        record.start // 2 ** 20, record.end // 2 ** 20)
+            if self.limit is not None and record.peak > self.limit:
+                logger.warning("Stage %s exceeded the memory budget of "
+                               "%d MiB.", record.name, self.limit // 2 ** 20)
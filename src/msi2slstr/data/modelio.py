@@ -1,43 +1,165 @@
 from collections.abc import Generator
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy
 from dataclasses import dataclass, field
 from osgeo.gdal import Dataset
 from osgeo.gdal_array import NumericTypeCodeToGDALTypeCode
-from numpy import dtype, ndarray, float32
+from numpy import dtype, ndarray, float32, nan, pad
 from typing import Sequence
 
 from .sentinel2 import Sentinel2L1C
 from .sentinel3 import Sentinel3SLSTR, Sentinel3RBT, Sentinel3LST
 from .gdalutils import crop_sen3_geometry
+from .gdalutils import crop_geographic_region
 from .gdalutils import trim_sen3_geometry
 from .gdalutils import trim_sen2_geometry
 from .gdalutils import create_dataset
+from .gdalutils import extract_band
+from .gdalutils import materialize
+from .tiling import TileIndex, ReadCounter
+from .materialization import MaterializationPolicy
+from .vsimem import registry, vsimem_path
 
-from ..align.corregistration import corregister_datasets
+from ..align.corregistration import corregister_datasets, REFERENCE_BAND
 from ..metadata.abc import Metadata
+from ..evaluation.scene import QualityMaps
+from ..tracing import tracer, traced
+
+
+@dataclass
+class DatasetProduct:
+    """
+    Input given as a unified GDAL dataset instead of an archive, e.g. one
+    held in memory by the caller. Datasets without a path are copied to
+    `/vsimem/`, as co-registration opens its inputs by path.
+    """
+    dataset: Dataset = field()
+
+    def __post_init__(self):
+        if not self.dataset.GetDescription():
+            self.dataset = materialize(self.dataset,
+                                       vsimem_path("dataset_product.tif"))
+
+
+@dataclass
+class Sentinel2Reference:
+    """
+    Sentinel-2 side of the inputs, prepared once to be fused with several
+    Sentinel-3 scenes: the unified dataset and a flat copy of the band that
+    co-registration matches on.
+
+    :param sen2: Path of the L1C archive.
+    :type sen2: str
+    :param policy: Materialization policy of the unified dataset.
+    :type policy: :class:`MaterializationPolicy`, optional
+    """
+    sen2: Sentinel2L1C = field()
+    policy: MaterializationPolicy = field(
+        default_factory=MaterializationPolicy, repr=False)
+    match: Dataset = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.sen2 = Sentinel2L1C(self.sen2)
+        self.policy("sen2_unified", self.sen2)
+        self.match = extract_band(self.sen2.dataset, REFERENCE_BAND,
+                                  vsimem_path("match_band.tif"))
+
+
+@dataclass
+class Sentinel3Reference:
+    """
+    Sentinel-3 side of the inputs, prepared once to be fused with several
+    Sentinel-2 granules: the unified dataset, cropped to the geographic
+    region of the granules and materialized according to the `sen3_swath`
+    stage of `policy`, so that the swath is geolocated once.
+
+    :param sen3rbt: Path of the RBT archive.
+    :type sen3rbt: str
+    :param sen3lst: Path of the LST archive.
+    :type sen3lst: str
+    :param policy: Materialization policy of the swath.
+    :type policy: :class:`MaterializationPolicy`, optional
+    :param region: Geographic bounds of the granules as (lon_min, lat_min,
+        lon_max, lat_max). Defaults to the full swath.
+    :type region: tuple[float, float, float, float], optional
+    """
+    sen3rbt: Sentinel3RBT = field()
+    sen3lst: Sentinel3LST = field()
+    policy: MaterializationPolicy = field(
+        default_factory=MaterializationPolicy, repr=False)
+    region: tuple[float, float, float, float] = field(default=None)
+    sen3: Sentinel3SLSTR = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.sen3 = Sentinel3SLSTR(self.sen3rbt, self.sen3lst)
+        self.policy("sen3_unified", self.sen3)
+        if self.region is not None:
+            crop_geographic_region(self.sen3, self.region)
+        self.policy("sen3_swath", self.sen3)
 
 
 @dataclass
 class ModelInput:
+    """
+    Prepares the input scene triplet. Preparation stages are materialized
+    according to `policy`. With a `reference`, its prepared Sentinel-2 side
+    is reused and `sen2` is ignored, and with a `swath`, its prepared
+    Sentinel-3 side is reused and `sen3rbt` and `sen3lst` are ignored.
+
+    Either side may also be given as a unified GDAL dataset: `sen2` with the
+    13 Sentinel-2 bands, and `sen3rbt` with the 11 RBT bands followed by
+    LST, geolocated, in which case `sen3lst` is ignored.
+    """
     sen2: Sentinel2L1C = field()
     sen3: Sentinel3SLSTR = field(init=False)
     sen3rbt: Sentinel3RBT = field(repr=False)
     sen3lst: Sentinel3LST = field(repr=False)
+    policy: MaterializationPolicy = field(
+        default_factory=MaterializationPolicy, repr=False)
+    reference: Sentinel2Reference = field(default=None, repr=False)
+    swath: Sentinel3Reference = field(default=None, repr=False)
 
     def __post_init__(self):
-        self.sen2 = Sentinel2L1C(self.sen2)
-        self.sen3 = Sentinel3SLSTR(self.sen3rbt, self.sen3lst)
+        # Both branches are prepared concurrently up to the cropping, which
+        # is the first step that needs both. Shared sides are copied, as the
+        # following steps replace the dataset of the copy only.
+        prepare = registry.bind(self.__prepare__)
+        with ThreadPoolExecutor(2) as executor:
+            sen2 = executor.submit(copy, self.reference.sen2)\
+                if self.reference else\
+                executor.submit(prepare, Sentinel2L1C, "sen2_unified",
+                                self.sen2)
+            sen3 = executor.submit(copy, self.swath.sen3)\
+                if self.swath else\
+                executor.submit(prepare, Sentinel3SLSTR, "sen3_unified",
+                                self.sen3rbt, self.sen3lst)
+            self.sen2, self.sen3 = sen2.result(), sen3.result()
+
         crop_sen3_geometry(self.sen2, self.sen3)
-        corregister_datasets(self.sen2, self.sen3)
+        corregister_datasets(self.sen2, self.sen3,
+                             self.reference and self.reference.match)
         trim_sen3_geometry(self.sen3)
         trim_sen2_geometry(self.sen2, self.sen3)
+        self.policy("sen2_input", self.sen2)
+        self.policy("sen3_input", self.sen3)
 
         del self.sen3rbt, self.sen3lst
 
+    def __prepare__(self, product: type, stage: str, *paths):
+        prepared = DatasetProduct(paths[0]) if isinstance(paths[0], Dataset)\
+            else product(*paths)
+        self.policy(stage, prepared)
+        return prepared
+
 
 @dataclass
 class ModelOutput:
     """
     Defines the output and provides a method for data writing.
+
+    Tiles are placed according to `index`, which defaults to the row-major
+    index of full `t_size` tiles. Halo and padding of the written tiles are
+    cropped.
     """
     dataset: Dataset = field(init=False)
     geotransform: tuple[int, int, int, int, int, int] =\
@@ -49,6 +171,7 @@ class ModelOutput:
     nbands: int = field()
     t_size: int = field()
     d_type: dtype = field(default=float32)
+    index: TileIndex = field(default=None)
 
     def __post_init__(self):
         assert len(self.geotransform) == 6
@@ -61,10 +184,9 @@ class ModelOutput:
                                       geotransform=self.geotransform,
                                       proj=self.projection,
                                       options=[])
-        self._coords_generator = get_array_coords_generator(t_size=self.t_size,
-                                                            sizex=self.xsize,
-                                                            sizey=self.ysize
-                                                            ).__next__
+        if self.index is None:
+            self.index = TileIndex(self.t_size, self.xsize, self.ysize)
+        self._tiles = iter(range(len(self.index))).__next__
 
     def write_tiles(self, payload: ndarray):
         """
@@ -75,8 +197,9 @@ class ModelOutput:
         :type payload: `numpy.ndarray`
         """
         for tile in payload:
-            coords = self._coords_generator()
-            self.dataset.WriteArray(tile, *coords[:2],
+            i = self._tiles()
+            self.dataset.WriteArray(tile[(..., *self.index.core(i))],
+                                    *self.index[i][:2],
                                     range(1, self.nbands + 1),)
 
     def write_metadata(self, m_list: list[Metadata]):
@@ -99,14 +222,65 @@ class ModelOutput:
         :param m_list: List of metadata objects to write.
         :type m_list: `list`
         """
-        for metadata in m_list:
-            for key, band_values in metadata.content.items():
-                for nband, value in zip(range(1, self.dataset.RasterCount + 1),
-                                        band_values, strict=True):
-                    # SetMetadataItem needs to be used to
-                    # avoid overwriting domain.
-                    self.dataset.GetRasterBand(nband)\
-                                .SetMetadataItem(key, str(value))
+        write_band_metadata(self.dataset, m_list)
+
+
+def write_band_metadata(dataset: Dataset, m_list: list[Metadata]):
+    """
+    Write metadata to each band of a dataset separately.
+
+    This function expects an array of values per metadata key,
+    of equal length as the count of rasters in the dataset.
+
+    :param dataset: The dataset to write to.
+    :type dataset: `gdal.Dataset`
+    :param m_list: List of metadata objects to write.
+    :type m_list: `list`
+    """
+    for metadata in m_list:
+        for key, band_values in metadata.content.items():
+            for nband, value in zip(range(1, dataset.RasterCount + 1),
+                                    band_values, strict=True):
+                # SetMetadataItem needs to be used to
+                # avoid overwriting domain.
+                dataset.GetRasterBand(nband).SetMetadataItem(key, str(value))
+
+
+def write_quality_maps(name: str, maps: QualityMaps,
+                       geotransform: tuple[int, int, int, int, int, int],
+                       projection: str) -> Dataset:
+    """
+    Write quality maps to a GeoTIFF on the grid they were evaluated on, with
+    one band per metric and channel. Bands are described as
+    `<metric>_<channel>`.
+
+    :param name: Path of the raster to create.
+    :type name: str
+    :param maps: The assembled quality maps.
+    :type maps: :class:`QualityMaps`
+
+    :return: The written dataset.
+    :rtype: `gdal.Dataset`
+    """
+    nmetrics, nbands, ysize, xsize = maps.maps.shape
+    dataset = create_dataset(xsize=xsize, ysize=ysize,
+                             nbands=nmetrics * nbands,
+                             driver="GTiff",
+                             name=name,
+                             etype=NumericTypeCodeToGDALTypeCode(float32),
+                             geotransform=geotransform,
+                             proj=projection,
+                             options=["COMPRESS=DEFLATE"])
+
+    for m, (metric, values) in enumerate(maps.items()):
+        for channel, array in enumerate(values, 1):
+            band = dataset.GetRasterBand(m * nbands + channel)
+            band.WriteArray(array)
+            band.SetNoDataValue(nan)
+            band.SetDescription(f"{metric}_{channel}")
+
+    dataset.FlushCache()
+    return dataset
 
 
 def get_array_coords_generator(
@@ -119,10 +293,7 @@ def get_array_coords_generator(
         in terms of array elements.
     :rtype: Generator
     """
-    xtiles = sizex // t_size
-    ytiles = sizey // t_size
-    return ((i % xtiles * t_size, i // ytiles * t_size, t_size, t_size)
-            for i in range(xtiles * ytiles))
+    return iter(TileIndex(t_size, sizex, sizey))
 
 
 @dataclass
@@ -132,29 +303,47 @@ class TileGenerator:
 
     :param d_tile: The dimensions of the tiles to be produced an int.
     :type d_tiles: Int
+    :param index: The tile index to follow, defaults to the row-major index
+        of full tiles.
+    :type index: :class:`TileIndex`, optional
 
+    Reads are counted in :attr:`counter`.
     """
     d_tile: tuple[int] = field()
     dataset: Dataset = field()
     batch_size: int = field(default=1)
+    index: TileIndex = field(default=None)
+    counter: ReadCounter = field(default_factory=ReadCounter, init=False)
 
     def __post_init__(self):
-        self.coords = get_array_coords_generator(self.d_tile,
-                                                 self.dataset.RasterXSize,
-                                                 self.dataset.RasterYSize)
+        if self.index is None:
+            self.index = TileIndex(self.d_tile,
+                                   self.dataset.RasterXSize,
+                                   self.dataset.RasterYSize,
+                                   block=tuple(self.dataset.GetRasterBand(1)
+                                               .GetBlockSize()))
         self.__batches__ = range(0, len(self), self.batch_size)
 
     def __iter__(self):
-        return (self.__get_batch__() for _ in self.__batches__)
+        return (self.__get_batch__(i) for i in self.__batches__)
 
-    def __get_batch__(self):
+    @traced("tile.read")
+    def __get_batch__(self, start: int):
         # Extract an array-tuple of size `batch_size` at a time.
-        return tuple(self.dataset.ReadAsArray(*coords) for _, coords
-                     in zip(range(self.batch_size), self.coords))
+        return tuple(self.__get_tile__(i) for i in
+                     range(start, min(start + self.batch_size, len(self))))
+
+    def __get_tile__(self, i: int):
+        window, padding = self.index.read_window(i)
+        tile = self.dataset.ReadAsArray(*window)
+        self.counter.update(self.index, i)
+        tracer.count("bytes_read", tile.nbytes)
+        if any(map(any, padding)):
+            tile = pad(tile, ((0, 0),) * (tile.ndim - 2) + padding)
+        return tile
 
     def __len__(self):
-        return self.dataset.RasterXSize * self.dataset.RasterYSize\
-            // self.d_tile // self.d_tile
+        return len(self.index)
 
 
 @dataclass
@@ -0,0 +1,115 @@
+"""
+Re-evaluation of written fusion products against their Sentinel-3 inputs,
+without running inference again.
+"""
+from collections.abc import Iterator
+from copy import copy
+from dataclasses import dataclass, field
+
+from osgeo.gdal import Dataset, Open, GA_Update
+from numpy import ndarray, float32
+
+from .dataclasses import File
+from .sentinel3 import Sentinel3SLSTR
+from .gdalutils import crop_sen3_geometry
+from .modelio import write_band_metadata
+
+from ..metadata.quality import FusionQualityMetadata
+from ..transform.resizing import ValidAverageDownsampling
+
+
+@dataclass
+class Product(File):
+    """
+    A fused `M2S_*.tif` product, opened for update.
+    """
+    dataset: Dataset = field(init=False)
+
+    def __post_init__(self):
+        super().__post_init__()
+        self.dataset = Open(self.path, GA_Update)
+
+
+def read_tile_row(dataset: Dataset, row: int, t_size: int) -> ndarray:
+    """
+    Read a row of full tiles of a dataset in one request.
+
+    :return: Array of shape (N, C, t_size, t_size) with the tiles of the row
+        in order.
+    :rtype: `ndarray`
+    """
+    xtiles = dataset.RasterXSize // t_size
+    strip = dataset.ReadAsArray(0, row * t_size, xtiles * t_size, t_size)
+    strip = strip.reshape(dataset.RasterCount, t_size, xtiles, t_size)
+    return strip.transpose(2, 0, 1, 3)
+
+
+def iter_tile_pairs(product: Dataset, sen3: Dataset, t_size: int = 500
+                    ) -> Iterator[tuple[ndarray, ndarray]]:
+    """
+    Iterate over the rows of tiles of a product and of the co-located
+    Sentinel-3 grid.
+
+    Each row of tiles is read as a single strip spanning the product width,
+    which covers whole blocks of the strip-organized GeoTIFFs written by
+    :class:`ModelOutput`. The tile grid is the one the product was written
+    in, so remainder pixels at its edges are not visited.
+
+    :param product: The fused product.
+    :type product: `gdal.Dataset`
+    :param sen3: The Sentinel-3 grid aligned to the product.
+    :type sen3: `gdal.Dataset`
+    :param t_size: Tile size of the product, defaults to 500.
+    :type t_size: int, optional
+
+    :return: Iterator of product and Sentinel-3 tile rows.
+    :rtype: Iterator[tuple[ndarray, ndarray]]
+    """
+    scale = round(sen3.GetGeoTransform()[1] / product.GetGeoTransform()[1])
+    assert t_size % scale == 0, "Tiles not aligned to the Sentinel-3 grid."
+
+    for row in range(product.RasterYSize // t_size):
+        yield (read_tile_row(product, row, t_size),
+               read_tile_row(sen3, row, t_size // scale))
+
+
+def evaluate_product(product: Product, sen3: Sentinel3SLSTR,
+                     t_size: int = 500, every: int = 1
+                     ) -> FusionQualityMetadata:
+    """
+    Score a fused product against the Sentinel-3 scene it was fused with and
+    write the fusion quality metadata back to its bands.
+
+    The Sentinel-3 scene is warped on the 500m grid aligned to the product
+    bounds, in the same manner it was cropped before fusion. Co-registration
+    shifts applied during fusion are not reproduced.
+
+    :param product: The fused product.
+    :type product: :class:`Product`
+    :param sen3: The unified Sentinel-3 scene. It is left unchanged.
+    :type sen3: :class:`Sentinel3SLSTR`
+    :param t_size: Tile size of the product, defaults to 500.
+    :type t_size: int, optional
+    :param every: Evaluate every n-th row of tiles only, defaults to 1.
+    :type every: int, optional
+
+    :return: The collected fusion quality metadata.
+    :rtype: :class:`FusionQualityMetadata`
+    """
+    grid = copy(sen3)
+    crop_sen3_geometry(product, grid)
+
+    scale = round(grid.dataset.GetGeoTransform()[1] /
+                  product.dataset.GetGeoTransform()[1])
+    downsample = ValidAverageDownsampling(scale)
+    qualitymeta = FusionQualityMetadata(every=every)
+
+    for Y_hat, sen3tile in iter_tile_pairs(product.dataset, grid.dataset,
+                                           t_size):
+        # As in fusion, Sentinel-3 values are clipped to a minimum of 0.
+        sen3tile = sen3tile.astype(float32).clip(0, None)
+        qualitymeta.evaluate(sen3tile, downsample(Y_hat))
+
+    write_band_metadata(product.dataset, [qualitymeta])
+    product.dataset.FlushCache()
+    return qualitymeta
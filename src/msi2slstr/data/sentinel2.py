@@ -6,9 +6,10 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from osgeo.gdal import Dataset
 
-from .dataclasses import Archive, Image, File, XML
+from .dataclasses import Archive, Image, File, XML, Reference
 from .dataclasses import InconsistentFileType
 from .gdalutils import build_unified_dataset
+from ..tracing import tracer
 
 from ..config import get_sen2name_length
 
@@ -40,15 +41,16 @@ class SAFE(Archive):
             raise InconsistentFileType(
                 f"{SAFE_archive_name} File does not follow naming convention.")
 
-        self.manifest = XML(join(self, "manifest.safe"))
+        with tracer.span("prepare.safe_parse"):
+            self.manifest = XML(join(self, "manifest.safe"))
 
-        __file_locations = [
-            # Index 2 holds the `dataObjectSection` of the manifest.
-            File(join(self, p[0][0].get("href")))
-            for p in self.manifest.root[2]
-        ]
+            __file_locations = [
+                # Index 2 holds the `dataObjectSection` of the manifest.
+                Reference(join(self, p[0][0].get("href")))
+                for p in self.manifest.root[2]
+            ]
 
-        self.MTD_file = XML(__file_locations[0])
+            self.MTD_file = XML(__file_locations[0])
 
         __imgdata = filter(lambda x: "IMG_DATA" in x.path, __file_locations)
 
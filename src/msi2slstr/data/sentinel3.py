@@ -2,14 +2,17 @@
 Module of Sentinel-3 related dataclasses and validation methods.
 """
 
+from concurrent.futures import ThreadPoolExecutor
 from os.path import join, split
 from dataclasses import dataclass, field
-from .dataclasses import NETCDFSubDataset, Archive, File, XML
+from .dataclasses import NETCDFSubDataset, Archive, File, XML, Reference
 from .gdalutils import load_unscaled_S3_data
 from .gdalutils import execute_geolocation
 from .gdalutils import build_unified_dataset
 from .gdalutils import Dataset
 from .gdalutils import set_vrt_subdataset_geolocation_domain
+from .vsimem import registry
+from ..tracing import tracer
 
 
 from ..config import get_sen3name_length
@@ -54,12 +57,14 @@ class SEN3(Archive):
         Instantiates metadata XML and collects data files.
         """
         super().__post_init__()
-        self.xfdumanifest = XML(join(self, "xfdumanifest.xml"))
+        with tracer.span("prepare.sen3_parse"):
+            self.xfdumanifest = XML(join(self, "xfdumanifest.xml"))
 
         self.data_files = [
             # Index 2 returns the `dataObject` section where filepaths
             # are kept.
-            File(join(self, e[0][0].get("href"))) for e in self.xfdumanifest[2]
+            Reference(join(self, e[0][0].get("href")))
+            for e in self.xfdumanifest[2]
         ]
 
         # Create array of booleans for filtering out band files.
@@ -122,9 +127,13 @@ class Sentinel3SLSTR:
     dataset: Dataset = field(init=False)
 
     def __post_init__(self):
-
-        RBT = Sentinel3RBT(self.sen3rbt_path)
-        LST = Sentinel3LST(self.sen3lst_path)
+        # The two archives are independent until they are unified.
+        with ThreadPoolExecutor(2) as executor:
+            RBT, LST = (executor.submit(registry.bind(product), path)
+                        for product, path in
+                        ((Sentinel3RBT, self.sen3rbt_path),
+                         (Sentinel3LST, self.sen3lst_path)))
+            RBT, LST = RBT.result(), LST.result()
 
         # Collect bands for passing to uni-dataset builder.
         bands = [*RBT.bands, *LST.bands]
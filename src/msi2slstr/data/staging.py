@@ -0,0 +1,166 @@
+"""
+Staging of input archives from shared file systems to local scratch.
+
+Only the manifest and the files read during preparation are staged: the
+metadata and band images of SAFE archives, and the band and geodetic NetCDF
+files of SEN3 archives. Files are either copied, in parallel streams, or
+prefetched in place with `posix_fadvise`.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from logging import getLogger
+from os import makedirs, open as os_open, close, O_RDONLY
+from os import posix_fadvise, POSIX_FADV_WILLNEED
+from os.path import join, split, dirname, relpath, getsize
+from shutil import copyfile
+from tempfile import TemporaryDirectory, gettempdir
+from time import perf_counter
+from collections.abc import Iterator
+
+from osgeo.gdal import VSIFOpenL, VSIFReadL, VSIFCloseL, VSIStatL
+
+from .dataclasses import XML, Dir, is_vsi, isfile
+from .sentinel3 import Sentinel3RBT, Sentinel3LST
+from ..tracing import tracer
+
+
+#: Staging modes.
+MODES = ("copy", "fadvise")
+
+#: Size of the chunks copied out of GDAL virtual file systems.
+CHUNK = 2 ** 23
+
+#: Manifest file name of each archive type.
+MANIFESTS = ("manifest.safe", "xfdumanifest.xml")
+
+logger = getLogger(__name__)
+
+
+def _is_read(path: str) -> bool:
+    """
+    Whether a file referenced by a manifest is read during preparation.
+    """
+    name = split(path)[-1]
+    if "IMG_DATA" in path:
+        return name.endswith(".jp2")
+    return name.startswith("geodetic_") or\
+        any(name.endswith(f"{band}.nc") for band in
+            (*Sentinel3RBT._bnames, *Sentinel3LST._bnames))
+
+
+def referenced_files(archive: str) -> list[str]:
+    """
+    Paths, relative to the archive, of its manifest and of the files it
+    references that are read during preparation.
+
+    :param archive: Path of a SAFE or SEN3 archive.
+    :type archive: str
+
+    :rtype: list[str]
+    :raises FileNotFoundError: When the archive has no manifest.
+    """
+    manifests = [name for name in MANIFESTS if isfile(join(archive, name))]
+    if not manifests:
+        raise FileNotFoundError(f"No SAFE or SEN3 manifest in {archive}.")
+    manifest = manifests[0]
+    # Index 2 holds the data object section in both manifest types.
+    hrefs = [e[0][0].get("href") for e in XML(join(archive, manifest))[2]]
+    # The first data object of SAFE archives is their metadata file.
+    metadata = hrefs[:1] if manifest == MANIFESTS[0] else []
+    return [manifest, *(relpath(join(archive, href), archive) for href
+                        in metadata + [h for h in hrefs[len(metadata):]
+                                       if _is_read(h)])]
+
+
+def copy_file(source: str, target: str) -> int:
+    """
+    Copy a file, also out of GDAL virtual file systems.
+
+    :return: Number of bytes copied.
+    :rtype: int
+    """
+    makedirs(dirname(target), exist_ok=True)
+    if not is_vsi(source):
+        copyfile(source, target)
+        return getsize(target)
+
+    handle = VSIFOpenL(source, "rb")
+    try:
+        with open(target, "wb") as f:
+            for _ in range(0, VSIStatL(source).size, CHUNK):
+                f.write(VSIFReadL(1, CHUNK, handle))
+    finally:
+        VSIFCloseL(handle)
+    return getsize(target)
+
+
+def prefetch_file(path: str) -> int:
+    """
+    Advise the kernel to read a file ahead into the page cache.
+
+    :return: Size of the file in bytes.
+    :rtype: int
+    """
+    fd = os_open(path, O_RDONLY)
+    try:
+        posix_fadvise(fd, 0, 0, POSIX_FADV_WILLNEED)
+    finally:
+        close(fd)
+    return getsize(path)
+
+
+@contextmanager
+def stage(*archives: Dir, mode: str = "copy", scratch: str = None,
+          streams: int = 4) -> Iterator[tuple[Dir]]:
+    """
+    Stage input archives for the duration of the context.
+
+    With `copy`, archives are copied under a temporary directory in
+    `scratch`, each in a directory of its own and keeping its name, and
+    the copies are removed on exit.
+    With `fadvise`, files are prefetched in place and the archives are
+    returned unchanged; archives in GDAL virtual file systems cannot be
+    prefetched and are left as they are.
+
+    :param archives: The archives to stage.
+    :type archives: :class:`Dir`
+    :param mode: One of :data:`MODES`, defaults to `copy`.
+    :type mode: str, optional
+    :param scratch: Local directory to copy to, defaults to the temporary
+        directory of the system.
+    :type scratch: str, optional
+    :param streams: Number of files staged in parallel, defaults to 4.
+    :type streams: int, optional
+
+    :return: The staged archives, in the given order.
+    :rtype: Iterator[tuple[Dir]]
+    """
+    assert mode in MODES, f"Unknown staging mode {mode}."
+    with TemporaryDirectory(prefix="msi2slstr_", dir=scratch or gettempdir()
+                            ) as tmp:
+        jobs, staged = [], []
+        for i, archive in enumerate(archives):
+            # Archives of the same name from different locations do not
+            # overwrite each other.
+            target = join(tmp, str(i), split(archive.path)[-1])
+            files = referenced_files(archive)
+            if mode == "copy":
+                jobs += [(copy_file, join(archive, f), join(target, f))
+                         for f in files]
+                staged.append(target)
+            else:
+                if not is_vsi(archive):
+                    jobs += [(prefetch_file, join(archive, f))
+                             for f in files]
+                staged.append(archive.path)
+
+        start = perf_counter()
+        with ThreadPoolExecutor(streams) as executor:
+            size = sum(executor.map(lambda job: job[0](*job[1:]), jobs))
+        elapsed = perf_counter() - start
+        tracer.count("bytes_staged", size)
+        logger.info("Staged %d files (%d MiB) in %.1f s at %.1f MiB/s.",
+                    len(jobs), size // 2 ** 20, elapsed,
+                    size / 2 ** 20 / max(elapsed, 1e-9))
+
+        yield tuple(Dir(path) for path in staged)
@@ -0,0 +1,244 @@
+"""
+Tile index shared by the readers and writers of a scene.
+
+A :class:`TileIndex` defines the tile grid of a raster, the window of each
+tile with an optional halo, the padding of the tiles at the raster edges and
+the order in which tiles are visited. Indices of rasters at different
+resolutions are derived from each other with :meth:`TileIndex.scaled`, so
+that their tiles correspond one to one.
+"""
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+
+from numpy import ndarray, arange, indices, stack, where, zeros, intp
+
+
+#: Tile traversal orders.
+ORDERS = ("row", "serpentine", "hilbert")
+
+
+def hilbert_order(xtiles: int, ytiles: int) -> ndarray:
+    """
+    Tile positions of a `xtiles` by `ytiles` grid along a Hilbert curve.
+
+    :return: Array of (column, row) pairs of shape (xtiles * ytiles, 2).
+    :rtype: `ndarray`
+    """
+    n = 1
+    while n < max(xtiles, ytiles):
+        n *= 2
+
+    # Vectorized conversion of curve distances to coordinates.
+    d = arange(n * n)
+    x = zeros(n * n, dtype=intp)
+    y = zeros(n * n, dtype=intp)
+    s = 1
+    while s < n:
+        rx = 1 & (d // 2)
+        ry = 1 & (d ^ rx)
+        flip = (ry == 0) & (rx == 1)
+        x = where(flip, s - 1 - x, x)
+        y = where(flip, s - 1 - y, y)
+        x, y = where(ry == 0, y, x), where(ry == 0, x, y)
+        x += s * rx
+        y += s * ry
+        d //= 4
+        s *= 2
+
+    inside = (x < xtiles) & (y < ytiles)
+    return stack((x[inside], y[inside]), -1)
+
+
+@dataclass
+class TileIndex:
+    """
+    Tile grid of a raster.
+
+    Tiles are `t_size` elements wide, starting from the upper left corner of
+    the raster. By default only full tiles are indexed and the remainder at
+    the right and bottom edges is not visited. With `pad`, partial tiles
+    cover the remainder and their windows are padded to full size.
+
+    Each tile is read through a window extended by `halo` elements on every
+    side. Parts of a window that fall outside the raster are reported as
+    padding by :meth:`read_window`.
+
+    :param t_size: Size of the tiles.
+    :type t_size: int
+    :param xsize: Width of the raster.
+    :type xsize: int
+    :param ysize: Height of the raster.
+    :type ysize: int
+    :param halo: Overlap of the read windows with their neighbours,
+        defaults to 0.
+    :type halo: int, optional
+    :param pad: Index partial edge tiles, defaults to False.
+    :type pad: bool, optional
+    :param order: One of :data:`ORDERS`, defaults to `row`. `serpentine`
+        visits rows of tiles alternately from left to right and right to
+        left, so that consecutive tiles are always adjacent. `hilbert`
+        follows a Hilbert curve, which keeps consecutive tiles adjacent in
+        both directions. Orders only change the sequence of the tiles, not
+        the grid.
+    :type order: str, optional
+    :param block: Block size of the source raster as (width, height),
+        used to count the blocks touched per tile. Tiles are not aligned to
+        the blocks.
+    :type block: tuple[int, int], optional
+    """
+    t_size: int = field()
+    xsize: int = field()
+    ysize: int = field()
+    halo: int = field(default=0)
+    pad: bool = field(default=False)
+    order: str = field(default="row")
+    block: tuple[int, int] = field(default=(1, 1))
+
+    def __post_init__(self):
+        assert self.order in ORDERS, f"Unknown tile order {self.order}."
+        if self.pad:
+            self.xtiles = -(-self.xsize // self.t_size)
+            self.ytiles = -(-self.ysize // self.t_size)
+        else:
+            self.xtiles = self.xsize // self.t_size
+            self.ytiles = self.ysize // self.t_size
+
+        if self.order == "hilbert":
+            self.tiles = hilbert_order(self.xtiles, self.ytiles)
+            return
+
+        rows, cols = (a.ravel() for a in indices((self.ytiles,
+                                                  self.xtiles)))
+        if self.order == "serpentine":
+            cols = where(rows % 2, self.xtiles - 1 - cols, cols)
+        self.tiles = stack((cols, rows), -1)
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    def __getitem__(self, i: int) -> tuple[int, int, int, int]:
+        """
+        Window of the `i`-th tile, without halo, clipped to the raster.
+
+        :return: (xoffset, yoffset, width, height) of the tile.
+        :rtype: tuple[int, int, int, int]
+        """
+        col, row = self.tiles[i]
+        xoff, yoff = int(col) * self.t_size, int(row) * self.t_size
+        return (xoff, yoff,
+                min(self.t_size, self.xsize - xoff),
+                min(self.t_size, self.ysize - yoff))
+
+    def __iter__(self) -> Iterator[tuple[int, int, int, int]]:
+        return (self[i] for i in range(len(self)))
+
+    def read_window(self, i: int) -> tuple[tuple[int, int, int, int],
+                                           tuple[tuple[int, int],
+                                                 tuple[int, int]]]:
+        """
+        Window to read for the `i`-th tile, including its halo and clipped
+        to the raster, and the padding that brings the read array to the
+        full size of `t_size + 2 * halo`.
+
+        :return: The (xoffset, yoffset, width, height) window and the
+            ((top, bottom), (left, right)) padding.
+        :rtype: tuple
+        """
+        xoff, yoff, *_ = self[i]
+        size = self.t_size + 2 * self.halo
+        x0, y0 = xoff - self.halo, yoff - self.halo
+        x1 = min(x0 + size, self.xsize)
+        y1 = min(y0 + size, self.ysize)
+        left, top = max(-x0, 0), max(-y0, 0)
+        x0, y0 = x0 + left, y0 + top
+        return ((x0, y0, x1 - x0, y1 - y0),
+                ((top, size - top - (y1 - y0)),
+                 (left, size - left - (x1 - x0))))
+
+    def core(self, i: int) -> tuple[slice, slice]:
+        """
+        Slices of a full-size tile array, read through :meth:`read_window`,
+        that hold the `i`-th tile without its halo and padding.
+
+        :rtype: tuple[slice, slice]
+        """
+        *_, xsize, ysize = self[i]
+        return (slice(self.halo, self.halo + ysize),
+                slice(self.halo, self.halo + xsize))
+
+    def blocks(self, i: int) -> int:
+        """
+        Number of source blocks intersected by the read window of the
+        `i`-th tile.
+        """
+        (xoff, yoff, xsize, ysize), _ = self.read_window(i)
+        bx, by = self.block
+        return (((xoff + xsize - 1) // bx - xoff // bx + 1) *
+                ((yoff + ysize - 1) // by - yoff // by + 1))
+
+    def amplification(self) -> float:
+        """
+        Ratio of the elements in the source blocks intersected by the read
+        windows to the elements requested, without any block cache.
+        """
+        bx, by = self.block
+        requested = sum(w * h for (*_, w, h), _ in
+                        map(self.read_window, range(len(self))))
+        return sum(map(self.blocks, range(len(self)))) * bx * by /\
+            max(requested, 1)
+
+    def scaled(self, factor: int, xsize: int = None, ysize: int = None,
+               block: tuple[int, int] = (1, 1)) -> "TileIndex":
+        """
+        Index of the same tiles on a raster `factor` times coarser.
+
+        :param factor: The ratio of the element sizes of the two rasters.
+        :type factor: int
+        :param xsize: Width of the coarser raster, defaults to the scaled
+            width.
+        :type xsize: int, optional
+        :param ysize: Height of the coarser raster, defaults to the scaled
+            height.
+        :type ysize: int, optional
+        :param block: Block size of the coarser raster.
+        :type block: tuple[int, int], optional
+
+        :rtype: :class:`TileIndex`
+        """
+        assert self.t_size % factor == 0 and self.halo % factor == 0, \
+            "Tiles not aligned to the coarser grid."
+        index = TileIndex(self.t_size // factor,
+                          xsize or -(-self.xsize // factor),
+                          ysize or -(-self.ysize // factor),
+                          halo=self.halo // factor, pad=self.pad,
+                          order=self.order, block=block)
+        assert (index.xtiles, index.ytiles) == (self.xtiles, self.ytiles), \
+            "Tile grids of different dimensions."
+        return index
+
+
+@dataclass
+class ReadCounter:
+    """
+    Counters of the reads made through a :class:`TileIndex`.
+    """
+    #: Number of read requests.
+    requests: int = field(default=0)
+    #: Number of elements requested, per band.
+    elements: int = field(default=0)
+    #: Number of elements of the source blocks intersected, per band.
+    block_elements: int = field(default=0)
+
+    def update(self, index: TileIndex, i: int) -> None:
+        """
+        Count the read of the `i`-th tile of `index`.
+        """
+        (*_, xsize, ysize), _ = index.read_window(i)
+        self.requests += 1
+        self.elements += xsize * ysize
+        self.block_elements += index.blocks(i) * index.block[0] *\
+            index.block[1]
+
+    @property
+    def amplification(self) -> float:
+        return self.block_elements / max(self.elements, 1)
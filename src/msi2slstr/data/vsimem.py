@@ -0,0 +1,226 @@
+"""
+Registry of the intermediate files written to `/vsimem/`.
+
+Intermediates are named under the directory of the active scene scope, so
+that concurrent scenes and threads never collide, and are unlinked when the
+scope is closed. Files named outside of any scope belong to a per-thread
+default scope that lives as long as the process. Intermediates spilled to
+disk are likewise placed in a temporary directory per scope, removed with
+it.
+"""
+from atexit import register as atexit_register
+from contextlib import contextmanager
+from contextvars import copy_context
+from itertools import count
+from logging import getLogger
+from os import getpid
+from os.path import join
+from shutil import rmtree
+from tempfile import mkdtemp
+from threading import local, get_ident, Lock
+from collections.abc import Iterable, Iterator, Callable
+from functools import wraps
+
+from osgeo.gdal import RmdirRecursive
+
+
+ROOT = "/vsimem/msi2slstr"
+
+logger = getLogger(__name__)
+
+
+class VSIMemRegistry:
+    """
+    Scoped allocation of `/vsimem/` paths.
+
+    Scopes are opened per scene with :meth:`scope` and are active in the
+    thread that opened them. Worker threads preparing parts of the same
+    scene join it with :meth:`use`.
+
+    :param root: Directory under which scopes are created.
+    :type root: str, optional
+    """
+
+    def __init__(self, root: str = ROOT) -> None:
+        self.root = f"{root}/{getpid()}"
+        self.scopes: set[str] = set()
+        #: Temporary directories on disk by scope and parent directory.
+        self.scratch_dirs: dict[tuple[str, str], str] = {}
+        self._local = local()
+        self._counter = count()
+        self._lock = Lock()
+        atexit_register(self._remove_scratch)
+
+    @property
+    def current(self) -> str:
+        """
+        Directory of the scope active in the calling thread.
+        """
+        return getattr(self._local, "scope", None) or\
+            f"{self.root}/thread_{get_ident()}"
+
+    def path(self, name: str) -> str:
+        """
+        Unique `/vsimem/` path of an intermediate file in the active scope.
+
+        :param name: File name of the intermediate.
+        :type name: str
+
+        :rtype: str
+        """
+        with self._lock:
+            n = next(self._counter)
+        return f"{self.current}/{n}_{name}"
+
+    def scratch_path(self, directory: str, name: str) -> str:
+        """
+        Unique path of an intermediate file on disk, in a temporary
+        directory of the active scope under `directory`. The temporary
+        directory is removed when the scope is closed.
+
+        :param directory: Scratch directory on local disk.
+        :type directory: str
+        :param name: File name of the intermediate.
+        :type name: str
+
+        :rtype: str
+        """
+        key = self.current, directory
+        with self._lock:
+            if key not in self.scratch_dirs:
+                self.scratch_dirs[key] = mkdtemp(prefix="msi2slstr_",
+                                                 dir=directory)
+            n = next(self._counter)
+            return join(self.scratch_dirs[key], f"{n}_{name}")
+
+    def _remove_scratch(self, scope: str = None) -> None:
+        """
+        Remove the scratch directories of a scope, or of all scopes.
+        """
+        with self._lock:
+            keys = [key for key in self.scratch_dirs
+                    if scope is None or key[0] == scope]
+            dirs = [self.scratch_dirs.pop(key) for key in keys]
+        for directory in dirs:
+            rmtree(directory, ignore_errors=True)
+
+    @contextmanager
+    def use(self, scope: str) -> Iterator[str]:
+        """
+        Activate an open scope in the calling thread, without closing it on
+        exit.
+        """
+        previous = getattr(self._local, "scope", None)
+        self._local.scope = scope
+        try:
+            yield scope
+        finally:
+            self._local.scope = previous
+
+    def bind(self, function: Callable) -> Callable:
+        """
+        Bind a function to the scope active in the calling thread, for it to
+        be called from another thread. The function also runs in a copy of
+        the context variables of the calling thread, e.g. the active tracer.
+        """
+        scope = self.current
+        context = copy_context()
+
+        @wraps(function)
+        def bound(*args, **kwargs):
+            with self.use(scope):
+                return context.copy().run(function, *args, **kwargs)
+        return bound
+
+    def open(self, name: str) -> str:
+        """
+        Open a scope for the intermediates of a scene without activating it,
+        for work that is interleaved with other scopes in the same thread,
+        e.g. generators. The scope is activated per unit of work with
+        :meth:`use` or :meth:`iterate`, and closed with :meth:`release`.
+
+        :param name: Name of the scene.
+        :type name: str
+
+        :return: Directory of the scope.
+        :rtype: str
+        """
+        with self._lock:
+            scope = f"{self.root}/{next(self._counter)}_{name}"
+            self.scopes.add(scope)
+        return scope
+
+    def release(self, scope: str) -> None:
+        """
+        Unlink all files of an open scope. Datasets opened on them must have
+        been released.
+        """
+        logger.info("Releasing %d bytes of intermediates of %s.",
+                    sum(self.report(scope).values()), scope)
+        RmdirRecursive(scope)
+        self._remove_scratch(scope)
+        with self._lock:
+            self.scopes.discard(scope)
+
+    def iterate(self, scope: str, iterable: Iterable) -> Iterator:
+        """
+        Iterate with `scope` active while each item is produced, and
+        inactive while it is consumed.
+        """
+        iterator = iter(iterable)
+        try:
+            while True:
+                with self.use(scope):
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                yield item
+        finally:
+            if hasattr(iterator, "close"):
+                with self.use(scope):
+                    iterator.close()
+
+    @contextmanager
+    def scope(self, name: str) -> Iterator[str]:
+        """
+        Open a scope for the intermediates of a scene, active in the calling
+        thread. All files of the scope are unlinked on exit, and datasets
+        opened on them must have been released by then.
+
+        :param name: Name of the scene.
+        :type name: str
+
+        :return: Directory of the scope.
+        :rtype: Iterator[str]
+        """
+        scope = self.open(name)
+        try:
+            with self.use(scope):
+                yield scope
+        finally:
+            self.release(scope)
+
+    def report(self, scope: str = None) -> dict[str, int]:
+        """
+        Sizes of the files of a scope, the active one by default.
+
+        :return: Size in bytes per file name.
+        :rtype: dict[str, int]
+        """
+        from .gdalutils import get_vsi_size
+
+        sizes = get_vsi_size(f"{scope or self.current}/")
+        return {k: v for k, v in sizes.items() if v is not None}
+
+
+#: The registry of the process.
+registry = VSIMemRegistry()
+
+
+def vsimem_path(name: str) -> str:
+    """
+    Unique `/vsimem/` path of an intermediate in the active scope of the
+    process registry.
+    """
+    return registry.path(name)
@@ -1,56 +1,204 @@
 """Evaluation metrics definition.
+
+All metrics are derived from the sufficient statistics held by
+:class:`Moments`, which are computed in a single set of reductions per pair
+of arrays and can be shared by any number of metrics.
 """
-from numpy import ndarray
-from numpy import sum, multiply
-from numpy import sqrt
+from numpy import ndarray, float64
+from numpy import einsum, moveaxis, maximum, zeros, arange, minimum
+from numpy import sqrt, clip
+
+
+class Moments:
+    """
+    First and second order moments of a pair of arrays, collapsing the
+    elements along :attr:`dims`.
+
+    The sums Σx, Σy, Σx², Σy² and Σxy are accumulated in `float64`,
+    regardless of the input precision, and kept with singleton dimensions in
+    place of the collapsed ones.
 
-from ..transform.normalization import Standardizer
+    :param x: First array.
+    :type x: `ndarray`
+    :param y: Second array, of equal shape.
+    :type y: `ndarray`
+    :param dims: Tuple of dimensions to collapse, defaults to (-1, -2).
+        `None` collapses all dimensions.
+    :type dims: tuple[int] or None, optional
+    """
+    def __init__(self, x: ndarray, y: ndarray,
+                 dims: tuple[int] = (-1, -2)) -> None:
+        assert x.shape == y.shape, "Arrays of different shapes."
+        dims = range(x.ndim) if dims is None else dims
+        dims = sorted(d % x.ndim for d in dims)
+        self.shape = tuple(1 if i in dims else s
+                           for i, s in enumerate(x.shape))
+
+        # Collapsed dimensions are moved last and flattened.
+        keep = [s for i, s in enumerate(x.shape) if i not in dims]
+        target = range(x.ndim - len(dims), x.ndim)
+        x = moveaxis(x, dims, target).reshape(*keep, -1)
+        y = moveaxis(y, dims, target).reshape(*keep, -1)
+
+        def dot(a, b):
+            return einsum("...i,...i->...", a, b, dtype=float64)\
+                .reshape(self.shape)
+
+        #: Number of collapsed elements.
+        self.n = x.shape[-1]
+        #: Constants subtracted from x and y prior to the summation.
+        self.shift_x = self.shift_y = 0
+        self.sx = x.sum(-1, dtype=float64).reshape(self.shape)
+        self.sy = y.sum(-1, dtype=float64).reshape(self.shape)
+        self.sxx = dot(x, x)
+        self.syy = dot(y, y)
+        self.sxy = dot(x, y)
+
+    @property
+    def mean_x(self) -> ndarray:
+        return self.sx / self.n + self.shift_x
+
+    @property
+    def mean_y(self) -> ndarray:
+        return self.sy / self.n + self.shift_y
+
+    @property
+    def var_x(self) -> ndarray:
+        return maximum(self.sxx / self.n - (self.sx / self.n) ** 2, 0)
+
+    @property
+    def var_y(self) -> ndarray:
+        return maximum(self.syy / self.n - (self.sy / self.n) ** 2, 0)
+
+    @property
+    def cov(self) -> ndarray:
+        # Rounded as the variances, so that identical arrays give equal values.
+        return self.sxy / self.n - (self.sx / self.n) * (self.sy / self.n)
+
+
+class LocalMoments(Moments):
+    """
+    Moments of a pair of arrays within a square window centred on each
+    element of the last two dimensions. Windows are truncated at the edges.
+
+    Window sums are read from summed-area tables, so the cost is linear in
+    the number of elements and independent of the window size. Each channel
+    is shifted by its mean before summation to limit cancellation.
+
+    :param x: First array, of at least 2 dimensions.
+    :type x: `ndarray`
+    :param y: Second array, of equal shape.
+    :type y: `ndarray`
+    :param window: Side of the window in number of elements, odd.
+    :type window: int
+    """
+    def __init__(self, x: ndarray, y: ndarray, window: int = 3) -> None:
+        assert x.shape == y.shape, "Arrays of different shapes."
+        assert window % 2, "Window size has to be odd."
+        self.shape = x.shape
+        self.shift_x = x.mean((-1, -2), keepdims=True, dtype=float64)
+        self.shift_y = y.mean((-1, -2), keepdims=True, dtype=float64)
+        x = x - self.shift_x
+        y = y - self.shift_y
+
+        *_, h, w = x.shape
+        k = window // 2
+        y0, y1 = (minimum(maximum(arange(h) + d, 0), h)
+                  for d in (-k, k + 1))
+        x0, x1 = (minimum(maximum(arange(w) + d, 0), w)
+                  for d in (-k, k + 1))
+
+        def window_sum(a):
+            table = zeros((*a.shape[:-2], h + 1, w + 1), dtype=float64)
+            a.cumsum(-2, dtype=float64, out=table[..., 1:, 1:])
+            table[..., 1:, 1:].cumsum(-1, out=table[..., 1:, 1:])
+            return (table[..., y1[:, None], x1] - table[..., y0[:, None], x1]
+                    - table[..., y1[:, None], x0]
+                    + table[..., y0[:, None], x0])
+
+        self.n = (y1 - y0)[:, None] * (x1 - x0)[None]
+        self.sx = window_sum(x)
+        self.sy = window_sum(y)
+        self.sxx = window_sum(x * x)
+        self.syy = window_sum(y * y)
+        self.sxy = window_sum(x * y)
+
+
+class MomentMetric(ndarray):
+    """
+    Base class of metrics derived from :class:`Moments`.
 
+    Subclasses implement :meth:`compute`. Calling a metric on a pair of
+    arrays computes their moments and derives the metric from them; callers
+    evaluating several metrics should compute the moments once and call
+    :meth:`from_moments` of each metric instead.
 
-class r(ndarray):
+    The trailing two dimensions of the result, collapsed by default, are
+    dropped. e.g. (N, C, H, W) inputs produce (N, C) results.
+    """
+    def __new__(cls, x: ndarray, y: ndarray,
+                dims: tuple[int] = (-1, -2)) -> "MomentMetric":
+        return cls.from_moments(Moments(x, y, dims))
+
+    @classmethod
+    def from_moments(cls, m: Moments) -> "MomentMetric":
+        result = cls.compute(m)
+        return result.reshape(result.shape[:-2]).view(cls)
+
+    @classmethod
+    def compute(cls, m: Moments) -> ndarray:
+        raise NotImplementedError()
+
+    @classmethod
+    def map(cls, x: ndarray, y: ndarray, window: int = 3) -> ndarray:
+        """
+        Compute the metric locally, within a moving window around each
+        element of the last two dimensions.
+
+        :return: Metric map of the same shape as the inputs.
+        :rtype: `ndarray`
+        """
+        return cls.compute(LocalMoments(x, y, window)).view(cls)
+
+
+class r(MomentMetric):
     """
     Pearson product-moment correlation coefficient.
 
     .. math::
-        \\begin{aligned}
-            ...
-        \\end{aligned}
+        r = \\frac{\\sigma_{xy}}{\\sigma_{x} \\sigma_{y} + \\epsilon}
     """
     _C = 1e-10
 
-    def __new__(cls, x: ndarray, y: ndarray) -> "r":
-        xnorm = x - x.mean((-1, -2), keepdims=True)
-        ynorm = y - y.mean((-1, -2), keepdims=True)
-        numer = sum(xnorm * ynorm, axis=(-1, -2), keepdims=True)
-        denom = sqrt(multiply(sum(xnorm * xnorm, axis=(-1, -2),
-                                  keepdims=True),
-                              sum(ynorm * ynorm, axis=(-1, -2),
-                                  keepdims=True)))
-        result = numer / (denom + cls._C)
-        return result.view(cls).reshape(result.shape[0], -1)
+    @classmethod
+    def compute(cls, m: Moments) -> ndarray:
+        return m.cov / (sqrt(m.var_x * m.var_y) + cls._C / m.n)
 
 
-class srmse(ndarray):
+class srmse(MomentMetric):
     """
-    Standardized RMSE.
+    Standardized RMSE. The RMSE of the arrays after standardizing each of
+    them to zero mean and unit variance.
 
     .. math::
-        \\begin{aligned}
-            ...
-        \\end{aligned}
+        SRMSE = \\sqrt{\\frac{\\sigma_{x} ^ 2}{(\\sigma_{x} + \\epsilon) ^ 2}
+        + \\frac{\\sigma_{y} ^ 2}{(\\sigma_{y} + \\epsilon) ^ 2}
+        - \\frac{2 \\sigma_{xy}}
+        {(\\sigma_{x} + \\epsilon) (\\sigma_{y} + \\epsilon)}}
     """
-    standard: Standardizer = Standardizer((-1, -2))
-
-    def __new__(cls, x: ndarray, y: ndarray,
-                dims: tuple[int] = (-1, -2)) -> "srmse":
+    _C = 1e-10
 
-        x = cls.standard(x)
-        y = cls.standard(y)
-        result = sqrt((x - y) ** 2).mean(axis=dims)
-        return result.view(cls)
+    @classmethod
+    def compute(cls, m: Moments) -> ndarray:
+        sx = sqrt(m.var_x) + cls._C
+        sy = sqrt(m.var_y) + cls._C
+        # Bounded by 2, reached by anti-correlated arrays; rounding must not
+        # take it past the bound.
+        return sqrt(clip(m.var_x / sx ** 2 + m.var_y / sy ** 2 -
+                         2 * m.cov / (sx * sy), 0, 4))
 
 
-class ssim(ndarray):
+class ssim(MomentMetric):
     """
     Global SSIM. Collapses elements along :attr:`dims` of the provided arrays
     to calculate the metric for the elements that remain. Defaults to a
@@ -81,19 +229,12 @@ class ssim(ndarray):
     """
     _C = 1e-10
 
-    def __new__(cls, x: ndarray, y: ndarray,
-                dims: tuple[int] = (-1, -2)) -> "ssim":
-
-        mx = x.mean(axis=dims, keepdims=True)
-        my = y.mean(axis=dims, keepdims=True)
-        sx = x. std(axis=dims, keepdims=True)
-        sy = y. std(axis=dims, keepdims=True)
-        xnorm = x - mx
-        ynorm = y - my
-        sxy = (xnorm * ynorm).mean(axis=dims, keepdims=True)
+    @classmethod
+    def compute(cls, m: Moments) -> ndarray:
+        mx, my = m.mean_x, m.mean_y
+        vx, vy = m.var_x, m.var_y
+        sx, sy = sqrt(vx), sqrt(vy)
         l = (2 * mx * my + cls._C) / (mx ** 2 + my ** 2 + cls._C)
-        c = (2 * sx * sy + cls._C) / (sx ** 2 + sy ** 2 + cls._C)
-        s = (sxy + cls._C) / (sx * sy + cls._C)
-        return (l.clip(0) *
-                c.clip(0) *
-                s.clip(0)).prod((-1, -2)).view(cls)
+        c = (2 * sx * sy + cls._C) / (vx + vy + cls._C)
+        s = (m.cov + cls._C) / (sx * sy + cls._C)
+        return l.clip(0) * c.clip(0) * s.clip(0)
@@ -1,25 +1,103 @@
 """Module for the evaluation of a full satellite scene.
 """
-from numpy import stack, ndarray
+from queue import Queue
+from threading import Thread
+
+from numpy import ndarray, full, nan, float32
 
 from .metrics import ssim
 from .metrics import srmse
 from .metrics import r
+from .metrics import Moments, LocalMoments, MomentMetric
+from .statistics import RunningStatistics
+
+from ..data.tiling import TileIndex
+
+
+class QualityMaps:
+    """
+    Assembles scene-wide maps of local metrics from consecutive tiles.
+
+    Tiles are expected in the order of `index`, row-major by default. Each
+    metric is computed within a moving window of every tile and written to
+    its place in the scene, without the halo and padding of the tile.
+    Areas of tiles that were not evaluated hold NaN.
+
+    :param nbands: Number of channels of the evaluated tiles.
+    :type nbands: int
+    :param xsize: Width of the scene in the grid of the evaluated tiles.
+    :type xsize: int
+    :param ysize: Height of the scene in the grid of the evaluated tiles.
+    :type ysize: int
+    :param t_size: Size of the tiles.
+    :type t_size: int
+    :param window: Size of the moving window, odd, defaults to 3.
+    :type window: int, optional
+    :param metrics: Metrics to map, defaults to `r` and `ssim`.
+    :type metrics: tuple[MomentMetric], optional
+    :param index: The tile index the tiles follow.
+    :type index: :class:`TileIndex`, optional
+
+    .. automethod:: __call__
+    """
+    def __init__(self, nbands: int, xsize: int, ysize: int, t_size: int,
+                 window: int = 3, metrics: tuple[MomentMetric] = (r, ssim),
+                 index: TileIndex = None) -> None:
+        self.window = window
+        self.metrics = metrics
+        self.maps = full((len(metrics), nbands, ysize, xsize), nan, float32)
+        self.index = index or TileIndex(t_size, xsize, ysize)
+        self._tiles = iter(range(len(self.index)))
+
+    def __call__(self, x: ndarray, y: ndarray) -> None:
+        """
+        Map all registered metrics for the next batch of tiles.
+        """
+        moments = LocalMoments(x, y, self.window)
+        values = [metric.compute(moments) for metric in self.metrics]
+
+        for i in range(len(x)):
+            tile = next(self._tiles)
+            xoff, yoff, xsize, ysize = self.index[tile]
+            core = self.index.core(tile)
+            for m, value in enumerate(values):
+                self.maps[m, :, yoff: yoff + ysize, xoff: xoff + xsize] =\
+                    value[(i, ..., *core)]
+
+    def skip(self, n: int = 1) -> None:
+        """
+        Advance past `n` tiles that are not evaluated.
+        """
+        for _ in range(n):
+            next(self._tiles)
+
+    def __getitem__(self, name: str) -> ndarray:
+        return self.maps[[m.__name__ for m in self.metrics].index(name)]
+
+    def items(self):
+        return ((m.__name__, self.maps[i]) for i, m in enumerate(self.metrics))
 
 
 class Evaluate:
     """
     Tracks fusion evaluation stats for entire image.
 
+    :param maps: Quality maps to update with every evaluated batch.
+    :type maps: :class:`QualityMaps`, optional
+
     .. automethod:: __call__
     """
-    def __init__(self) -> None:
-        #: Registered metrics to keep track of.
-        self.metrics: list[object] = [r, srmse, ssim]
+    def __init__(self, maps: QualityMaps = None) -> None:
+        #: Registered metrics to keep track of. All of them are derived from
+        #: the same :class:`Moments` of each batch.
+        self.metrics: list[MomentMetric] = [r, srmse, ssim]
 
-        #: Dictionary of held metrics.
-        self.metric_maps: dict[str, list] = {m.__name__: []
-                                             for m in self.metrics}
+        #: Streaming statistics of each metric over all tiles.
+        self.metric_maps: dict[str, RunningStatistics] = {
+            m.__name__: RunningStatistics() for m in self.metrics}
+
+        #: Pixel-level quality maps, if requested.
+        self.maps = maps
 
         self._counter = 0
 
@@ -27,25 +105,122 @@ class Evaluate:
         """
         Executes and records all registered metrics for given batch of tiles.
         """
+        # A single pass over the data for all metrics.
+        moments = Moments(x, y)
+
         for metric in self.metrics:
-            # Evaluate all tiles in batch.
-            metric_values = metric(x, y)
+            # Evaluate all tiles in batch, each tile being one observation.
+            self.metric_maps[metric.__name__].update(
+                metric.from_moments(moments))
+
+        if self.maps is not None:
+            self.maps(x, y)
 
-            for t_metric in metric_values:
-                # Record each tile separately for the generation
-                # of quality maps.
-                self.metric_maps[metric.__name__].append(t_metric)
+        self._counter += 1
 
-            self._counter += 1
+    def merge(self, other: "Evaluate") -> "Evaluate":
+        """
+        Combine the statistics of another evaluation, e.g. of a different
+        shard of the scene, into this one.
+        """
+        for name, stats in other.metric_maps.items():
+            self.metric_maps[name].merge(stats)
+        self._counter += other._counter
+        return self
 
     @property
-    def quality_maps(self):
+    def quality_maps(self) -> QualityMaps | None:
         """
-        Returns a 2D array per metric that maps fusion quality to the scene's
-        geometry. TODO
+        Returns a 2D array per metric and band that maps fusion quality to
+        the scene's geometry, if the evaluation was set up with maps.
         """
-        ...
+        return self.maps
 
     def get_stats(self, agg="mean"):
-        return {k: getattr(stack(v, axis=0), agg)(0)
-                for k, v in self.metric_maps.items()}
+        """
+        Return a statistic of each metric, per band.
+
+        :param agg: One of `mean`, `var`, `std`, `min` or `max`, defaults to
+            `mean`.
+        :type agg: str, optional
+        """
+        return {k: getattr(v, agg) for k, v in self.metric_maps.items()}
+
+
+class AsyncEvaluate:
+    """
+    Runs an :class:`Evaluate` in a background thread, fed through a bounded
+    queue. The caller blocks only when `queue_size` batches are pending.
+
+    :meth:`join` has to be called before reading the results of the
+    evaluation. Errors raised during evaluation are re-raised there, and by
+    the next batch queued after them, so that runs fail early.
+
+    :param evaluate: The evaluation to run.
+    :type evaluate: :class:`Evaluate`
+    :param queue_size: Maximum number of pending batches, defaults to 4.
+    :type queue_size: int, optional
+
+    .. automethod:: __call__
+    """
+    def __init__(self, evaluate: Evaluate, queue_size: int = 4) -> None:
+        self.evaluate = evaluate
+        self._queue = Queue(maxsize=queue_size)
+        self._error: BaseException = None
+        self._cancelled = False
+        self._thread = Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        for x, y in iter(self._queue.get, None):
+            if self._error is not None or self._cancelled:
+                # Keep draining so that producers never block.
+                continue
+            try:
+                if x is None:
+                    self.evaluate.maps.skip(y)
+                else:
+                    self.evaluate(x, y)
+            except BaseException as e:
+                self._error = e
+
+    def __call__(self, x: ndarray, y: ndarray) -> None:
+        """
+        Queue a batch of tiles for evaluation.
+        """
+        self.check()
+        self._queue.put((x, y))
+
+    def skip(self, n: int) -> None:
+        """
+        Queue the skipping of `n` tiles in the quality maps.
+        """
+        self.check()
+        if self.evaluate.maps is not None:
+            self._queue.put((None, n))
+
+    def check(self) -> None:
+        """
+        Re-raise the error of a failed evaluation, if any.
+        """
+        if self._error is not None:
+            raise self._error
+
+    def close(self) -> None:
+        """
+        Stop the background thread, discarding the pending batches, e.g.
+        when the run fails. Errors of the evaluation are not raised.
+        """
+        self._cancelled = True
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def join(self) -> None:
+        """
+        Wait for all queued batches to be evaluated.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.check()
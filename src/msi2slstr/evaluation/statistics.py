@@ -0,0 +1,107 @@
+"""Streaming statistics of scene-level evaluation metrics.
+"""
+from numpy import ndarray, asarray, sqrt, minimum, maximum
+
+
+class RunningStatistics:
+    """
+    Accumulates the count, mean, variance, minimum and maximum of a stream of
+    observations in constant memory. Observations are arrays of equal shape;
+    statistics are kept elementwise.
+
+    Partial states of separate streams (e.g. scene shards or workers) are
+    combined with :meth:`merge`, following the pairwise update of Chan et al.
+
+    .. automethod:: __len__
+    """
+    def __init__(self) -> None:
+        self.count = 0
+        self._mean: ndarray = None
+        self._m2: ndarray = None
+        self._min: ndarray = None
+        self._max: ndarray = None
+
+    def __len__(self) -> int:
+        """
+        Number of recorded observations.
+        """
+        return self.count
+
+    def update(self, values: ndarray) -> "RunningStatistics":
+        """
+        Record a batch of observations stacked along the first dimension.
+
+        :param values: Array of shape (B, ...).
+        :type values: `ndarray`
+        """
+        values = asarray(values, dtype=float)
+        batch = RunningStatistics()
+        batch.count = len(values)
+        if not batch.count:
+            return self
+        batch._mean = values.mean(0)
+        batch._m2 = ((values - batch._mean) ** 2).sum(0)
+        batch._min = values.min(0)
+        batch._max = values.max(0)
+        return self.merge(batch)
+
+    def merge(self, other: "RunningStatistics") -> "RunningStatistics":
+        """
+        Combine the state of another accumulator into this one.
+        """
+        if not other.count:
+            return self
+        if not self.count:
+            self.count = other.count
+            self._mean, self._m2 = other._mean.copy(), other._m2.copy()
+            self._min, self._max = other._min.copy(), other._max.copy()
+            return self
+
+        count = self.count + other.count
+        delta = other._mean - self._mean
+        self._mean = self._mean + delta * other.count / count
+        self._m2 = self._m2 + other._m2 +\
+            delta ** 2 * self.count * other.count / count
+        self._min = minimum(self._min, other._min)
+        self._max = maximum(self._max, other._max)
+        self.count = count
+        return self
+
+    @property
+    def mean(self) -> ndarray:
+        return self._mean
+
+    @property
+    def var(self) -> ndarray:
+        return self._m2 / self.count
+
+    @property
+    def std(self) -> ndarray:
+        return sqrt(self.var)
+
+    @property
+    def min(self) -> ndarray:
+        return self._min
+
+    @property
+    def max(self) -> ndarray:
+        return self._max
+
+    def state(self) -> dict:
+        """
+        Return the accumulator state as a dictionary of plain values, for
+        transfer between processes.
+        """
+        return {"count": self.count, "mean": self._mean, "m2": self._m2,
+                "min": self._min, "max": self._max}
+
+    @classmethod
+    def from_state(cls, state: dict) -> "RunningStatistics":
+        """
+        Rebuild an accumulator from the output of :meth:`state`.
+        """
+        obj = cls()
+        obj.count = state["count"]
+        obj._mean, obj._m2 = state["mean"], state["m2"]
+        obj._min, obj._max = state["min"], state["max"]
+        return obj
@@ -34,3 +34,10 @@ class ProductName(str):
                 sen3name.time,
                 sen2name.tile]
         return "_".join(data)
+
+
+class QualityMapName(ProductName):
+    """
+    Name of the auxiliary quality raster of a fused product.
+    """
+    __template__ = "M2S_{0}_QUALITY.tif".format
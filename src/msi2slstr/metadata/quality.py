@@ -1,5 +1,5 @@
 from .abc import Metadata
-from ..evaluation.scene import Evaluate
+from ..evaluation.scene import Evaluate, AsyncEvaluate, QualityMaps
 
 from numpy import ndarray
 
@@ -8,10 +8,29 @@ class FusionQualityMetadata(Metadata):
     """
     Sets the fusion quality metadata domain.
 
+    Evaluation can run in a background thread so that it overlaps with
+    inference, and can be restricted to every n-th batch of tiles for
+    throughput-critical runs. Pending evaluations are completed before the
+    content is read, or explicitly with :meth:`finalize`.
+
+    :param maps: Quality maps to assemble during evaluation.
+    :type maps: :class:`QualityMaps`, optional
+    :param every: Evaluate every n-th batch only, defaults to 1.
+    :type every: int, optional
+    :param queue_size: Maximum number of batches pending evaluation in the
+        background. 0 evaluates synchronously. Defaults to 0.
+    :type queue_size: int, optional
+
     .. automethod:: __call__
     """
-    def __init__(self) -> None:
-        self.__ev = Evaluate()
+    def __init__(self, maps: QualityMaps = None, every: int = 1,
+                 queue_size: int = 0) -> None:
+        assert every >= 1, "Evaluation interval has to be positive."
+        self.__ev = Evaluate(maps)
+        self.__async = AsyncEvaluate(self.__ev, queue_size)\
+            if queue_size else None
+        self.every = every
+        self._batches = 0
 
     @property
     def domain(self):
@@ -19,7 +38,38 @@ class FusionQualityMetadata(Metadata):
 
     @property
     def content(self):
+        self.finalize()
         return self.__ev.get_stats()
 
+    @property
+    def quality_maps(self) -> QualityMaps | None:
+        self.finalize()
+        return self.__ev.quality_maps
+
     def evaluate(self, x: ndarray, y: ndarray):
-        self.__ev(x, y)
+        evaluate = self.__async or self.__ev
+        self._batches += 1
+
+        if (self._batches - 1) % self.every:
+            # Sampled out: keep the quality maps aligned to the scene.
+            if self.__async is not None:
+                self.__async.skip(len(x))
+            elif self.__ev.maps is not None:
+                self.__ev.maps.skip(len(x))
+            return
+
+        evaluate(x, y)
+
+    def close(self):
+        """
+        Stop background evaluation without waiting for pending batches.
+        """
+        if self.__async is not None:
+            self.__async.close()
+
+    def finalize(self):
+        """
+        Wait for pending background evaluations.
+        """
+        if self.__async is not None:
+            self.__async.join()
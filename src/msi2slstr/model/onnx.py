@@ -2,23 +2,55 @@
 ONNX runtime.
 """
 
-# from onnxruntime import SessionIOBinding
-from onnxruntime import InferenceSession
-from onnxruntime import SessionOptions, RunOptions
 from numpy import ndarray
+from os.path import isfile
 
-from ..config import _OpenRelativePath
-from ..config import onnx_providers, onnx_provider_options
+from ..config import get_onnx_providers, onnx_provider_options
+from .quantization import get_model_path, RESOURCES
 
 
 class Runtime:
-    def __init__(self) -> None:
+    """
+    Inference session of the fusion model.
+
+    :param precision: Model variant to load, one of
+        :data:`~msi2slstr.model.quantization.PRECISIONS`. Variants other than
+        `fp32` are produced by `msi2slstr quantize`. Defaults to `fp32`.
+    :type precision: str, optional
+    :param root: Directory of the model files, defaults to the package
+        resources.
+    :type root: str, optional
+    :param threads: Number of intra-op threads of the session, defaults to
+        the onnxruntime choice.
+    :type threads: int, optional
+    :param device: Inference device, one of `cpu`, `cuda` or `auto`.
+        Defaults to `auto`.
+    :type device: str, optional
+    """
+    def __init__(self, precision: str = "fp32", root: str = RESOURCES,
+                 threads: int = None, device: str = "auto") -> None:
+        # Imported on first session creation to keep startup fast.
+        from onnxruntime import InferenceSession
+        from onnxruntime import SessionOptions, RunOptions
+
+        self.precision = precision
+        self.providers = get_onnx_providers(device)
         self.session_options = SessionOptions()
 
-        with _OpenRelativePath("../resources/model.onnx", "rb") as model_file:
+        if threads:
+            self.session_options.intra_op_num_threads = threads
+
+        path = get_model_path(precision, root)
+        if not isfile(path):
+            raise FileNotFoundError(
+                f"No {precision} model variant at {path}. "
+                "Run `msi2slstr quantize` to produce it.")
+
+        with open(path, "rb") as model_file:
             self.session = InferenceSession(
                 bytes(model_file.read()),
-                providers=onnx_providers,
+                sess_options=self.session_options,
+                providers=self.providers,
                 provider_options=onnx_provider_options)
 
         self.run_options = RunOptions()
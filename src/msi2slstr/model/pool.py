@@ -0,0 +1,234 @@
+"""
+Multi-process inference.
+
+Batches are exchanged with the worker processes through ring buffers in
+shared memory. Only slot indices travel through the task queues, so the
+arrays themselves are never pickled.
+"""
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from functools import partial
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from os import cpu_count
+from queue import Empty
+from traceback import format_exc
+
+from numpy import ndarray, float32, dtype
+
+from .onnx import Runtime
+
+
+def default_output_shape(sen2: ndarray, sen3: ndarray) -> tuple[int]:
+    """
+    Shape of the model output: Sentinel-3 channels at Sentinel-2 resolution.
+    """
+    return (sen2.shape[0], sen3.shape[1], *sen2.shape[2:])
+
+
+class SharedRing:
+    """
+    Fixed number of equally shaped array slots backed by shared memory.
+
+    :param slots: Number of slots in the ring.
+    :type slots: int
+    :param shape: Shape of the array held by each slot.
+    :type shape: tuple[int]
+    :param d_type: Data type of the held arrays, defaults to `float32`.
+    :type d_type: dtype, optional
+    :param name: Name of an existing ring to attach to.
+    :type name: str, optional
+    """
+
+    def __init__(self, slots: int, shape: tuple[int],
+                 d_type: dtype = float32, name: str = None) -> None:
+        self.spec = (slots, tuple(shape), dtype(d_type).str)
+        size = slots * dtype(d_type).itemsize
+        for dim in shape:
+            size *= dim
+        self.shm = SharedMemory(name=name, create=name is None,
+                                size=max(size, 1))
+        self.array = ndarray((slots, *shape), d_type, buffer=self.shm.buf)
+
+    @classmethod
+    def attach(cls, name: str, spec: tuple) -> "SharedRing":
+        return cls(*spec, name=name)
+
+    def __getitem__(self, slot: int) -> ndarray:
+        return self.array[slot]
+
+    def close(self, unlink: bool = False) -> None:
+        # Attached rings are only closed; the creator unlinks.
+        del self.array
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _worker(factory: Callable, rings: tuple[tuple], tasks, results) -> None:
+    """
+    Worker process loop. Runs inference on the slots received through
+    `tasks` and reports back the slot index through `results`.
+    """
+    sen2, sen3, out = (SharedRing.attach(*ring) for ring in rings)
+    try:
+        try:
+            runtime = factory()
+        except Exception:
+            results.put((None, format_exc()))
+            return
+
+        for slot, n in iter(tasks.get, None):
+            try:
+                out[slot][:n] = runtime(sen2[slot][:n], sen3[slot][:n])[0]
+                results.put((slot, None))
+            except Exception:
+                results.put((slot, format_exc()))
+    finally:
+        for ring in (sen2, sen3, out):
+            ring.close()
+
+
+class InferencePool:
+    """
+    Pool of worker processes, each holding its own :class:`Runtime`.
+
+    Use as a context manager to guarantee the release of the workers and of
+    the shared memory.
+
+    :param workers: Number of worker processes.
+    :type workers: int
+    :param threads: Intra-op threads per worker, defaults to an equal share
+        of the available cores.
+    :type threads: int, optional
+    :param slots: Number of batches in flight, defaults to twice the number
+        of workers.
+    :type slots: int, optional
+    :param factory: Callable building a runtime in each worker, defaults to
+        :class:`Runtime`. Receives `threads` and `runtime_options` as
+        keyword arguments.
+    :type factory: Callable, optional
+    :param output_shape: Callable returning the output shape of a batch
+        given the input batch.
+    :type output_shape: Callable, optional
+    :param poll: Seconds between checks of the liveness of the workers
+        while waiting for results, defaults to 1.
+    :type poll: float, optional
+
+    .. automethod:: __call__
+    """
+
+    def __init__(self, workers: int, threads: int = None, slots: int = None,
+                 factory: Callable = Runtime,
+                 output_shape: Callable = default_output_shape,
+                 poll: float = 1., **runtime_options) -> None:
+        self.workers = workers
+        self.threads = threads or max(1, (cpu_count() or 1) // workers)
+        self.slots = slots or 2 * workers
+        self.factory = partial(factory, threads=self.threads,
+                               **runtime_options)
+        self.output_shape = output_shape
+        self.poll = poll
+        self.rings: tuple[SharedRing] = ()
+        self.processes = []
+        self._context = get_context("spawn")
+        self._tasks = self._context.Queue()
+        self._results = self._context.Queue()
+
+    def __enter__(self) -> "InferencePool":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _start(self, sen2: ndarray, sen3: ndarray) -> None:
+        # Ring slots are sized after the first, full-sized, batch.
+        self.rings = (SharedRing(self.slots, sen2.shape),
+                      SharedRing(self.slots, sen3.shape),
+                      SharedRing(self.slots, self.output_shape(sen2, sen3)))
+        specs = tuple((ring.shm.name, ring.spec) for ring in self.rings)
+
+        for _ in range(self.workers):
+            process = self._context.Process(target=_worker,
+                                            args=(self.factory, specs,
+                                                  self._tasks,
+                                                  self._results),
+                                            daemon=True)
+            process.start()
+            self.processes.append(process)
+
+    def _wait(self, slot: int, done: set) -> None:
+        # Collect completions until `slot` is among them. Workers killed
+        # without reporting, e.g. out of memory, fail the run rather than
+        # hanging it.
+        while slot not in done:
+            try:
+                completed, error = self._results.get(timeout=self.poll)
+            except Empty:
+                for process in self.processes:
+                    if not process.is_alive():
+                        raise RuntimeError(
+                            f"Inference worker {process.pid} exited with "
+                            f"code {process.exitcode}.")
+                continue
+            if error is not None:
+                raise RuntimeError(f"Inference worker failed:\n{error}")
+            done.add(completed)
+        done.remove(slot)
+
+    def __call__(self, batches: Iterable[tuple[ndarray, ndarray]]
+                 ) -> Iterator[tuple[ndarray, ndarray, ndarray]]:
+        """
+        Run inference on the given preprocessed batches.
+
+        Yields `(sen2, sen3, Y_hat)` views of the shared ring slot, in the
+        order of the input batches. The views are only valid until the next
+        result is requested.
+        """
+        pending = deque()
+        done = set()
+        free = deque(range(self.slots))
+
+        def result(slot, n):
+            sen2, sen3, out = self.rings
+            return sen2[slot][:n], sen3[slot][:n], out[slot][:n]
+
+        for sen2, sen3 in batches:
+            if not self.rings:
+                self._start(sen2, sen3)
+
+            if not free:
+                slot, n = pending.popleft()
+                self._wait(slot, done)
+                yield result(slot, n)
+                free.append(slot)
+
+            slot = free.popleft()
+            n = len(sen2)
+            assert n <= self.rings[0].spec[1][0], \
+                "Batch larger than the first batch of the pool."
+            self.rings[0][slot][:n] = sen2
+            self.rings[1][slot][:n] = sen3
+            self._tasks.put((slot, n))
+            pending.append((slot, n))
+
+        while pending:
+            slot, n = pending.popleft()
+            self._wait(slot, done)
+            yield result(slot, n)
+
+    def close(self) -> None:
+        """
+        Stop the workers and release the shared memory.
+        """
+        for _ in self.processes:
+            self._tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self.processes.clear()
+
+        for ring in self.rings:
+            ring.close(unlink=True)
+        self.rings = ()
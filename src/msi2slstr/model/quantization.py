@@ -0,0 +1,203 @@
+"""
+Generation and validation of reduced precision model variants.
+
+Variants are written next to the packaged `model.onnx` as
+`model.<precision>.onnx` and are only kept when their output stays close
+enough to the full precision model according to an :class:`AccuracyGate`.
+"""
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from itertools import islice
+from os import remove
+from os.path import dirname, join, realpath
+
+from numpy import ndarray
+
+from ..evaluation.scene import Evaluate
+
+
+#: Supported model precisions. `fp32` refers to the packaged model.
+PRECISIONS = ("fp32", "fp16", "int8-dynamic", "int8-static")
+
+#: Directory holding the packaged model and its variants.
+RESOURCES = realpath(join(dirname(__file__), "..", "resources"))
+
+
+def get_model_path(precision: str = "fp32", root: str = RESOURCES) -> str:
+    """
+    Return the file path of the model variant of given precision.
+
+    :param precision: One of :data:`PRECISIONS`, defaults to `fp32`.
+    :type precision: str, optional
+    :param root: Directory of the model files, defaults to the package
+        resources.
+    :type root: str, optional
+
+    :return: Path to the `.onnx` file.
+    :rtype: str
+    """
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}'. "
+                         f"Expected one of {PRECISIONS}.")
+    if precision == "fp32":
+        return join(root, "model.onnx")
+    return join(root, f"model.{precision}.onnx")
+
+
+class TileCalibrationReader:
+    """
+    Calibration data reader feeding preprocessed tile pairs to the static
+    quantization of onnxruntime.
+
+    :param samples: Iterable of preprocessed `(sen2, sen3)` input batches.
+    :type samples: Iterable[tuple[ndarray, ndarray]]
+    """
+
+    def __init__(self, samples: Iterable[tuple[ndarray, ndarray]]) -> None:
+        self.samples = list(samples)
+        self.rewind()
+
+    def get_next(self) -> dict | None:
+        return next(self.__feed, None)
+
+    def rewind(self) -> None:
+        self.__feed = ({"x": sen2, "y": sen3} for sen2, sen3 in self.samples)
+
+
+@dataclass
+class AccuracyGate:
+    """
+    Minimum agreement required between a variant and the full precision
+    model. The worst band of each metric is compared against the threshold.
+
+    :param min_r: Minimum Pearson correlation coefficient.
+    :type min_r: float
+    :param max_srmse: Maximum standardized RMSE.
+    :type max_srmse: float
+    :param min_ssim: Minimum global SSIM.
+    :type min_ssim: float
+    """
+    min_r: float = .99
+    max_srmse: float = .1
+    min_ssim: float = .98
+
+    def __call__(self, scores: dict[str, ndarray]) -> bool:
+        return bool(scores["r"].min() >= self.min_r and
+                    scores["srmse"].max() <= self.max_srmse and
+                    scores["ssim"].min() >= self.min_ssim)
+
+
+def quantize_model(precision: str, source: str, target: str,
+                   calibration: TileCalibrationReader = None) -> str:
+    """
+    Write a reduced precision variant of the `source` model to `target`.
+
+    :param precision: One of :data:`PRECISIONS` other than `fp32`.
+    :type precision: str
+    :param source: Path to the full precision model.
+    :type source: str
+    :param target: Path of the variant to produce.
+    :type target: str
+    :param calibration: Reader of calibration samples. Required for
+        `int8-static`.
+    :type calibration: :class:`TileCalibrationReader`, optional
+
+    :return: The target path.
+    :rtype: str
+    """
+    if precision == "int8-dynamic":
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(source, target, weight_type=QuantType.QInt8)
+
+    elif precision == "int8-static":
+        from onnxruntime.quantization import quantize_static, QuantFormat
+        assert calibration is not None, \
+            "Static quantization requires calibration samples."
+        calibration.rewind()
+        quantize_static(source, target, calibration,
+                        quant_format=QuantFormat.QDQ)
+
+    elif precision == "fp16":
+        try:
+            from onnx import load, save
+            from onnxconverter_common.float16 import \
+                convert_float_to_float16
+        except ImportError as e:
+            raise ImportError("fp16 conversion requires the `quantization` "
+                              "extra: pip install msi2slstr[quantization]"
+                              ) from e
+        # Keep float32 inputs and outputs so that feeds remain unchanged.
+        save(convert_float_to_float16(load(source), keep_io_types=True),
+             target)
+
+    else:
+        raise ValueError(f"Cannot produce a '{precision}' variant.")
+
+    return target
+
+
+def score_variant(reference, variant,
+                  samples: Iterable[tuple[ndarray, ndarray]]
+                  ) -> dict[str, ndarray]:
+    """
+    Score the outputs of a variant runtime against the reference runtime
+    using the registered metrics of :class:`Evaluate`.
+
+    :return: Per band mean value of each metric.
+    :rtype: dict[str, ndarray]
+    """
+    evaluate = Evaluate()
+    for sen2, sen3 in samples:
+        evaluate(reference(sen2, sen3)[0], variant(sen2, sen3)[0])
+    return evaluate.get_stats()
+
+
+def sample_tiles(data: Iterator, count: int, step: int = 1
+                 ) -> list[tuple[ndarray, ndarray]]:
+    """
+    Collect `count` batches from a tile iterator, every `step` batches.
+    """
+    return list(islice(data, 0, count * step, step))
+
+
+def build_variants(precisions: Iterable[str],
+                   samples: list[tuple[ndarray, ndarray]],
+                   gate: AccuracyGate = AccuracyGate(),
+                   root: str = RESOURCES) -> dict[str, dict]:
+    """
+    Produce, score and gate model variants of given precisions.
+
+    Variants failing the accuracy gate are removed.
+
+    :param precisions: Variants to produce.
+    :type precisions: Iterable[str]
+    :param samples: Preprocessed input batches used for calibration and
+        scoring.
+    :type samples: list[tuple[ndarray, ndarray]]
+    :param gate: Accuracy thresholds a variant has to satisfy.
+    :type gate: :class:`AccuracyGate`, optional
+    :param root: Directory of the model files.
+    :type root: str, optional
+
+    :return: Scores and acceptance per produced variant.
+    :rtype: dict[str, dict]
+    """
+    from .onnx import Runtime
+
+    source = get_model_path("fp32", root)
+    reference = Runtime("fp32", root=root)
+    calibration = TileCalibrationReader(samples)
+    report = {}
+
+    for precision in precisions:
+        target = quantize_model(precision, source,
+                                get_model_path(precision, root),
+                                calibration)
+        scores = score_variant(reference, Runtime(precision, root=root),
+                               samples)
+        accepted = gate(scores)
+        if not accepted:
+            remove(target)
+        report[precision] = {"accepted": accepted, **scores}
+
+    return report
@@ -0,0 +1,9 @@
+"""
+Package of the fusion service run by `msi2slstr serve`.
+
+Jobs are queued with priorities in a :class:`JobQueue`, run by a pool of
+worker threads sharing a warm runtime, and submitted and tracked over HTTP,
+on a local UNIX socket or TCP port, through :class:`Client`.
+"""
+from .jobs import Job, JobQueue, QueueFull
+from .server import Client, make_server
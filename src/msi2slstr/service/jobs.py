@@ -0,0 +1,175 @@
+"""
+Priority queue of fusion jobs run by a pool of worker threads.
+"""
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field, asdict
+from itertools import count
+from logging import getLogger
+from queue import PriorityQueue
+from threading import Thread, Lock
+from time import time
+from traceback import format_exc
+from uuid import uuid4
+
+
+#: States of a job, in the order they are reached.
+STATES = ("queued", "running", "done", "failed")
+
+logger = getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """
+    Raised when a job is submitted to a queue at capacity.
+    """
+
+
+@dataclass
+class Job:
+    """
+    A fusion job and its status.
+    """
+    #: Request the job was submitted with.
+    request: dict = field()
+    priority: int = field(default=0)
+    id: str = field(default_factory=lambda: uuid4().hex)
+    state: str = field(default="queued")
+    submitted: float = field(default_factory=time)
+    started: float = field(default=None)
+    finished: float = field(default=None)
+    #: Value returned by the runner, e.g. the path of the fused product.
+    result: object = field(default=None)
+    error: str = field(default=None)
+
+    def status(self) -> dict:
+        """
+        JSON serializable status of the job.
+        """
+        return asdict(self)
+
+
+class JobQueue:
+    """
+    Bounded priority queue of jobs, run by worker threads. Jobs of higher
+    priority run first and jobs of equal priority in submission order.
+
+    Submissions beyond `capacity` queued jobs are refused with
+    :class:`QueueFull`, so that clients back off instead of the queue
+    growing without bound.
+
+    :param run: Function running a job, called in a worker thread with the
+        job and returning its result.
+    :type run: Callable[[Job], object]
+    :param workers: Number of worker threads, defaults to 1.
+    :type workers: int, optional
+    :param capacity: Maximum number of queued jobs, defaults to 16.
+    :type capacity: int, optional
+    :param validate: Function checking a request on submission, raising
+        ValueError when it is invalid.
+    :type validate: Callable[[dict], None], optional
+    :param history: Number of finished jobs whose status is kept,
+        defaults to 256.
+    :type history: int, optional
+    """
+
+    def __init__(self, run: Callable[[Job], object], workers: int = 1,
+                 capacity: int = 16,
+                 validate: Callable[[dict], None] = None,
+                 history: int = 256) -> None:
+        assert workers > 0, "At least one worker is needed."
+        self.run = run
+        self.capacity = capacity
+        self.validate = validate
+        self.history = history
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self._queue = PriorityQueue()
+        self._order = count()
+        self._lock = Lock()
+        self._workers = [Thread(target=self._work, daemon=True,
+                                name=f"fusion_worker_{i}")
+                         for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def __len__(self) -> int:
+        return self.count("queued")
+
+    def count(self, state: str) -> int:
+        """
+        Number of known jobs in a state.
+        """
+        with self._lock:
+            return sum(job.state == state for job in self.jobs.values())
+
+    def submit(self, request: dict, priority: int = 0) -> Job:
+        """
+        Queue a job.
+
+        :raises ValueError: When `validate` rejects the request.
+        :raises QueueFull: When `capacity` jobs are already queued.
+        """
+        if self.validate:
+            self.validate(request)
+        with self._lock:
+            queued = sum(job.state == "queued" for job in self.jobs.values())
+            if queued >= self.capacity:
+                raise QueueFull(f"{queued} jobs are queued.")
+            job = Job(request, priority)
+            self.jobs[job.id] = job
+            self._forget()
+        self._queue.put((-priority, next(self._order), job))
+        logger.info("Queued job %s at priority %d.", job.id, priority)
+        return job
+
+    def get(self, id: str) -> Job | None:
+        with self._lock:
+            return self.jobs.get(id)
+
+    def statuses(self) -> list[dict]:
+        """
+        Status of all known jobs, in submission order.
+        """
+        with self._lock:
+            return [job.status() for job in self.jobs.values()]
+
+    def _forget(self) -> None:
+        # Oldest finished jobs are dropped beyond the history size.
+        finished = [id for id, job in self.jobs.items()
+                    if job.state in STATES[2:]]
+        for id in finished[:max(len(finished) - self.history, 0)]:
+            del self.jobs[id]
+
+    def _work(self) -> None:
+        while True:
+            *_, job = self._queue.get()
+            if job is None:
+                self._queue.task_done()
+                return
+            job.state, job.started = "running", time()
+            logger.info("Running job %s.", job.id)
+            try:
+                job.result = self.run(job)
+                job.state = "done"
+            except Exception:
+                job.error = format_exc()
+                job.state = "failed"
+                logger.error("Job %s failed:\n%s", job.id, job.error)
+            job.finished = time()
+            self._queue.task_done()
+
+    def join(self) -> None:
+        """
+        Wait for all queued jobs to finish.
+        """
+        self._queue.join()
+
+    def close(self) -> None:
+        """
+        Finish the queued jobs and stop the workers.
+        """
+        for _ in self._workers:
+            # Sentinels sort after every job.
+            self._queue.put((float("inf"), next(self._order), None))
+        for worker in self._workers:
+            worker.join()
@@ -0,0 +1,190 @@
+"""
+HTTP interface of the fusion service, served on a local UNIX socket or TCP
+port, and its client.
+
+Endpoints:
+
+    `POST /jobs`: Submit a job as a JSON request, with an optional integer
+    `priority`. Answers `202` with the job status, `400` for invalid
+    requests and `503` with a `Retry-After` header when the queue is full.
+
+    `GET /jobs`: Status of all known jobs.
+
+    `GET /jobs/<id>`: Status of a job, or `404`.
+
+    `GET /health`: Number of queued and running jobs.
+"""
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from json import dumps, loads
+from logging import getLogger
+from socket import socket, AF_UNIX, SOCK_STREAM
+from socketserver import ThreadingMixIn, UnixStreamServer
+
+from .jobs import JobQueue, QueueFull
+
+
+#: Seconds clients are asked to wait after a refused submission.
+RETRY_AFTER = 5
+
+logger = getLogger(__name__)
+
+
+class JobHandler(BaseHTTPRequestHandler):
+    """
+    Request handler of the job endpoints. The job queue is held by the
+    server.
+    """
+    server_version = "msi2slstr"
+
+    def address_string(self) -> str:
+        # Clients of UNIX sockets have no address.
+        return self.client_address[0] if self.client_address else "local"
+
+    def log_message(self, format: str, *args) -> None:
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def reply(self, code: int, body, headers: dict = {}) -> None:
+        content = dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for key, value in headers.items():
+            self.send_header(key, str(value))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def do_GET(self) -> None:
+        queue: JobQueue = self.server.queue
+        path = self.path.rstrip("/")
+
+        if path == "/health":
+            return self.reply(200, {"queued": queue.count("queued"),
+                                    "running": queue.count("running"),
+                                    "capacity": queue.capacity})
+        if path == "/jobs":
+            return self.reply(200, queue.statuses())
+        if path.startswith("/jobs/"):
+            job = queue.get(path.removeprefix("/jobs/"))
+            if job:
+                return self.reply(200, job.status())
+        self.reply(404, {"error": f"Not found: {self.path}"})
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/jobs":
+            return self.reply(404, {"error": f"Not found: {self.path}"})
+        try:
+            request = loads(self.rfile.read(
+                int(self.headers.get("Content-Length", 0))) or b"{}")
+            assert isinstance(request, dict), "Request is not an object."
+            priority = int(request.pop("priority", 0))
+            job = self.server.queue.submit(request, priority)
+        except QueueFull as e:
+            return self.reply(503, {"error": str(e)},
+                              {"Retry-After": RETRY_AFTER})
+        except (ValueError, AssertionError) as e:
+            return self.reply(400, {"error": str(e)})
+        self.reply(202, job.status())
+
+
+class UnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    """
+    Threading HTTP server on a UNIX socket.
+    """
+    daemon_threads = True
+
+
+def make_server(address: str, queue: JobQueue):
+    """
+    Create the server of a job queue.
+
+    :param address: Path of a UNIX socket, or `host:port` of a TCP socket.
+        Port 0 binds a free port.
+    :type address: str
+    :param queue: The queue jobs are submitted to.
+    :type queue: :class:`JobQueue`
+
+    :return: The server, with `queue` attached. Its `address` attribute is
+        the bound address in the form accepted by :class:`Client`.
+    """
+    host, _, port = address.rpartition(":")
+    if port.isdigit():
+        server = ThreadingHTTPServer((host or "localhost", int(port)),
+                                     JobHandler)
+        server.address = "%s:%d" % server.server_address[:2]
+    else:
+        server = UnixHTTPServer(address, JobHandler)
+        server.address = address
+    server.queue = queue
+    return server
+
+
+class UnixHTTPConnection(HTTPConnection):
+    """
+    HTTP connection over a UNIX socket.
+    """
+
+    def __init__(self, path: str, timeout: float = None) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self) -> None:
+        self.sock = socket(AF_UNIX, SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class Client:
+    """
+    Client of a fusion service.
+
+    :param address: Path of the UNIX socket, or `host:port` of the TCP
+        socket of the service.
+    :type address: str
+    :param timeout: Timeout of the requests in seconds.
+    :type timeout: float, optional
+    """
+
+    def __init__(self, address: str, timeout: float = 10.) -> None:
+        self.address = address
+        self.timeout = timeout
+
+    def _connection(self) -> HTTPConnection:
+        host, _, port = self.address.rpartition(":")
+        if port.isdigit():
+            return HTTPConnection(host, int(port), timeout=self.timeout)
+        return UnixHTTPConnection(self.address, timeout=self.timeout)
+
+    def request(self, method: str, path: str, body: dict = None
+                ) -> tuple[int, object]:
+        """
+        Send a request to the service.
+
+        :return: The status code and the decoded JSON body of the response.
+        :rtype: tuple[int, object]
+        """
+        connection = self._connection()
+        try:
+            connection.request(method, path,
+                               body=None if body is None else dumps(body),
+                               headers={"Content-Type": "application/json"})
+            response = connection.getresponse()
+            return response.status, loads(response.read() or b"null")
+        finally:
+            connection.close()
+
+    def submit(self, priority: int = 0, **request) -> tuple[int, dict]:
+        """
+        Submit a job, e.g. `submit(l1c=..., rbt=..., lst=..., output=...)`.
+        """
+        return self.request("POST", "/jobs", {**request,
+                                              "priority": priority})
+
+    def status(self, id: str = None) -> tuple[int, object]:
+        """
+        Status of a job, or of all known jobs.
+        """
+        return self.request("GET", f"/jobs/{id}" if id else "/jobs")
+
+    def health(self) -> tuple[int, dict]:
+        return self.request("GET", "/health")
@@ -0,0 +1,258 @@
+"""
+Ingestion of the archives dropped into landing directories, run by
+`msi2slstr watch`.
+
+Landing directories are polled for SAFE and SEN3 archives. An archive is
+indexed in the catalog once the files its manifest references are present
+and it has not changed for a settling period, so that archives still being
+written are not picked up. The catalog pairs indexed archives into fusion
+triplets, which are dispatched to a :class:`JobQueue`. Finished products
+are recorded in the catalog database and are not dispatched again, also
+across restarts. Failed jobs are retried a limited number of times before
+they are recorded as processed.
+"""
+from logging import getLogger
+from os import walk
+from os.path import join, abspath, getsize, getmtime, isdir
+from threading import Event
+from time import monotonic
+
+from .jobs import Job, JobQueue, QueueFull
+from ..data.catalog import Catalog, find_archives
+from ..data.dataclasses import Dir, isfile
+from ..data.staging import referenced_files
+from ..metadata.naming import ProductName
+
+
+PROCESSED = """
+CREATE TABLE IF NOT EXISTS processed (
+    product TEXT PRIMARY KEY,
+    l1c TEXT NOT NULL,
+    rbt TEXT NOT NULL,
+    lst TEXT NOT NULL,
+    state TEXT NOT NULL,
+    result TEXT,
+    finished REAL
+);
+CREATE TABLE IF NOT EXISTS failures (
+    product TEXT PRIMARY KEY,
+    attempts INTEGER NOT NULL,
+    error TEXT,
+    failed REAL
+);
+"""
+
+logger = getLogger(__name__)
+
+
+def signature(path: str) -> tuple[int, int]:
+    """
+    Number of files and total size of an archive, or of its zip.
+    """
+    if not isdir(path):
+        return 1, getsize(path)
+    files = [join(d, f) for d, _, names in walk(path) for f in names]
+    return len(files), sum(map(getsize, files))
+
+
+def is_complete(path: str) -> bool:
+    """
+    Whether the manifest of an archive and the files it references that are
+    read during preparation are present.
+    """
+    try:
+        archive = Dir(path)
+        return all(isfile(join(archive, f))
+                   for f in referenced_files(archive))
+    except Exception:
+        # Missing manifests and truncated zips.
+        return False
+
+
+class Watcher:
+    """
+    Poller of landing directories dispatching fusion jobs.
+
+    :param roots: Landing directories.
+    :type roots: list[str]
+    :param catalog: Catalog the archives are indexed in. The processed
+        products are recorded in its database.
+    :type catalog: :class:`Catalog`
+    :param queue: Queue of the fusion jobs.
+    :type queue: :class:`JobQueue`
+    :param within: Maximum difference of acquisition times of paired
+        archives in minutes, defaults to 5.
+    :type within: float, optional
+    :param settle: Seconds an archive has to stay unchanged before it is
+        indexed, defaults to 10.
+    :type settle: float, optional
+    :param request: Fields added to every job request, e.g. `output`.
+    :type request: dict, optional
+    :param attempts: Number of times a product is attempted before its
+        failure is final, defaults to 3.
+    :type attempts: int, optional
+    """
+
+    def __init__(self, roots: list[str], catalog: Catalog, queue: JobQueue,
+                 within: float = 5., settle: float = 10.,
+                 request: dict = None, attempts: int = 3) -> None:
+        self.roots = roots
+        self.catalog = catalog
+        self.queue = queue
+        self.within = within
+        self.settle = settle
+        self.request = request or {}
+        self.attempts = attempts
+        #: Dispatched jobs by product name.
+        self.pending: dict[str, Job] = {}
+        self._seen: dict[str, tuple[tuple[int, int], float]] = {}
+        self._indexed = {path: mtime for path, mtime in
+                         catalog.connection.execute(
+                             "SELECT path, mtime FROM products")}
+        catalog.connection.executescript(PROCESSED)
+
+    def processed(self, product: str) -> bool:
+        """
+        Whether a product has been recorded as processed.
+        """
+        return self.catalog.connection.execute(
+            "SELECT 1 FROM processed WHERE product = ?", (product,)
+        ).fetchone() is not None
+
+    def scan(self) -> int:
+        """
+        Index the archives of the landing directories that are complete and
+        settled.
+
+        :return: Number of archives indexed.
+        :rtype: int
+        """
+        now, ready = monotonic(), []
+        for path in map(abspath, (p for root in self.roots
+                                  for p in find_archives(root))):
+            try:
+                if self._indexed.get(path) == getmtime(path):
+                    continue
+                current = signature(path)
+            except OSError as e:
+                # Moved or removed since it was listed.
+                logger.warning("Skipping %s: %s", path, e)
+                self._seen.pop(path, None)
+                continue
+            previous, since = self._seen.get(path, (None, now))
+            if current != previous:
+                self._seen[path] = current, now
+            elif now - since >= self.settle and is_complete(path):
+                ready.append(path)
+
+        indexed = 0
+        for path in ready:
+            del self._seen[path]
+            try:
+                mtime = getmtime(path)
+                indexed += self.catalog.add(path, workers=0)
+            except OSError as e:
+                logger.warning("Skipping %s: %s", path, e)
+                continue
+            self._indexed[path] = mtime
+        if ready:
+            logger.info("Indexed %d new archives.", indexed)
+        return indexed
+
+    def collect(self) -> int:
+        """
+        Record the finished jobs as processed. Failed jobs are recorded as
+        processed once they failed `attempts` times, and are dispatched
+        again otherwise.
+
+        :return: Number of jobs recorded.
+        :rtype: int
+        """
+        finished = {product: job for product, job in self.pending.items()
+                    if job.state in ("done", "failed")}
+        with self.catalog.connection:
+            for product, job in finished.items():
+                if job.state == "done" or self._fail(product, job):
+                    self._record(product, job.request, job.state,
+                                 job.result and str(job.result),
+                                 job.finished)
+                del self.pending[product]
+        return len(finished)
+
+    def _fail(self, product: str, job: Job) -> bool:
+        """
+        Count a failed attempt of a product.
+
+        :return: Whether the failure is final.
+        :rtype: bool
+        """
+        self.catalog.connection.execute(
+            "INSERT INTO failures VALUES (?, 1, ?, ?) ON CONFLICT(product) "
+            "DO UPDATE SET attempts = attempts + 1, error = excluded.error, "
+            "failed = excluded.failed", (product, job.error, job.finished))
+        attempts, = self.catalog.connection.execute(
+            "SELECT attempts FROM failures WHERE product = ?", (product,)
+        ).fetchone()
+        logger.warning("Fusion of %s failed (attempt %d of %d).", product,
+                       attempts, self.attempts)
+        return attempts >= self.attempts
+
+    def _record(self, product: str, request: dict, state: str,
+                result: str = None, finished: float = None) -> None:
+        self.catalog.connection.execute(
+            "INSERT OR REPLACE INTO processed VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (product, request["l1c"], request["rbt"], request["lst"],
+             state, result, finished))
+
+    def dispatch(self) -> int:
+        """
+        Queue the fusion jobs of the triplets not processed or pending yet.
+        Triplets left over by a full queue are dispatched by a later call.
+
+        :return: Number of jobs queued.
+        :rtype: int
+        """
+        dispatched = 0
+        for l1c, rbt, lst, _ in self.catalog.triplets(self.within):
+            product = ProductName(l1c, rbt)
+            # Products are identified by name, so that archives delivered
+            # more than once are fused once.
+            if product in self.pending or self.processed(product):
+                continue
+            request = {**self.request, "l1c": l1c, "rbt": rbt, "lst": lst}
+            try:
+                self.pending[product] = self.queue.submit(request)
+            except QueueFull:
+                break
+            except ValueError as e:
+                logger.warning("Skipping %s: %s", product, e)
+                with self.catalog.connection:
+                    self._record(product, request, "invalid")
+                continue
+            dispatched += 1
+        return dispatched
+
+    def poll(self) -> int:
+        """
+        Scan the landing directories, record finished jobs and dispatch new
+        ones.
+
+        :return: Number of jobs queued.
+        :rtype: int
+        """
+        self.scan()
+        self.collect()
+        return self.dispatch()
+
+    def run(self, interval: float = 5., stop: Event = None) -> None:
+        """
+        Poll every `interval` seconds until `stop` is set. Errors of a poll,
+        e.g. a locked database, are logged and the next poll is attempted.
+        """
+        stop = stop or Event()
+        while not stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                logger.exception("Polling failed.")
+            stop.wait(interval)
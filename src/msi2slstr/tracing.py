@@ -0,0 +1,190 @@
+"""
+Timers and counters of the stages of a run.
+
+Stages are timed with :meth:`Tracer.span` or the :func:`traced` decorator
+and quantities are accumulated with :meth:`Tracer.count`, in the tracer
+active in the calling context, :data:`tracer`. Runs collect their own
+tracer with :func:`collect`, so that concurrent runs of a service report
+separately; outside of them, the process default tracer is used. The report
+summarizes the latencies of each stage and the throughput of the run as
+JSON.
+
+Memory is bounded per span name: counts, totals and maxima are exact, and
+latency percentiles are estimated from a uniform sample of the durations.
+
+Preparation stages build chains of virtual datasets, which are evaluated
+when they are first read. Their spans measure the building of each link;
+the deferred work is measured by the stages that read them, e.g. `crop` for
+the geolocation of Sentinel-3 data.
+"""
+from collections import defaultdict
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from json import dump
+from random import Random
+from threading import Lock
+from time import perf_counter
+
+from numpy import percentile
+
+
+#: Number of durations sampled per span name for the percentiles.
+SAMPLES = 4096
+
+
+class SpanStats:
+    """
+    Count, total and maximum of the durations of a span, and a uniform
+    sample of at most `size` of them.
+    """
+
+    def __init__(self, size: int = SAMPLES, seed: int = None) -> None:
+        self.size = size
+        self.count = 0
+        self.total = 0.
+        self.max = 0.
+        self.samples: list[float] = []
+        self._random = Random(seed)
+
+    def add(self, duration: float) -> None:
+        """
+        Record a duration, keeping it in the sample with probability
+        `size / count`.
+        """
+        self.count += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        if len(self.samples) < self.size:
+            self.samples.append(duration)
+            return
+        i = self._random.randrange(self.count)
+        if i < self.size:
+            self.samples[i] = duration
+
+    def summary(self) -> dict:
+        """
+        Count, total, mean, median, 95th percentile and maximum.
+        """
+        return {"count": self.count,
+                "total": self.total,
+                "mean": self.total / self.count,
+                "p50": float(percentile(self.samples, 50)),
+                "p95": float(percentile(self.samples, 95)),
+                "max": self.max}
+
+
+class Tracer:
+    """
+    Duration statistics of named spans and totals of named counters.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Drop all recorded spans and counters.
+        """
+        with self._lock:
+            self.start = perf_counter()
+            self.spans: dict[str, SpanStats] = defaultdict(SpanStats)
+            self.counters: dict[str, int] = defaultdict(int)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """
+        Time the enclosed block as a span of `name`.
+        """
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - start
+            with self._lock:
+                self.spans[name].add(elapsed)
+
+    def count(self, name: str, n: int = 1) -> None:
+        """
+        Add `n` to the counter of `name`.
+        """
+        with self._lock:
+            self.counters[name] += n
+
+    def report(self) -> dict:
+        """
+        Summary of the recorded spans and counters.
+
+        Latencies are in seconds. `tiles_per_second` relates the `tiles`
+        counter to the total duration of the `scene.fuse` spans.
+
+        :rtype: dict
+        """
+        with self._lock:
+            stages = {name: stats.summary() for name, stats
+                      in sorted(self.spans.items())}
+            counters = dict(self.counters)
+            wall_time = perf_counter() - self.start
+
+        fuse_time = stages.get("scene.fuse", {}).get("total")
+        return {
+            "wall_time": wall_time,
+            "tiles_per_second": counters.get("tiles", 0) / fuse_time
+            if fuse_time else None,
+            "stages": stages,
+            "counters": counters,
+        }
+
+    def write(self, path: str) -> None:
+        """
+        Write the report as JSON.
+        """
+        with open(path, "w") as file:
+            dump(self.report(), file, indent=2)
+
+
+_active: ContextVar[Tracer] = ContextVar("tracer", default=Tracer())
+
+
+class ActiveTracer:
+    """
+    Proxy of the tracer active in the calling context.
+    """
+
+    def __getattr__(self, name: str):
+        return getattr(_active.get(), name)
+
+
+#: The tracer active in the calling context: that of the enclosing
+#: :func:`collect`, or the process default.
+tracer = ActiveTracer()
+
+
+@contextmanager
+def collect() -> Iterator[Tracer]:
+    """
+    Record the spans and counters of the enclosed block, e.g. a run, in a
+    new tracer active in the calling context. Threads join the context with
+    :meth:`~msi2slstr.data.vsimem.VSIMemRegistry.bind`.
+    """
+    token = _active.set(Tracer())
+    try:
+        yield _active.get()
+    finally:
+        _active.reset(token)
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator timing every call of a function as a span of `name` in the
+    active tracer.
+    """
+    def decorator(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with tracer.span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,69 @@
+"""
+Definining postprocessor classes that finalize model outputs for writing and
+evaluation.
+"""
+
+from .normalization import Normalizer, ndarray
+
+from ..config import SEN3_MINMAX
+
+from .resizing import ValidAverageDownsampling
+
+from numpy import float32, empty, add, multiply
+
+
+class DataPostprocessor:
+    """
+    Class that fuses the de-normalization of model outputs with their
+    valid-average downsampling to the Sentinel-3 grid.
+
+    The output is processed in blocks of `scale` rows. Each block is reset to
+    its original value range in place and immediately aggregated while it is
+    still in cache, so no full-size temporaries are created.
+
+    :param scale: The downsampling factor in number of elements (pixels).
+    :type scale: int
+    :param e: A small constant added to the count of valid values to avoid
+        division by 0, defaults to 1e-10.
+    :type e: float, optional
+
+    .. automethod:: __call__
+    """
+
+    def __init__(self, scale: int, *, e: float = 1e-10) -> None:
+        self.scale = int(scale)
+        self.downsample = ValidAverageDownsampling(scale, e=e)
+        norm = Normalizer(*zip(*SEN3_MINMAX.values()))
+        self.factor = (norm.scale + norm.e).astype(float32)
+        self.offset = norm.offset.astype(float32)
+
+    def __call__(self, Y_hat: ndarray) -> tuple[ndarray, ndarray]:
+        """
+        Reset the value range of `Y_hat` in place and downsample it by
+        averaging its valid (positive) values.
+
+        :param Y_hat: 4D model output in normalized value range.
+        :type Y_hat: :class:`ndarray`
+
+        :return: `Y_hat` in its original value range and its downsampled
+            counterpart.
+        :rtype: tuple[ndarray, ndarray]
+        """
+        n, c, h, w = Y_hat.shape
+        s = self.scale
+        down = empty((n, c, -(-h // s), -(-w // s)), dtype=Y_hat.dtype)
+
+        for row in range(down.shape[-2]):
+            block = Y_hat[:, :, row * s: (row + 1) * s]
+            multiply(block, self.factor, out=block, casting="unsafe")
+            add(block, self.offset, out=block, casting="unsafe")
+            self.downsample(block, out=down[:, :, row: row + 1])
+
+        return Y_hat, down
+
+    def reset_value_range(self, array: ndarray) -> ndarray:
+        """
+        Return a copy of a normalized Sentinel-3 array in its original value
+        range.
+        """
+        return array * self.factor + self.offset
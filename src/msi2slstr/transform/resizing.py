@@ -1,35 +1,305 @@
+"""
+Spatial resampling kernels for 4D (N, C, H, W) arrays.
+
+Downsampling kernels produce `ceil(H / scale) x ceil(W / scale)` outputs,
+aggregating edge remainders over the elements they cover. Floating point
+inputs keep their data type; integer inputs are promoted to `float64`. All
+kernels accept an `out` array to write the result into.
+"""
 # import scipy
 import numpy as np
 
 
+def _result_type(array: np.ndarray) -> np.dtype:
+    if np.issubdtype(array.dtype, np.floating):
+        return array.dtype
+    return np.dtype(np.float64)
+
+
+def _output(array: np.ndarray, shape: tuple[int], out: np.ndarray = None
+            ) -> np.ndarray:
+    if out is None:
+        return np.empty(shape, dtype=_result_type(array))
+    assert out.shape == tuple(shape), \
+        f"Output of shape {out.shape} given, {tuple(shape)} expected."
+    return out
+
+
+def _valid(array: np.ndarray, nodata: float | None) -> np.ndarray:
+    """
+    Validity mask of given array. Without an explicit no-data value, only
+    positive values are valid.
+    """
+    if nodata is None:
+        return array > 0
+    if np.isnan(nodata):
+        return ~np.isnan(array)
+    return (array != nodata) & ~np.isnan(array)
+
+
+def _area_weights(size: int, scale: float, dtype: np.dtype) -> np.ndarray:
+    """
+    Matrix of the overlap of each output cell with each input element, along
+    one axis, for an output cell size of `scale` elements.
+    """
+    n_out = int(np.ceil(size / scale))
+    edges = np.minimum(np.arange(n_out + 1) * scale, size)
+    lower = np.maximum(edges[:-1, None], np.arange(size)[None])
+    upper = np.minimum(edges[1:, None], np.arange(1, size + 1)[None])
+    return (upper - lower).clip(0).astype(dtype)
+
+
+def _segments(size: int, scale: int) -> list[tuple[int, int, int]]:
+    """
+    Split an axis into its run of full blocks and its remainder, as
+    `(start, number of blocks, block size)` tuples.
+    """
+    full = size // scale
+    segments = [(0, full, scale)] if full else []
+    if size % scale:
+        segments.append((full * scale, 1, size % scale))
+    return segments
+
+
 class ValidAverageDownsampling:
     """
     Creates a spatially (meaning in x,y axes) coarser copy of the provided
     array by averaging the valid values.
 
+    By default the sum of each block is divided by the count of its positive
+    values. With an explicit `nodata` value, elements equal to it (or NaN)
+    are excluded from both, and blocks without valid elements are set to
+    `nodata`.
+
     :param scale: The area of the spatial aggregation in number of elements
         (pixels.)
     :param scale: int
+    :param nodata: Value marking invalid elements.
+    :type nodata: float, optional
+
+    .. automethod:: __call__
     """
 
-    def __init__(self, scale: int) -> None:
+    def __init__(self, scale: int, nodata: float = None, *,
+                 e: float = 1e-10) -> None:
         self.scale = int(scale)
+        self.nodata = nodata
+        self.e = e
+
+    def __call__(self, array: np.ndarray, out: np.ndarray = None
+                 ) -> np.ndarray:
+        """
+        :param array: 4D array to downsample.
+        :type array: :class:`ndarray`
+        :param out: Array of shape `(N, C, ceil(H / scale), ceil(W / scale))`
+            to write the result into.
+        :type out: :class:`ndarray`, optional
+
+        :return: The downsampled array.
+        :rtype: :class:`ndarray`
+        """
+        *lead, h, w = array.shape
+        s = self.scale
+        out = _output(array, (*lead, -(-h // s), -(-w // s)), out)
+
+        # Full blocks and edge remainders are reduced separately, each
+        # through a 6D view that splits the spatial axes into blocks.
+        for y, ny, sy in _segments(h, s):
+            for x, nx, sx in _segments(w, s):
+                region = array[..., y: y + ny * sy, x: x + nx * sx]\
+                    .reshape(*lead, ny, sy, nx, sx)
+                self._reduce(region, out[..., y // s: y // s + ny,
+                                         x // s: x // s + nx])
+        return out
+
+    def _reduce(self, blocks: np.ndarray, out: np.ndarray) -> None:
+        valid = _valid(blocks, self.nodata)
+        count = np.count_nonzero(valid, axis=(-1, -3))
 
-    def __call__(self, array: np.ndarray) -> np.ndarray:
-        shape = array.shape
-        array = array.reshape(shape[0], shape[1],
-                              shape[2] // self.scale,
-                              self.scale,
-                              shape[3] // self.scale,
-                              self.scale).swapaxes(-2, -3)
-        _sum = array.sum((-1, -2))
-        _nzerocount = (array > 0).sum((-1, -2))
-        return _sum / (_nzerocount + 1e-10)
+        if self.nodata is None:
+            _sum = blocks.sum((-1, -3), dtype=out.dtype)
+        else:
+            _sum = blocks.sum((-1, -3), dtype=out.dtype, where=valid)
+
+        np.divide(_sum, count + self.e, out=out, casting="unsafe")
+
+        if self.nodata is not None:
+            out[count == 0] = self.nodata
+
+
+class AreaDownsampling:
+    """
+    Area-weighted average downsampling by any scale factor larger than 1.
+    Every input element contributes in proportion to its overlap with the
+    output cell.
+
+    :param scale: The size of an output cell in number of input elements.
+    :type scale: float
+    :param nodata: Value marking elements to exclude from the average. The
+        same value marks output cells without any valid element.
+    :type nodata: float, optional
+
+    .. automethod:: __call__
+    """
+
+    def __init__(self, scale: float, nodata: float = None) -> None:
+        assert scale >= 1, "Scale has to be at least 1."
+        self.scale = scale
+        self.nodata = nodata
+
+    def __call__(self, array: np.ndarray, out: np.ndarray = None
+                 ) -> np.ndarray:
+        """
+        :param array: 4D array to downsample.
+        :type array: :class:`ndarray`
+        :param out: Array of shape `(N, C, ceil(H / scale), ceil(W / scale))`
+            to write the result into.
+        :type out: :class:`ndarray`, optional
+
+        :return: The downsampled array.
+        :rtype: :class:`ndarray`
+        """
+        dtype = _result_type(array)
+        Wy = _area_weights(array.shape[-2], self.scale, dtype)
+        Wx = _area_weights(array.shape[-1], self.scale, dtype)
+        out = _output(array, (*array.shape[:-2], len(Wy), len(Wx)), out)
+
+        if self.nodata is None:
+            area = Wy.sum(1)[:, None] * Wx.sum(1)[None]
+            return np.divide(Wy @ array.astype(dtype, copy=False) @ Wx.T,
+                             area, out=out, casting="unsafe")
+
+        valid = _valid(array, self.nodata)
+        values = np.where(valid, array, 0).astype(dtype, copy=False)
+        area = Wy @ valid.astype(dtype) @ Wx.T
+        np.divide(Wy @ values @ Wx.T, area, out=out, casting="unsafe",
+                  where=area > 0)
+        out[area == 0] = self.nodata
+        return out
+
+
+class BilinearDownsampling:
+    """
+    Downsampling by bilinear interpolation at the centre of each output
+    cell. Output cells at the edges are centred on the elements they cover.
+
+    :param scale: The size of an output cell in number of input elements.
+    :type scale: float
+    :param nodata: Value marking elements excluded from the interpolation.
+        Weights of the remaining neighbours are renormalized.
+    :type nodata: float, optional
+
+    .. automethod:: __call__
+    """
+
+    def __init__(self, scale: float, nodata: float = None) -> None:
+        assert scale >= 1, "Scale has to be at least 1."
+        self.scale = scale
+        self.nodata = nodata
+
+    def _coords(self, size: int) -> tuple[np.ndarray]:
+        start = np.arange(int(np.ceil(size / self.scale))) * self.scale
+        stop = np.minimum(start + self.scale, size)
+        centre = (start + stop) / 2 - .5
+        lower = np.floor(centre).astype(np.intp)
+        upper = np.minimum(lower + 1, size - 1)
+        return lower, upper, centre - lower
+
+    @staticmethod
+    def _interpolate(array: np.ndarray, coords: tuple[np.ndarray],
+                     axis: int) -> np.ndarray:
+        lower, upper, weight = coords
+        shape = [1] * array.ndim
+        shape[axis] = weight.size
+        weight = weight.reshape(shape).astype(array.dtype)
+        return array.take(lower, axis) * (1 - weight) +\
+            array.take(upper, axis) * weight
+
+    def __call__(self, array: np.ndarray, out: np.ndarray = None
+                 ) -> np.ndarray:
+        """
+        :param array: 4D array to downsample.
+        :type array: :class:`ndarray`
+        :param out: Array of shape `(N, C, ceil(H / scale), ceil(W / scale))`
+            to write the result into.
+        :type out: :class:`ndarray`, optional
+
+        :return: The downsampled array.
+        :rtype: :class:`ndarray`
+        """
+        dtype = _result_type(array)
+        rows = self._coords(array.shape[-2])
+        cols = self._coords(array.shape[-1])
+        out = _output(array,
+                      (*array.shape[:-2], rows[0].size, cols[0].size), out)
+
+        def interpolate(a):
+            return self._interpolate(self._interpolate(a, rows, -2), cols, -1)
+
+        if self.nodata is None:
+            out[...] = interpolate(array.astype(dtype, copy=False))
+            return out
+
+        valid = _valid(array, self.nodata)
+        weight = interpolate(valid.astype(dtype))
+        np.divide(interpolate(np.where(valid, array, 0).astype(dtype)),
+                  weight, out=out, casting="unsafe", where=weight > 0)
+        out[weight == 0] = self.nodata
+        return out
 
 
 class NearestNeighbourUpsampling:
+    """
+    Nearest neighbour upsampling by an integer factor.
+
+    :meth:`view` returns a zero-copy broadcast view of the upsampled array.
+    Calling the instance materializes it into `out` through broadcasting,
+    with a buffer of only `1 / scale` of the output size.
+
+    :param scale: The number of output elements per input element along
+        each spatial axis.
+    :type scale: int
+
+    .. automethod:: __call__
+    """
+
     def __init__(self, scale: int) -> None:
-        pass
+        self.scale = int(scale)
+
+    def view(self, array: np.ndarray) -> np.ndarray:
+        """
+        Read-only view of shape (N, C, H, scale, W, scale) where each element
+        is repeated through 0-strides.
+
+        :param array: 4D array to upsample.
+        :type array: :class:`ndarray`
+
+        :rtype: :class:`ndarray`
+        """
+        *lead, h, w = array.shape
+        return np.broadcast_to(array[..., :, None, :, None],
+                               (*lead, h, self.scale, w, self.scale))
+
+    def __call__(self, array: np.ndarray, out: np.ndarray = None
+                 ) -> np.ndarray:
+        """
+        :param array: 4D array to upsample.
+        :type array: :class:`ndarray`
+        :param out: C-contiguous array of shape
+            `(N, C, H * scale, W * scale)` to write the result into.
+        :type out: :class:`ndarray`, optional
+
+        :return: The upsampled array.
+        :rtype: :class:`ndarray`
+        """
+        *lead, h, w = array.shape
+        s = self.scale
+        if out is None:
+            out = np.empty((*lead, h * s, w * s), dtype=array.dtype)
+        assert out.flags.c_contiguous, "Output has to be C-contiguous."
 
-    def __call__(self, array: np.ndarray) -> np.ndarray:
-        pass
+        # Widen each row once, then broadcast the widened rows into the
+        # output so that the bulk copy runs over contiguous rows.
+        rows = self.view(array)[..., 0, :, :].reshape(*lead, h, w * s)
+        out.reshape(*lead, h, s, w * s)[...] = rows[..., :, None, :]
+        return out
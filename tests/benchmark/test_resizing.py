@@ -0,0 +1,72 @@
+import unittest
+
+from os import environ
+from timeit import repeat
+
+import numpy as np
+
+from msi2slstr.transform.resizing import ValidAverageDownsampling
+from msi2slstr.transform.resizing import NearestNeighbourUpsampling
+
+
+#: Allowed slowdown relative to the reference implementations.
+TOLERANCE = 1.5
+
+#: Timings are only asserted on request, as they depend on the machine.
+TIMED = bool(environ.get("MSI2SLSTR_BENCHMARK"))
+
+
+def reference_downsampling(array: np.ndarray, scale: int) -> np.ndarray:
+    """
+    Previous implementation of :class:`ValidAverageDownsampling`.
+    """
+    shape = array.shape
+    array = array.reshape(shape[0], shape[1],
+                          shape[2] // scale, scale,
+                          shape[3] // scale, scale).swapaxes(-2, -3)
+    _sum = array.sum((-1, -2))
+    _nzerocount = (array > 0).sum((-1, -2))
+    return _sum / (_nzerocount + 1e-10)
+
+
+def reference_upsampling(array: np.ndarray, scale: int) -> np.ndarray:
+    return array.repeat(scale, -1).repeat(scale, -2)
+
+
+def best_of(statement, number: int = 5) -> float:
+    return min(repeat(statement, number=number, repeat=5)) / number
+
+
+class BenchmarkResizing(unittest.TestCase):
+    tile = np.random.rand(1, 12, 500, 500).astype(np.float32)
+    coarse = np.random.rand(1, 12, 10, 10).astype(np.float32)
+
+    def test_valid_average_downsampling(self):
+        down = ValidAverageDownsampling(50)
+        self.assertTrue(np.allclose(down(self.tile),
+                                    reference_downsampling(self.tile, 50)))
+
+    def test_nearest_neighbour_upsampling(self):
+        up = NearestNeighbourUpsampling(50)
+        out = np.empty_like(self.tile)
+        self.assertIs(up(self.coarse, out=out), out)
+        self.assertTrue(np.array_equal(out,
+                                       reference_upsampling(self.coarse, 50)))
+
+    @unittest.skipUnless(TIMED, "Set MSI2SLSTR_BENCHMARK to time kernels.")
+    def test_downsampling_time(self):
+        down = ValidAverageDownsampling(50)
+        current = best_of(lambda: down(self.tile))
+        reference = best_of(lambda: reference_downsampling(self.tile, 50))
+        self.assertLess(current, reference * TOLERANCE)
+
+    @unittest.skipUnless(TIMED, "Set MSI2SLSTR_BENCHMARK to time kernels.")
+    def test_upsampling_time(self):
+        # Upsampling into a given buffer saves the allocations of the
+        # reference; it copies as much memory and is not expected to be
+        # faster.
+        up = NearestNeighbourUpsampling(50)
+        out = np.empty_like(self.tile)
+        current = best_of(lambda: up(self.coarse, out=out))
+        reference = best_of(lambda: reference_upsampling(self.coarse, 50))
+        self.assertLess(current, reference * TOLERANCE)
@@ -0,0 +1,48 @@
+import unittest
+import subprocess
+import sys
+
+from os import environ, pathsep
+from os.path import dirname, join
+from time import perf_counter
+
+
+#: Allowed import overhead of the command line module, in seconds, on top of
+#: a bare interpreter start.
+STARTUP_BUDGET = 1.
+
+#: Modules that must only be imported by the commands that use them.
+DEFERRED = ("arosics", "onnxruntime", "osgeo_utils.gdal_calc", "osgeo")
+
+
+def run_python(*args: str) -> tuple[float, subprocess.CompletedProcess]:
+    env = dict(environ)
+    src = join(dirname(__file__), "..", "..", "src")
+    env["PYTHONPATH"] = pathsep.join(filter(None, [src,
+                                                   env.get("PYTHONPATH")]))
+    start = perf_counter()
+    process = subprocess.run([sys.executable, *args], env=env,
+                             capture_output=True, text=True)
+    return perf_counter() - start, process
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_deferred_imports(self):
+        _, process = run_python(
+            "-c", "import sys, msi2slstr.__main__;"
+            f"print(*[m for m in {DEFERRED} if m in sys.modules])")
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertEqual(process.stdout.strip(), "")
+
+    def test_help_budget(self):
+        baseline = min(run_python("-c", "pass")[0] for _ in range(3))
+        elapsed, process = min((run_python("-m", "msi2slstr", "--help")
+                                for _ in range(3)), key=lambda x: x[0])
+        self.assertEqual(process.returncode, 0, process.stderr)
+        self.assertLess(elapsed - baseline, STARTUP_BUDGET)
+
+    def test_argument_error(self):
+        _, process = run_python("-m", "msi2slstr", "-l1c", "missing")
+        self.assertEqual(process.returncode, 2)
+        self.assertNotIn("Traceback", process.stderr)
@@ -0,0 +1,40 @@
+import unittest
+
+from unittest.mock import patch
+from msi2slstr.config import get_onnx_providers
+from msi2slstr.config.libloader import probe_cuda
+
+
+class TestDeviceSelection(unittest.TestCase):
+    def test_cpu_skips_probe(self):
+        with patch("msi2slstr.config.is_cuda_available") as available:
+            self.assertListEqual(get_onnx_providers("cpu"),
+                                 ["CPUExecutionProvider"])
+            available.assert_not_called()
+
+    def test_auto_fallback(self):
+        with patch("msi2slstr.config.is_cuda_available", return_value=False):
+            self.assertListEqual(get_onnx_providers("auto"),
+                                 ["CPUExecutionProvider"])
+
+    def test_auto_cuda(self):
+        with patch("msi2slstr.config.is_cuda_available", return_value=True):
+            self.assertEqual(get_onnx_providers("auto")[0],
+                             "CUDAExecutionProvider")
+
+    def test_cuda_unavailable(self):
+        with patch("msi2slstr.config.is_cuda_available", return_value=False):
+            self.assertRaises(RuntimeError, get_onnx_providers, "cuda")
+
+    def test_cuda_provider_missing(self):
+        with patch("msi2slstr.config.is_cuda_available", return_value=False):
+            with patch("msi2slstr.config.libloader.probe_cuda",
+                       return_value=()):
+                self.assertRaisesRegex(RuntimeError, "onnxruntime build",
+                                       get_onnx_providers, "cuda")
+
+    def test_unknown_device(self):
+        self.assertRaises(ValueError, get_onnx_providers, "tpu")
+
+    def test_probe_cached(self):
+        self.assertIs(probe_cuda(), probe_cuda())
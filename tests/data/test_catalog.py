@@ -0,0 +1,73 @@
+import unittest
+
+from os.path import join, dirname
+from shutil import copytree
+from tempfile import TemporaryDirectory
+
+from msi2slstr.data.catalog import Catalog, describe, contains, region
+
+
+DATA = join(dirname(dirname(__file__)), "_test_data")
+
+
+class TestCatalog(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.catalog = Catalog(":memory:")
+
+    def tearDown(self) -> None:
+        self.catalog.close()
+        super().tearDown()
+
+    def test_describe(self):
+        products = [describe(join(DATA, name)) for name in (
+            "S2A_MSIL1C_20230908T093041_N0509_R136_T34TET_20230908T114330"
+            ".SAFE",
+            "S3B_SL_1_RBT____20230908T093409_20230908T093709_20230909T050257"
+            "_0179_083_364_2160_PS2_O_NT_004.SEN3")]
+        self.assertEqual([p.kind for p in products], ["L1C", "RBT"])
+        self.assertEqual(products[0].tile, "T34TET")
+        self.assertTrue(contains(products[1].footprint,
+                                 products[0].footprint))
+
+    def test_incremental_update(self):
+        self.assertEqual(self.catalog.update(DATA, workers=2), 3)
+        self.assertEqual(self.catalog.update(DATA, workers=2), 0)
+        self.assertEqual(len(self.catalog), 3)
+
+    def test_update_sibling_roots(self):
+        with TemporaryDirectory() as tmp:
+            copytree(DATA, join(tmp, "S2"))
+            copytree(DATA, join(tmp, "S2_old"))
+            self.catalog.update(join(tmp, "S2"), join(tmp, "S2_old"),
+                                workers=0)
+            self.catalog.update(join(tmp, "S2"), workers=0)
+            # Archives of a root sharing a name prefix are kept.
+            self.assertEqual(len(self.catalog), 6)
+
+    def test_triplets(self):
+        self.catalog.update(DATA, workers=2)
+        triplets = list(self.catalog.triplets(5))
+
+        self.assertEqual(len(triplets), 1)
+        l1c, rbt, lst, dt = triplets[0]
+        self.assertIn("RBT", rbt)
+        self.assertIn("LST", lst)
+        self.assertLess(dt, 5)
+        self.assertEqual(list(self.catalog.triplets(1)), [])
+
+    def test_contains(self):
+        square = [(0, 0), (2, 0), (2, 2), (0, 2)]
+        self.assertTrue(contains(square, [(1, 1), (.5, 1.5)]))
+        self.assertFalse(contains(square, [(1, 1), (3, 1)]))
+
+    def test_region(self):
+        l1c = join(DATA, "S2A_MSIL1C_20230908T093041_N0509_R136_T34TET_"
+                   "20230908T114330.SAFE")
+        lon_min, lat_min, lon_max, lat_max = region(l1c, margin=0)
+
+        self.assertAlmostEqual(lon_min, 21, 2)
+        self.assertAlmostEqual(lat_max, 47.85, 2)
+        self.assertEqual(region(l1c, margin=.5)[0], lon_min - .5)
+        self.assertIsNone(region(l1c, join(DATA, "missing.SAFE")))
@@ -0,0 +1,39 @@
+import unittest
+
+from os.path import join
+from tempfile import TemporaryDirectory
+from zipfile import ZipFile
+
+from msi2slstr.data.dataclasses import Dir, File, XML
+
+
+class TestZipArchives(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp = TemporaryDirectory()
+        self.zip = join(self.tmp.name, "PRODUCT.SAFE.zip")
+        with ZipFile(self.zip, "w") as archive:
+            archive.writestr("PRODUCT.SAFE/manifest.safe",
+                             "<root><item href='a'/></root>")
+            archive.writestr("PRODUCT.SAFE/GRANULE/band.jp2", b"0")
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+        super().tearDown()
+
+    def test_resolved_to_vsizip(self):
+        directory = Dir(self.zip)
+        self.assertTrue(directory.path.startswith("/vsizip/"))
+        self.assertTrue(directory.path.endswith("PRODUCT.SAFE"))
+
+    def test_members(self):
+        directory = Dir(self.zip)
+        File(join(directory, "GRANULE", "band.jp2"))
+        Dir(join(directory, "GRANULE"))
+        self.assertRaises(AssertionError, File,
+                          join(directory, "missing.jp2"))
+
+    def test_xml(self):
+        manifest = XML(join(Dir(self.zip), "manifest.safe"))
+        self.assertEqual(manifest[0].get("href"), "a")
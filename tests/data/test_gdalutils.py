@@ -0,0 +1,20 @@
+import unittest
+
+from msi2slstr.data.gdalutils import create_mem_dataset, extract_band
+
+from numpy import arange, float32, array_equal
+
+
+class TestExtractBand(unittest.TestCase):
+    dataset = create_mem_dataset(8, 6, 3,
+                                 geotransform=(0, 10, 0, 60, 0, -10))
+    data = arange(3 * 6 * 8, dtype=float32).reshape(3, 6, 8)
+    dataset.WriteArray(data, band_list=[1, 2, 3])
+
+    def test_single_band(self):
+        band = extract_band(self.dataset, 2, "/vsimem/test_extract.tif")
+
+        self.assertEqual(band.RasterCount, 1)
+        self.assertEqual(band.GetGeoTransform(),
+                         self.dataset.GetGeoTransform())
+        self.assertTrue(array_equal(band.ReadAsArray(), self.data[1]))
@@ -0,0 +1,59 @@
+import unittest
+
+from os.path import dirname, exists
+from tempfile import TemporaryDirectory
+
+from msi2slstr.data.gdalutils import create_mem_dataset, Translate
+from msi2slstr.data.gdalutils import TranslateOptions
+from msi2slstr.data.materialization import MaterializationPolicy
+from msi2slstr.data.vsimem import registry
+
+
+class Stage:
+    def __init__(self, dataset) -> None:
+        self.dataset = dataset
+
+
+class TestMaterializationPolicy(unittest.TestCase):
+    source = create_mem_dataset(100, 100, 2)
+
+    def lazy(self):
+        return Stage(Translate("", self.source,
+                               options=TranslateOptions(format="VRT")))
+
+    def test_lazy(self):
+        stage = self.lazy()
+        MaterializationPolicy({"sen3_input": "lazy"})("sen3_input", stage)
+        self.assertEqual(stage.dataset.GetDriver().ShortName, "VRT")
+
+    def test_auto_small_in_memory(self):
+        stage = self.lazy()
+        MaterializationPolicy()("sen3_input", stage)
+        self.assertEqual(stage.dataset.GetDriver().ShortName, "MEM")
+
+    def test_vsimem_strips(self):
+        stage = Stage(create_mem_dataset(50, 1000, 1))
+        MaterializationPolicy({"sen2_input": "vsimem"})("sen2_input", stage)
+        self.assertEqual(stage.dataset.GetDriver().ShortName, "GTiff")
+        self.assertEqual(stage.dataset.GetRasterBand(1).GetBlockSize()[1],
+                         500)
+
+    def test_disk_per_scene(self):
+        with TemporaryDirectory() as scratch:
+            policy = MaterializationPolicy({"sen3_swath": "disk"},
+                                           scratch=scratch)
+            with registry.scope("a"):
+                a = self.lazy()
+                policy("sen3_swath", a)
+                with registry.scope("b"):
+                    b = self.lazy()
+                    policy("sen3_swath", b)
+                    path = b.dataset.GetDescription()
+                    self.assertNotEqual(a.dataset.GetDescription(), path)
+                    del b
+                self.assertFalse(exists(dirname(path)))
+                del a
+
+    def test_unknown_stage(self):
+        self.assertRaises(AssertionError, MaterializationPolicy,
+                          {"sen2": "mem"})
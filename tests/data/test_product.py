@@ -0,0 +1,29 @@
+import unittest
+
+from msi2slstr.data.gdalutils import create_mem_dataset
+from msi2slstr.data.product import read_tile_row, iter_tile_pairs
+
+from numpy import arange, float32, array_equal
+
+
+class TestProductTiles(unittest.TestCase):
+    product = create_mem_dataset(25, 15, 2,
+                                 geotransform=(0, 10, 0, 150, 0, -10))
+    sen3 = create_mem_dataset(5, 3, 2,
+                              geotransform=(0, 50, 0, 150, 0, -50))
+    data = arange(2 * 15 * 25, dtype=float32).reshape(2, 15, 25)
+    product.WriteArray(data, band_list=[1, 2])
+
+    def test_tile_row(self):
+        tiles = read_tile_row(self.product, 1, 5)
+
+        self.assertEqual(tiles.shape, (5, 2, 5, 5))
+        self.assertTrue(array_equal(tiles[1], self.data[:, 5:10, 5:10]))
+
+    def test_pairs(self):
+        pairs = list(iter_tile_pairs(self.product, self.sen3, 5))
+
+        self.assertEqual(len(pairs), 3)
+        for Y_hat, sen3 in pairs:
+            self.assertEqual(Y_hat.shape, (5, 2, 5, 5))
+            self.assertEqual(sen3.shape, (5, 2, 1, 1))
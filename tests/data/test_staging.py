@@ -0,0 +1,79 @@
+import unittest
+
+from os import makedirs
+from os.path import join, exists
+from tempfile import TemporaryDirectory
+
+from msi2slstr.data.dataclasses import Dir
+from msi2slstr.data.staging import referenced_files, stage
+
+
+MANIFEST = """<xfdu>
+<informationPackageMap/>
+<metadataSection/>
+<dataObjectSection>
+{}
+</dataObjectSection>
+</xfdu>"""
+
+OBJECT = "<dataObject><byteStream><fileLocation href='./{}'/></byteStream>"\
+    "</dataObject>"
+
+FILES = ("S1_radiance_an.nc", "geodetic_an.nc", "flags_an.nc")
+
+
+class TestStaging(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp = TemporaryDirectory()
+        self.archive = join(self.tmp.name, "source", "PRODUCT.SEN3")
+        makedirs(self.archive)
+        with open(join(self.archive, "xfdumanifest.xml"), "w") as f:
+            f.write(MANIFEST.format("".join(map(OBJECT.format, FILES))))
+        for name in FILES:
+            with open(join(self.archive, name), "wb") as f:
+                f.write(b"0" * 1024)
+
+    def tearDown(self) -> None:
+        self.tmp.cleanup()
+        super().tearDown()
+
+    def test_referenced_files(self):
+        self.assertEqual(referenced_files(self.archive),
+                         ["xfdumanifest.xml", "S1_radiance_an.nc",
+                          "geodetic_an.nc"])
+
+    def test_copy(self):
+        with stage(Dir(self.archive), scratch=self.tmp.name) as (staged,):
+            self.assertTrue(staged.path.endswith("PRODUCT.SEN3"))
+            self.assertTrue(exists(join(staged, "S1_radiance_an.nc")))
+            self.assertFalse(exists(join(staged, "flags_an.nc")))
+        self.assertFalse(exists(staged.path))
+
+    def test_same_names(self):
+        other = join(self.tmp.name, "other", "PRODUCT.SEN3")
+        makedirs(other)
+        with open(join(other, "xfdumanifest.xml"), "w") as f:
+            f.write(MANIFEST.format(OBJECT.format(FILES[1])))
+        with open(join(other, FILES[1]), "wb") as f:
+            f.write(b"1" * 1024)
+
+        with stage(Dir(self.archive), Dir(other), scratch=self.tmp.name
+                   ) as (first, second):
+            self.assertNotEqual(first.path, second.path)
+            self.assertTrue(second.path.endswith("PRODUCT.SEN3"))
+            self.assertTrue(exists(join(first, "S1_radiance_an.nc")))
+            with open(join(second, FILES[1]), "rb") as f:
+                self.assertEqual(f.read(1), b"1")
+
+    def test_missing_manifest(self):
+        empty = join(self.tmp.name, "EMPTY.SEN3")
+        makedirs(empty)
+        with self.assertRaisesRegex(FileNotFoundError, "EMPTY.SEN3"):
+            referenced_files(empty)
+
+    def test_fadvise(self):
+        with stage(Dir(self.archive), mode="fadvise") as (staged,):
+            self.assertEqual(staged.path, self.archive)
+        self.assertTrue(exists(self.archive))
@@ -0,0 +1,83 @@
+import unittest
+
+from msi2slstr.data.tiling import TileIndex, ReadCounter, hilbert_order
+
+from numpy import zeros, abs
+
+
+class TestTileIndex(unittest.TestCase):
+
+    def test_non_square_grid(self):
+        index = TileIndex(10, 30, 20)
+        self.assertEqual(len(index), 6)
+        self.assertEqual(list(index)[3:], [(0, 10, 10, 10),
+                                           (10, 10, 10, 10),
+                                           (20, 10, 10, 10)])
+
+    def test_padded_edges(self):
+        index = TileIndex(10, 25, 15, pad=True)
+        coverage = zeros((15, 25))
+        for xoff, yoff, xsize, ysize in index:
+            coverage[yoff: yoff + ysize, xoff: xoff + xsize] += 1
+        self.assertTrue((coverage == 1).all())
+
+    def test_read_window(self):
+        index = TileIndex(10, 25, 15, pad=True, halo=2)
+        window, padding = index.read_window(0)
+        self.assertEqual(window, (0, 0, 12, 12))
+        self.assertEqual(padding, ((2, 0), (2, 0)))
+
+        window, padding = index.read_window(5)
+        self.assertEqual(window, (18, 8, 7, 7))
+        self.assertEqual(padding, ((0, 7), (0, 7)))
+        self.assertEqual(index.core(5), (slice(2, 7), slice(2, 7)))
+
+    def test_orders_visit_all_tiles(self):
+        tiles = {tuple(t) for t in TileIndex(10, 70, 30).tiles}
+        for order in ("serpentine", "hilbert"):
+            index = TileIndex(10, 70, 30, order=order)
+            self.assertEqual({tuple(t) for t in index.tiles}, tiles)
+
+    def test_serpentine(self):
+        index = TileIndex(10, 30, 20, order="serpentine")
+        self.assertEqual([tuple(t) for t in index.tiles],
+                         [(0, 0), (1, 0), (2, 0), (2, 1), (1, 1), (0, 1)])
+        steps = abs(index.tiles[1:] - index.tiles[:-1])
+        self.assertTrue((steps.sum(-1) == 1).all())
+
+    def test_hilbert_adjacency(self):
+        steps = abs(hilbert_order(8, 8)[1:] - hilbert_order(8, 8)[:-1])
+        self.assertTrue((steps.sum(-1) == 1).all())
+
+    def test_scaled(self):
+        index = TileIndex(500, 10500, 10000, order="hilbert")
+        scaled = index.scaled(50)
+        self.assertEqual(len(scaled), len(index))
+        for fine, coarse in zip(index, scaled):
+            self.assertEqual(tuple(v // 50 for v in fine), coarse)
+
+    def test_blocks(self):
+        index = TileIndex(500, 1000, 1000, block=(128, 128))
+        self.assertEqual(index.blocks(0), 16)
+        self.assertEqual(index.blocks(3), 25)
+
+    def test_amplification(self):
+        aligned = TileIndex(500, 1000, 1000, block=(500, 500))
+        self.assertEqual(aligned.amplification(), 1)
+        unaligned = TileIndex(500, 1000, 1000, block=(128, 128))
+        self.assertAlmostEqual(unaligned.amplification(),
+                               (16 + 20 + 20 + 25) * 128 ** 2 / 1000 ** 2)
+
+
+class TestReadCounter(unittest.TestCase):
+
+    def test_update(self):
+        index = TileIndex(500, 1000, 1000, block=(128, 128))
+        counter = ReadCounter()
+        for i in range(len(index)):
+            counter.update(index, i)
+
+        self.assertEqual(counter.requests, 4)
+        self.assertEqual(counter.elements, 1000 ** 2)
+        self.assertAlmostEqual(counter.amplification,
+                               index.amplification())
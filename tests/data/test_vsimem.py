@@ -0,0 +1,71 @@
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from os.path import dirname, exists
+from tempfile import TemporaryDirectory
+from threading import Thread
+
+from msi2slstr.data.gdalutils import create_dataset
+from msi2slstr.data.vsimem import VSIMemRegistry
+
+
+class TestVSIMemRegistry(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.registry = VSIMemRegistry("/vsimem/test_registry")
+
+    def write(self, name: str) -> str:
+        path = self.registry.path(name)
+        dataset = create_dataset(10, 10, 1, driver="GTiff", name=path)
+        dataset.FlushCache()
+        return path
+
+    def test_unique_names(self):
+        self.assertNotEqual(self.registry.path("a.tif"),
+                            self.registry.path("a.tif"))
+
+    def test_scope_cleanup(self):
+        with self.registry.scope("scene") as scope:
+            self.write("a.tif")
+            self.write("b.tif")
+            sizes = self.registry.report()
+            self.assertEqual(len(sizes), 2)
+            self.assertTrue(all(size > 0 for size in sizes.values()))
+
+        self.assertEqual(self.registry.report(scope), {})
+        self.assertEqual(self.registry.scopes, set())
+
+    def test_threads_join_scope(self):
+        paths = []
+        with self.registry.scope("scene") as scope:
+            def task():
+                with self.registry.use(scope):
+                    paths.append(self.registry.path("a.tif"))
+            thread = Thread(target=task)
+            thread.start()
+            thread.join()
+            paths.append(self.registry.path("a.tif"))
+
+        self.assertTrue(all(p.startswith(scope) for p in paths))
+        self.assertFalse(self.registry.current.startswith(scope))
+
+    def test_bind(self):
+        with self.registry.scope("scene") as scope:
+            with ThreadPoolExecutor(2) as executor:
+                paths = list(executor.map(
+                    self.registry.bind(self.registry.path), ("a", "b")))
+
+        self.assertTrue(all(p.startswith(scope) for p in paths))
+
+    def test_scratch_cleanup(self):
+        with TemporaryDirectory() as tmp:
+            with self.registry.scope("a"):
+                a = self.registry.scratch_path(tmp, "x.tif")
+                with self.registry.scope("b"):
+                    b = self.registry.scratch_path(tmp, "x.tif")
+                open(a, "w").close()
+                self.assertNotEqual(dirname(a), dirname(b))
+                self.assertFalse(exists(dirname(b)))
+                self.assertTrue(exists(a))
+            self.assertFalse(exists(dirname(a)))
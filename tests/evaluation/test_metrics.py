@@ -2,6 +2,7 @@ import unittest
 import numpy as np
 
 from msi2slstr.evaluation.metrics import r, srmse, ssim
+from msi2slstr.evaluation.metrics import Moments, LocalMoments
 
 
 class Test_Pearson(unittest.TestCase):
@@ -47,6 +48,10 @@ class Test_SRMSE(unittest.TestCase):
         self.assertTrue((result > 1).all())
         self.assertTrue((result < 2).all())
 
+    def test_bound(self):
+        result = srmse(self.a * 1e6 + 1e7, -self.a * 1e6 - 1e7)
+        self.assertTrue((result <= 2).all())
+
 
 class Test_SSIM(unittest.TestCase):
     def setUp(self) -> None:
@@ -64,3 +69,67 @@ class Test_SSIM(unittest.TestCase):
     def test_output_shape(self):
         result = ssim(self.a, self.a)
         self.assertTrue(result.shape[-1] == self.a.shape[-3])
+
+
+class Test_Moments(unittest.TestCase):
+    x = np.random.rand(2, 12, 10, 10).astype(np.float32) + 100
+    y = np.random.rand(2, 12, 10, 10).astype(np.float32) + 100
+
+    def test_shape(self):
+        self.assertEqual(Moments(self.x, self.y).shape, (2, 12, 1, 1))
+        self.assertEqual(Moments(self.x, self.y, None).shape, (1, 1, 1, 1))
+
+    def test_statistics(self):
+        m = Moments(self.x, self.y)
+        x = self.x.astype(np.float64)
+        y = self.y.astype(np.float64)
+        self.assertTrue(np.allclose(m.mean_x, x.mean((-1, -2), keepdims=True)))
+        self.assertTrue(np.allclose(m.var_y, y.var((-1, -2), keepdims=True)))
+        self.assertTrue(np.allclose(
+            m.cov, ((x - x.mean((-1, -2), keepdims=True)) *
+                    (y - y.mean((-1, -2), keepdims=True))
+                    ).mean((-1, -2), keepdims=True)))
+
+    def test_shared_moments(self):
+        m = Moments(self.x, self.y)
+        for metric in (r, srmse, ssim):
+            self.assertTrue(np.allclose(metric.from_moments(m),
+                                        metric(self.x, self.y)))
+
+    def test_reference_values(self):
+        x = self.x.astype(np.float64)
+        y = self.y.astype(np.float64)
+        xn = x - x.mean((-1, -2), keepdims=True)
+        yn = y - y.mean((-1, -2), keepdims=True)
+        pearson = (xn * yn).sum((-1, -2)) / np.sqrt(
+            (xn ** 2).sum((-1, -2)) * (yn ** 2).sum((-1, -2)))
+        rmse = np.sqrt(((xn / x.std((-1, -2), keepdims=True) -
+                         yn / y.std((-1, -2), keepdims=True)) ** 2
+                        ).mean((-1, -2)))
+        self.assertTrue(np.allclose(r(self.x, self.y), pearson, atol=1e-6))
+        self.assertTrue(np.allclose(srmse(self.x, self.y), rmse, atol=1e-6))
+
+
+class Test_LocalMoments(unittest.TestCase):
+    x = np.random.rand(2, 3, 9, 11) + 10
+    y = x * 2 + np.random.rand(2, 3, 9, 11)
+
+    def test_map_shape(self):
+        self.assertEqual(ssim.map(self.x, self.y).shape, self.x.shape)
+
+    def test_interior_window(self):
+        window = self.x[..., 3:8, 4:9], self.y[..., 3:8, 4:9]
+        self.assertTrue(np.allclose(ssim.map(self.x, self.y, 5)[..., 5, 6],
+                                    ssim(*window)))
+        self.assertTrue(np.allclose(r.map(self.x, self.y, 5)[..., 5, 6],
+                                    r(*window)))
+
+    def test_truncated_window(self):
+        window = self.x[..., :2, :2], self.y[..., :2, :2]
+        self.assertTrue(np.allclose(r.map(self.x, self.y, 3)[..., 0, 0],
+                                    r(*window)))
+
+    def test_window_counts(self):
+        m = LocalMoments(self.x, self.y, 3)
+        self.assertEqual(m.n[0, 0], 4)
+        self.assertEqual(m.n[4, 4], 9)
@@ -1,8 +1,12 @@
 import unittest
 
-from numpy import float32, allclose
+from time import sleep
+
+from numpy import float32, allclose, isnan
 from numpy.random import randn
-from msi2slstr.evaluation.scene import Evaluate
+from msi2slstr.evaluation.scene import Evaluate, AsyncEvaluate
+from msi2slstr.evaluation.scene import QualityMaps
+from msi2slstr.data.tiling import TileIndex
 
 
 class TestEvaluation(unittest.TestCase):
@@ -41,3 +45,93 @@ class TestEvaluation(unittest.TestCase):
         self.assertTrue(allclose(stats['r'], 1))
         self.assertTrue(allclose(stats['srmse'], 0))
         self.assertTrue(allclose(stats['ssim'], 1))
+
+    def test_batch_counter(self):
+        for _ in range(3):
+            self.evaluate(self.a, self.b)
+        self.assertEqual(self.evaluate._counter, 3)
+
+    def test_merge(self):
+        other = Evaluate()
+        self.evaluate(self.a, self.b)
+        other(self.a, self.a)
+        self.evaluate.merge(other)
+
+        for records in self.evaluate.metric_maps.values():
+            self.assertEqual(len(records), 2 * self.a.shape[0])
+        self.assertEqual(self.evaluate._counter, 2)
+
+
+class TestQualityMaps(unittest.TestCase):
+    a = randn(2, 12, 10, 10).astype(float32)
+
+    def test_placement(self):
+        maps = QualityMaps(12, xsize=20, ysize=30, t_size=10)
+        evaluate = Evaluate(maps)
+        evaluate(self.a, self.a)
+        maps.skip()
+        evaluate(self.a[:1], self.a[:1] * 2)
+
+        self.assertTrue(allclose(maps["r"][:, :10], 1))
+        self.assertTrue(isnan(maps["ssim"][:, 10:20, :10]).all())
+        self.assertTrue(allclose(maps["r"][:, 10:20, 10:], 1))
+        self.assertTrue(isnan(maps["r"][:, 20:]).all())
+
+    def test_index_order(self):
+        index = TileIndex(10, 20, 15, pad=True, order="serpentine")
+        maps = QualityMaps(12, xsize=20, ysize=15, t_size=10, index=index)
+        evaluate = Evaluate(maps)
+        maps.skip(2)
+        evaluate(self.a[:1], self.a[:1])
+
+        self.assertTrue(allclose(maps["r"][:, 10:, 10:], 1))
+        self.assertTrue(isnan(maps["r"][:, 10:, :10]).all())
+
+
+class TestAsyncEvaluate(unittest.TestCase):
+    a = randn(2, 12, 10, 10).astype(float32)
+
+    def test_matches_synchronous(self):
+        sync = Evaluate()
+        background = AsyncEvaluate(Evaluate(), queue_size=1)
+        for _ in range(5):
+            sync(self.a, self.a * 2)
+            background(self.a, self.a * 2)
+        background.join()
+
+        for name, stats in sync.get_stats().items():
+            self.assertTrue(allclose(stats,
+                                     background.evaluate.get_stats()[name]))
+
+    def test_skip_order(self):
+        maps = QualityMaps(12, xsize=20, ysize=10, t_size=10)
+        background = AsyncEvaluate(Evaluate(maps))
+        background.skip(1)
+        background(self.a[:1], self.a[:1])
+        background.join()
+
+        self.assertTrue(isnan(maps["r"][:, :, :10]).all())
+        self.assertTrue(allclose(maps["r"][:, :, 10:], 1))
+
+    def test_error_raised_on_join(self):
+        background = AsyncEvaluate(Evaluate())
+        background(self.a, self.a[:1])
+        with self.assertRaises(AssertionError):
+            background.join()
+
+    def test_error_raised_early(self):
+        background = AsyncEvaluate(Evaluate())
+        background(self.a, self.a[:1])
+        with self.assertRaises(AssertionError):
+            # Raised by one of the batches queued after the failure.
+            for _ in range(500):
+                background(self.a, self.a)
+                sleep(.01)
+
+    def test_close(self):
+        background = AsyncEvaluate(Evaluate(), queue_size=2)
+        background(self.a, self.a[:1])
+        background(self.a, self.a)
+        background.close()
+        self.assertFalse(background._thread.is_alive())
+        background.close()
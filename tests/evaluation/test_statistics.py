@@ -0,0 +1,33 @@
+import unittest
+
+from numpy import allclose
+from numpy.random import randn
+from msi2slstr.evaluation.statistics import RunningStatistics
+
+
+class TestRunningStatistics(unittest.TestCase):
+    values = randn(100, 12)
+
+    def test_streaming(self):
+        stats = RunningStatistics()
+        for batch in range(0, 100, 7):
+            stats.update(self.values[batch: batch + 7])
+
+        self.assertEqual(len(stats), 100)
+        self.assertTrue(allclose(stats.mean, self.values.mean(0)))
+        self.assertTrue(allclose(stats.var, self.values.var(0)))
+        self.assertTrue(allclose(stats.min, self.values.min(0)))
+        self.assertTrue(allclose(stats.max, self.values.max(0)))
+
+    def test_merge(self):
+        a = RunningStatistics().update(self.values[:30])
+        b = RunningStatistics().update(self.values[30:])
+        merged = RunningStatistics().merge(a).merge(b)
+        self.assertEqual(len(merged), 100)
+        self.assertTrue(allclose(merged.std, self.values.std(0)))
+
+    def test_state(self):
+        stats = RunningStatistics().update(self.values)
+        copy = RunningStatistics.from_state(stats.state())
+        self.assertTrue(allclose(copy.mean, stats.mean))
+        self.assertEqual(len(copy), len(stats))
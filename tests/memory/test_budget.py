@@ -0,0 +1,79 @@
+import unittest
+
+from os.path import dirname, exists, isdir
+from tempfile import TemporaryDirectory
+
+from msi2slstr.data.memory import MemoryBudget, parse_size, current_rss
+
+
+class TestParseSize(unittest.TestCase):
+
+    def test_units(self):
+        self.assertEqual(parse_size("512"), 512)
+        self.assertEqual(parse_size("16G"), 16 * 2 ** 30)
+        self.assertEqual(parse_size("1.5m"), 3 * 2 ** 19)
+        self.assertEqual(parse_size("2GiB"), 2 * 2 ** 30)
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, parse_size, "lots")
+        self.assertRaises(AssertionError, parse_size, "0")
+
+
+class TestMemoryBudget(unittest.TestCase):
+
+    def test_unlimited(self):
+        budget = MemoryBudget()
+        self.assertTrue(budget.fits(2 ** 50))
+        self.assertIsNone(budget.spill_path("a.tif", 2 ** 50))
+        self.assertEqual(budget.batch_size(2 ** 20, default=3), 3)
+
+    def test_spill(self):
+        from msi2slstr.data.vsimem import registry
+
+        with TemporaryDirectory() as scratch:
+            budget = MemoryBudget(current_rss() + 2 ** 30, cache_fraction=0,
+                                  scratch=scratch)
+            self.assertIsNone(budget.spill_path("a.tif", 2 ** 20))
+            with registry.scope("scene"):
+                path = budget.spill_path("a.tif", 2 ** 31)
+                self.assertTrue(path.startswith(scratch))
+                self.assertTrue(path.endswith("a.tif"))
+                self.assertNotEqual(budget.spill_path("a.tif", 2 ** 31),
+                                    path)
+                self.assertTrue(isdir(dirname(path)))
+            # Spills are removed with the scope of the scene.
+            self.assertFalse(exists(dirname(path)))
+
+    def test_share(self):
+        baseline = current_rss()
+        budget = MemoryBudget(baseline + 2 ** 30, cache_fraction=0,
+                              baseline=baseline)
+        share = budget.share(4)
+        self.assertEqual(share.limit, budget.limit)
+        self.assertEqual(share.available(), 2 ** 28)
+        # Memory used elsewhere in the process does not shrink the share,
+        # its own intermediates do.
+        ballast = bytearray(2 ** 27)
+        self.assertEqual(share.available(), 2 ** 28)
+        self.assertIsNone(share.spill_path("a.tif", 2 ** 26))
+        self.assertEqual(share.available(), 2 ** 28 - 2 ** 26)
+        self.assertEqual(budget.share(4).available(), 2 ** 28)
+        del ballast
+        self.assertRaises(AssertionError, budget.share, 0)
+
+    def test_batch_size(self):
+        budget = MemoryBudget(current_rss() + 2 ** 30, cache_fraction=0)
+        self.assertEqual(budget.batch_size(2 ** 40), 1)
+        self.assertEqual(budget.batch_size(2 ** 10, maximum=8), 8)
+        self.assertLessEqual(budget.batch_size(2 ** 26), 4)
+
+    def test_stage_peak(self):
+        budget = MemoryBudget(interval=.001)
+        with budget.stage("allocate"):
+            block = bytearray(2 ** 26)
+            block[::4096] = b"x" * len(block[::4096])
+
+        record, = budget.stages
+        del block
+        self.assertEqual(record.name, "allocate")
+        self.assertGreaterEqual(record.peak - record.start, 2 ** 25)
@@ -28,3 +28,6 @@ class TestFusionQualityMetadata(unittest.TestCase):
         self.assertTrue(isclose(float(band_stats['r']), 1))
         self.assertTrue(isclose(float(band_stats['srmse']), 0))
         self.assertTrue(isclose(float(band_stats['ssim']), 1))
+
+    def test_every_positive(self):
+        self.assertRaises(AssertionError, FusionQualityMetadata, every=0)
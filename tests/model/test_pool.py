@@ -0,0 +1,59 @@
+import unittest
+
+from os import _exit
+from numpy import allclose, float32
+from numpy.random import randn
+from msi2slstr.model.pool import InferencePool
+
+
+class ChannelSum:
+    """
+    Stand-in runtime producing the expected output shape.
+    """
+    def __init__(self, threads: int = None) -> None:
+        self.threads = threads
+
+    def __call__(self, sen2, sen3):
+        return [sen2[:, :sen3.shape[1]] + sen3.sum((-1, -2), keepdims=True)]
+
+
+class Crash(ChannelSum):
+    """
+    Stand-in runtime killing its process, as the out of memory killer would.
+    """
+    def __call__(self, sen2, sen3):
+        _exit(9)
+
+
+class TestInferencePool(unittest.TestCase):
+    batches = [(randn(2, 13, 20, 20).astype(float32),
+                randn(2, 12, 2, 2).astype(float32)) for _ in range(7)]
+    batches.append((randn(1, 13, 20, 20).astype(float32),
+                    randn(1, 12, 2, 2).astype(float32)))
+
+    def test_ordered_results(self):
+        expected = [ChannelSum()(*batch)[0] for batch in self.batches]
+
+        with InferencePool(2, slots=3, factory=ChannelSum) as pool:
+            results = [Y_hat.copy() for _, _, Y_hat in pool(self.batches)]
+
+        self.assertEqual(len(results), len(expected))
+        for result, target in zip(results, expected):
+            self.assertEqual(result.shape, target.shape)
+            self.assertTrue(allclose(result, target))
+
+    def test_inputs_returned(self):
+        with InferencePool(1, factory=ChannelSum) as pool:
+            for (sen2, sen3, _), batch in zip(pool(self.batches),
+                                              self.batches):
+                self.assertTrue(allclose(sen2, batch[0]))
+                self.assertTrue(allclose(sen3, batch[1]))
+
+    def test_worker_failure(self):
+        with InferencePool(1, factory=ChannelSum,
+                           unexpected=True) as pool:
+            self.assertRaises(RuntimeError, list, pool(self.batches))
+
+    def test_worker_exit(self):
+        with InferencePool(1, factory=Crash, poll=.1) as pool:
+            self.assertRaises(RuntimeError, list, pool(self.batches))
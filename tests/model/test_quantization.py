@@ -0,0 +1,53 @@
+import unittest
+
+from numpy import ones
+from numpy.random import randn, rand
+from msi2slstr.model.quantization import AccuracyGate, TileCalibrationReader
+from msi2slstr.model.quantization import get_model_path, sample_tiles
+
+
+class TestModelPath(unittest.TestCase):
+    def test_reference_model(self):
+        self.assertTrue(get_model_path("fp32", "root")
+                        .endswith("model.onnx"))
+
+    def test_variant_model(self):
+        self.assertTrue(get_model_path("int8-static", "root")
+                        .endswith("model.int8-static.onnx"))
+
+    def test_unknown_precision(self):
+        self.assertRaises(ValueError, get_model_path, "int4")
+
+
+class TestCalibrationReader(unittest.TestCase):
+    samples = [(randn(1, 13, 5, 5), randn(1, 12, 1, 1)) for _ in range(3)]
+
+    def test_exhaustion(self):
+        reader = TileCalibrationReader(self.samples)
+        feeds = [reader.get_next() for _ in range(4)]
+        self.assertListEqual(list(feeds[0].keys()), ["x", "y"])
+        self.assertIsNone(feeds[-1])
+
+    def test_rewind(self):
+        reader = TileCalibrationReader(iter(self.samples))
+        while reader.get_next():
+            pass
+        reader.rewind()
+        self.assertIs(reader.get_next()["x"], self.samples[0][0])
+
+    def test_sampling(self):
+        self.assertListEqual(sample_tiles(iter(range(10)), 3, 3), [0, 3, 6])
+
+
+class TestAccuracyGate(unittest.TestCase):
+    gate = AccuracyGate(min_r=.9, max_srmse=.2, min_ssim=.9)
+
+    def test_accept(self):
+        self.assertTrue(self.gate({"r": ones(4), "srmse": rand(4) * .1,
+                                   "ssim": ones(4)}))
+
+    def test_reject_worst_band(self):
+        r = ones(4)
+        r[2] = .5
+        self.assertFalse(self.gate({"r": r, "srmse": rand(4) * .1,
+                                    "ssim": ones(4)}))
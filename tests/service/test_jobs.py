@@ -0,0 +1,77 @@
+import unittest
+
+from threading import Event
+
+from msi2slstr.service.jobs import JobQueue, QueueFull
+
+
+class Runner:
+    """
+    Stand-in fusion runner recording the order of the jobs, held back until
+    released.
+    """
+    def __init__(self) -> None:
+        self.release = Event()
+        self.order = []
+
+    def __call__(self, job):
+        self.release.wait(5)
+        if job.request.get("fail"):
+            raise RuntimeError("Failed.")
+        self.order.append(job.request["name"])
+        return job.request["name"]
+
+
+class TestJobQueue(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.runner = Runner()
+        self.queue = JobQueue(self.runner, capacity=2)
+
+    def tearDown(self) -> None:
+        self.runner.release.set()
+        self.queue.close()
+        super().tearDown()
+
+    def test_priorities(self):
+        first = self.queue.submit({"name": "first"})
+        while first.state == "queued":
+            pass
+        self.queue.submit({"name": "low"})
+        self.queue.submit({"name": "high"}, priority=1)
+        self.runner.release.set()
+        self.queue.join()
+
+        self.assertEqual(self.runner.order, ["first", "high", "low"])
+        self.assertEqual(first.state, "done")
+        self.assertEqual(first.result, "first")
+
+    def test_back_pressure(self):
+        first = self.queue.submit({"name": "first"})
+        while first.state == "queued":
+            pass
+        self.queue.submit({"name": "a"})
+        self.queue.submit({"name": "b"})
+
+        self.assertRaises(QueueFull, self.queue.submit, {"name": "c"})
+        self.runner.release.set()
+        self.queue.join()
+        self.queue.submit({"name": "c"})
+
+    def test_failure(self):
+        self.runner.release.set()
+        job = self.queue.submit({"fail": True})
+        self.queue.join()
+
+        self.assertEqual(job.state, "failed")
+        self.assertIn("RuntimeError", job.error)
+
+    def test_validation(self):
+        def validate(request):
+            if "name" not in request:
+                raise ValueError("Missing name.")
+
+        self.queue.validate = validate
+        self.assertRaises(ValueError, self.queue.submit, {})
+        self.assertEqual(self.queue.statuses(), [])
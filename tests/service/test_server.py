@@ -0,0 +1,121 @@
+import unittest
+
+from os import listdir
+from os.path import join, dirname
+from tempfile import TemporaryDirectory
+from threading import Thread, Event
+
+from msi2slstr.service import Client, JobQueue, make_server
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp = TemporaryDirectory()
+        self.release = Event()
+        self.queue = JobQueue(self.fuse, capacity=1)
+
+    def tearDown(self) -> None:
+        self.release.set()
+        self.queue.close()
+        self.tmp.cleanup()
+        super().tearDown()
+
+    def fuse(self, job):
+        self.release.wait(5)
+        return join(job.request["output"], "fused.tif")
+
+    def serve(self, address: str) -> Client:
+        server = make_server(address, self.queue)
+        thread = Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return Client(server.address)
+
+    def check_jobs(self, client: Client):
+        code, job = client.submit(output="out")
+        self.assertEqual(code, 202)
+        self.assertEqual(job["state"], "queued")
+
+        while client.status(job["id"])[1]["state"] == "queued":
+            pass
+        client.submit(output="out")
+        code, body = client.submit(priority=2, output="out")
+        self.assertEqual(code, 503)
+        self.assertIn("error", body)
+
+        self.release.set()
+        self.queue.join()
+        code, status = client.status(job["id"])
+        self.assertEqual(code, 200)
+        self.assertEqual(status["state"], "done")
+        self.assertEqual(status["result"], join("out", "fused.tif"))
+        self.assertEqual(len(client.status()[1]), 2)
+        self.assertEqual(client.health()[1]["queued"], 0)
+        self.assertEqual(client.status("missing")[0], 404)
+
+    def test_unix_socket(self):
+        self.check_jobs(self.serve(join(self.tmp.name, "msi2slstr.sock")))
+
+    def test_tcp(self):
+        self.check_jobs(self.serve("localhost:0"))
+
+    def test_invalid_request(self):
+        def validate(request):
+            raise ValueError("Invalid.")
+
+        self.queue.validate = validate
+        client = self.serve("localhost:0")
+        self.assertEqual(client.submit(output="out"),
+                         (400, {"error": "Invalid."}))
+        self.assertEqual(client.request("POST", "/jobs", [1])[0], 400)
+
+
+class TestJobArguments(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        data = join(dirname(dirname(__file__)), "_test_data")
+        self.request = dict(zip(("l1c", "rbt", "lst"),
+                                (join(data, name) for name
+                                 in sorted(listdir(data)))))
+
+    def test_options(self):
+        from msi2slstr.__main__ import job_arguments
+
+        args = job_arguments({**self.request,
+                              "options": {"batch_size": 2,
+                                          "quality_maps": False,
+                                          "pad_edges": True}})
+        self.assertEqual(args.batch_size, 2)
+        self.assertFalse(args.quality_maps)
+        self.assertTrue(args.pad_edges)
+        self.assertTrue(job_arguments({**self.request, "options": {
+            "quality_maps": True}}).quality_maps)
+
+    def test_invalid(self):
+        from msi2slstr.__main__ import job_arguments
+
+        for request in ({"options": {"unknown": 1}},
+                        {"options": {"pad_edges": "yes"}},
+                        {"options": {"batch_size": "many"}},
+                        {"arguments": ["--unknown"]},
+                        {"arguments": ["-h"]}):
+            with self.subTest(request=request):
+                self.assertRaises(ValueError, job_arguments,
+                                  {**self.request, **request})
+
+    def test_server_options(self):
+        from msi2slstr.__main__ import job_arguments
+
+        for options in ({"precision": "fp16"}, {"device": "cpu"},
+                        {"max_memory": "4G"}, {"scratch": "/"},
+                        {"report": "report.json"}, {"stage": "copy"}):
+            with self.subTest(options=options):
+                self.assertRaises(ValueError, job_arguments,
+                                  {**self.request, "options": options})
+        self.assertRaises(ValueError, job_arguments,
+                          {**self.request, "arguments": ["--threads", "2"]})
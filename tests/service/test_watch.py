@@ -0,0 +1,103 @@
+import unittest
+
+from unittest.mock import patch
+from os import remove, listdir
+from os.path import join, dirname
+from shutil import copytree
+from tempfile import TemporaryDirectory
+from threading import Event
+
+from msi2slstr.data.catalog import Catalog
+from msi2slstr.service.jobs import JobQueue
+from msi2slstr.service.watch import Watcher, is_complete
+
+
+DATA = join(dirname(dirname(__file__)), "_test_data")
+
+
+class TestWatcher(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.tmp = TemporaryDirectory()
+        self.landing = join(self.tmp.name, "landing")
+        self.database = join(self.tmp.name, "catalog.db")
+        copytree(DATA, self.landing)
+        self.fused = []
+        self.queue = JobQueue(lambda job: self.fused.append(job.request)
+                              or "fused.tif")
+
+    def tearDown(self) -> None:
+        self.queue.close()
+        self.tmp.cleanup()
+        super().tearDown()
+
+    def watch(self, **kwargs) -> Watcher:
+        watcher = Watcher([self.landing], Catalog(self.database), self.queue,
+                          settle=0, request={"output": "out"}, **kwargs)
+        self.addCleanup(watcher.catalog.close)
+        return watcher
+
+    def test_incomplete_archive(self):
+        sen3, = (join(self.landing, name) for name in listdir(self.landing)
+                 if "_RBT_" in name)
+        self.assertTrue(is_complete(sen3))
+        remove(join(sen3, "geodetic_an.nc"))
+        self.assertFalse(is_complete(sen3))
+
+        watcher = self.watch()
+        watcher.poll()
+        watcher.poll()
+        self.assertEqual(len(watcher.catalog), 2)
+        self.assertEqual(watcher.pending, {})
+
+    def test_dispatch_once(self):
+        watcher = self.watch()
+        # Archives are indexed once they are seen unchanged.
+        self.assertEqual(watcher.poll(), 0)
+        self.assertEqual(watcher.poll(), 1)
+        self.queue.join()
+        self.assertEqual(watcher.poll(), 0)
+        self.assertEqual(len(self.fused), 1)
+        self.assertEqual(self.fused[0]["output"], "out")
+        self.assertEqual(watcher.pending, {})
+
+        # The processed products persist across restarts.
+        self.assertEqual(self.watch().poll(), 0)
+
+    def test_retry_failures(self):
+        def fail(job):
+            self.fused.append(job.request)
+            raise RuntimeError("Transient failure.")
+
+        self.queue.close()
+        self.queue = JobQueue(fail)
+        watcher = self.watch(attempts=2)
+        watcher.poll()
+        self.assertEqual(watcher.poll(), 1)
+        self.queue.join()
+        # The first failure is retried.
+        self.assertEqual(watcher.poll(), 1)
+        self.queue.join()
+        self.assertEqual(watcher.poll(), 0)
+        self.assertEqual(len(self.fused), 2)
+        self.assertEqual(watcher.pending, {})
+
+    def test_vanished_archive(self):
+        watcher = self.watch()
+        with patch("msi2slstr.service.watch.signature",
+                   side_effect=FileNotFoundError):
+            self.assertEqual(watcher.scan(), 0)
+        self.assertEqual(watcher._seen, {})
+
+    def test_poll_errors(self):
+        watcher = self.watch()
+        stop = Event()
+
+        def poll():
+            stop.set()
+            raise OSError("database is locked")
+
+        with patch.object(watcher, "poll", poll):
+            with self.assertLogs("msi2slstr.service.watch", "ERROR"):
+                watcher.run(0, stop)
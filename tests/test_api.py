@@ -0,0 +1,81 @@
+import unittest
+
+from unittest.mock import patch
+
+from numpy import float32, isnan
+from numpy.random import rand
+
+from msi2slstr.api import iter_fusion, fuse
+from msi2slstr.data.gdalutils import create_mem_dataset, create_dataset
+from msi2slstr.data.modelio import ModelInput, DatasetProduct
+from msi2slstr.data.vsimem import registry, vsimem_path
+
+
+class ChannelCopy:
+    """
+    Stand-in runtime producing the expected output shape.
+    """
+    def __call__(self, sen2, sen3):
+        return [sen2[:, :sen3.shape[1]].copy()]
+
+
+class TestFusionAPI(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        sen2 = create_mem_dataset(1000, 1000, 13,
+                                  geotransform=(0, 10, 0, 1e4, 0, -10))
+        sen3 = create_mem_dataset(20, 20, 12,
+                                  geotransform=(0, 500, 0, 1e4, 0, -500))
+        sen2.WriteArray(rand(13, 1000, 1000).astype(float32) * 1e3,
+                        band_list=range(1, 14))
+        sen3.WriteArray(rand(12, 20, 20).astype(float32) * 1e2,
+                        band_list=range(1, 13))
+
+        # In-memory datasets standing for prepared inputs.
+        self.inputs = ModelInput.__new__(ModelInput)
+        self.inputs.sen2 = DatasetProduct(sen2)
+        self.inputs.sen3 = DatasetProduct(sen3)
+
+    def test_iter_fusion(self):
+        tiles = list(iter_fusion(self.inputs, model=ChannelCopy(),
+                                 batch_size=3))
+
+        self.assertEqual([window for window, *_ in tiles],
+                         [(0, 0, 500, 500), (500, 0, 500, 500),
+                          (0, 500, 500, 500), (500, 500, 500, 500)])
+        for _, Y_hat, metrics in tiles:
+            self.assertEqual(Y_hat.shape, (12, 500, 500))
+            self.assertEqual(set(metrics), {"r", "srmse", "ssim"})
+            self.assertEqual(metrics["r"].shape, (12,))
+
+    def test_fuse(self):
+        scene = fuse(self.inputs, model=ChannelCopy(), evaluate=False)
+
+        self.assertEqual(scene.Y_hat.shape, (12, 1000, 1000))
+        self.assertFalse(isnan(scene.Y_hat).any())
+        self.assertEqual(scene.metrics, {})
+        self.assertEqual(scene.geotransform, (0, 10, 0, 1e4, 0, -10))
+
+    def test_interleaved_iterators(self):
+        def prepare(*args):
+            # An intermediate of the scope of the iterator.
+            create_dataset(1, 1, 1, driver="GTiff",
+                           name=vsimem_path("intermediate.tif")).FlushCache()
+            return self.inputs
+
+        with patch("msi2slstr.api.prepare", prepare):
+            a = iter_fusion("l1c", "rbt", "lst", model=ChannelCopy())
+            b = iter_fusion("l1c", "rbt", "lst", model=ChannelCopy())
+            next(a)
+            self.assertEqual(len(registry.scopes), 1)
+            next(b)
+            next(a)
+            self.assertEqual(len(registry.scopes), 2)
+            # Scopes are never active in the caller between tiles.
+            self.assertNotIn(registry.current, registry.scopes)
+            a.close()
+            self.assertEqual(len(list(b)), 3)
+
+        self.assertEqual(registry.scopes, set())
+        self.assertNotIn("_api", registry.current)
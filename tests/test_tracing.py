@@ -0,0 +1,79 @@
+import unittest
+
+from json import load
+from os.path import join
+from tempfile import TemporaryDirectory
+from threading import Thread
+
+from msi2slstr.tracing import Tracer, SpanStats, tracer, collect
+
+
+class TestTracer(unittest.TestCase):
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.tracer = Tracer()
+
+    def test_spans(self):
+        for _ in range(20):
+            with self.tracer.span("tile.read"):
+                pass
+        with self.assertRaises(RuntimeError):
+            with self.tracer.span("tile.infer"):
+                raise RuntimeError
+
+        stages = self.tracer.report()["stages"]
+        self.assertEqual(list(stages), ["tile.infer", "tile.read"])
+        self.assertEqual(stages["tile.read"]["count"], 20)
+        self.assertEqual(stages["tile.infer"]["count"], 1)
+        read = stages["tile.read"]
+        self.assertLessEqual(read["p50"], read["p95"])
+        self.assertLessEqual(read["p95"], read["max"])
+
+    def test_counters(self):
+        self.tracer.count("bytes_read", 100)
+        self.tracer.count("bytes_read", 50)
+        report = self.tracer.report()
+        self.assertEqual(report["counters"], {"bytes_read": 150})
+        self.assertIsNone(report["tiles_per_second"])
+
+        self.tracer.spans["scene.fuse"].add(2.)
+        self.tracer.count("tiles", 10)
+        self.assertEqual(self.tracer.report()["tiles_per_second"], 5.)
+
+        self.tracer.reset()
+        self.assertEqual(self.tracer.report()["counters"], {})
+
+    def test_bounded_samples(self):
+        stats = SpanStats(size=100, seed=0)
+        for i in range(10000):
+            stats.add(i / 10000)
+        self.assertEqual(len(stats.samples), 100)
+        summary = stats.summary()
+        self.assertEqual(summary["count"], 10000)
+        self.assertEqual(summary["max"], .9999)
+        self.assertAlmostEqual(summary["mean"], .49995)
+        self.assertAlmostEqual(summary["p50"], .5, delta=.15)
+
+    def test_collect(self):
+        with collect() as outer:
+            tracer.count("tiles")
+            with collect() as inner:
+                tracer.count("tiles", 2)
+            tracer.count("tiles")
+            # Other threads record in their own context.
+            thread = Thread(target=lambda: tracer.count("tiles"))
+            thread.start()
+            thread.join()
+        self.assertEqual(outer.counters, {"tiles": 2})
+        self.assertEqual(inner.counters, {"tiles": 2})
+
+    def test_write(self):
+        with self.tracer.span("prepare.crop"):
+            self.tracer.count("tiles")
+        with TemporaryDirectory() as tmp:
+            self.tracer.write(join(tmp, "report.json"))
+            with open(join(tmp, "report.json")) as file:
+                report = load(file)
+        self.assertEqual(report["stages"]["prepare.crop"]["count"], 1)
+        self.assertEqual(report["counters"], {"tiles": 1})
@@ -0,0 +1,29 @@
+import unittest
+
+from numpy import allclose, float32
+from numpy.random import randn
+
+from msi2slstr.transform.postprocessing import DataPostprocessor
+from msi2slstr.transform.preprocessing import DataPreprocessor
+from msi2slstr.transform.resizing import ValidAverageDownsampling
+
+
+class TestDataPostprocessor(unittest.TestCase):
+    post = DataPostprocessor(5)
+    pre = DataPreprocessor()
+    down = ValidAverageDownsampling(5)
+
+    def test_value_range(self):
+        Y_hat = randn(2, 12, 20, 23).astype(float32)
+        expected = self.pre.reset_value_range(Y_hat)
+        result, _ = self.post(Y_hat)
+        self.assertIs(result, Y_hat)
+        self.assertTrue(allclose(result, expected, rtol=1e-5, atol=1e-3))
+
+    def test_downsampled(self):
+        Y_hat = randn(2, 12, 20, 20).astype(float32)
+        expected = self.down(self.pre.reset_value_range(Y_hat))
+        result, down = self.post(Y_hat)
+        self.assertEqual(down.shape, (2, 12, 4, 4))
+        self.assertEqual(down.dtype, float32)
+        self.assertTrue(allclose(down, expected, rtol=1e-4, atol=1e-2))
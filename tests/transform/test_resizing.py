@@ -1,9 +1,12 @@
 import unittest
 
-from numpy import array
-from numpy import allclose
+from numpy import array, arange, ones, zeros, empty, nan, float32
+from numpy import allclose, isnan, shares_memory
 
 from msi2slstr.transform.resizing import ValidAverageDownsampling
+from msi2slstr.transform.resizing import AreaDownsampling
+from msi2slstr.transform.resizing import BilinearDownsampling
+from msi2slstr.transform.resizing import NearestNeighbourUpsampling
 
 
 class Test_ValidAverageDownsampling(unittest.TestCase):
@@ -26,3 +29,100 @@ class Test_ValidAverageDownsampling(unittest.TestCase):
     def test_averaged_values(self):
         data = self.down(self.data)
         self.assertTrue(allclose(data.flatten(), [1, 2, 3, 4]))
+
+
+class Test_ValidAverageRemainders(unittest.TestCase):
+    data = arange(1, 26, dtype=float32).reshape(1, 1, 5, 5)
+
+    def test_edge_shape(self):
+        self.assertEqual(ValidAverageDownsampling(2)(self.data).shape,
+                         (1, 1, 3, 3))
+
+    def test_edge_values(self):
+        result = ValidAverageDownsampling(2)(self.data)
+        self.assertTrue(allclose(result[0, 0, -1], [21.5, 23.5, 25]))
+        self.assertTrue(allclose(result[0, 0, :, -1], [7.5, 17.5, 25]))
+
+    def test_dtype_preserved(self):
+        self.assertEqual(ValidAverageDownsampling(2)(self.data).dtype,
+                         float32)
+
+    def test_nodata(self):
+        data = self.data.copy()
+        data[..., :2, :2] = -1
+        result = ValidAverageDownsampling(2, nodata=-1)(data)
+        self.assertEqual(result[0, 0, 0, 0], -1)
+        self.assertTrue(allclose(result[0, 0, 0, 1], 6))
+
+    def test_out(self):
+        out = zeros((1, 1, 3, 3))
+        result = ValidAverageDownsampling(2)(self.data, out=out)
+        self.assertIs(result, out)
+        self.assertTrue(allclose(out[0, 0, 0, 0], 4))
+
+
+class Test_AreaDownsampling(unittest.TestCase):
+    def test_matches_block_average(self):
+        data = Test_ValidAverageDownsampling.data
+        self.assertTrue(allclose(AreaDownsampling(2)(data).flatten(),
+                                 [1, 2, 3, 4]))
+
+    def test_fractional_scale(self):
+        data = ones((2, 3, 10, 10), dtype=float32)
+        result = AreaDownsampling(2.5)(data)
+        self.assertEqual(result.shape, (2, 3, 4, 4))
+        self.assertTrue(allclose(result, 1))
+
+    def test_total_preserved(self):
+        data = arange(49.).reshape(1, 1, 7, 7)
+        result = AreaDownsampling(3.5)(data)
+        self.assertTrue(allclose(result.mean(), data.mean()))
+
+    def test_nodata(self):
+        data = ones((1, 1, 4, 4))
+        data[..., :2, :2] = nan
+        result = AreaDownsampling(2, nodata=nan)(data)
+        self.assertTrue(isnan(result[0, 0, 0, 0]))
+        self.assertTrue(allclose(result[0, 0, 1], 1))
+
+
+class Test_BilinearDownsampling(unittest.TestCase):
+    def test_centre_values(self):
+        data = Test_ValidAverageDownsampling.data
+        self.assertTrue(allclose(BilinearDownsampling(2)(data).flatten(),
+                                 [1, 2, 3, 4]))
+
+    def test_linear_ramp(self):
+        data = arange(9.).reshape(1, 1, 1, 9).repeat(3, 2)
+        result = BilinearDownsampling(3)(data)
+        self.assertTrue(allclose(result[0, 0, 0], [1, 4, 7]))
+
+    def test_nodata(self):
+        data = ones((1, 1, 4, 4), dtype=float32)
+        data[..., 1, 1] = 0
+        result = BilinearDownsampling(2, nodata=0)(data)
+        self.assertTrue(allclose(result, 1))
+        self.assertEqual(result.dtype, float32)
+
+
+class Test_NearestNeighbourUpsampling(unittest.TestCase):
+    up = NearestNeighbourUpsampling(3)
+    data = arange(8.).reshape(1, 2, 2, 2)
+
+    def test_values(self):
+        self.assertTrue(allclose(self.up(self.data),
+                                 self.data.repeat(3, -1).repeat(3, -2)))
+
+    def test_view_is_zero_copy(self):
+        view = self.up.view(self.data)
+        self.assertTrue(shares_memory(view, self.data))
+        self.assertEqual(view.strides[-1], 0)
+
+    def test_out(self):
+        out = empty((1, 2, 6, 6))
+        self.assertIs(self.up(self.data, out=out), out)
+
+    def test_roundtrip(self):
+        self.assertTrue(allclose(
+            ValidAverageDownsampling(3)(self.up(self.data + 1)),
+            self.data + 1))